@@ -22,24 +22,30 @@
 # *****************************************************************************
 """general SECoP client"""
 
+import hashlib
 import json
+import os
 import queue
 import re
 import time
 from collections import defaultdict
+from pathlib import Path
 from threading import Event, RLock, current_thread
 
 import frappy.params
-from frappy.datatypes import get_datatype
+from frappy.datatypes import FloatRange, IntRange, ScaledInteger, \
+    get_shared_datatype
 from frappy.errors import HardwareError, SECoPError, WrongTypeError, \
     make_secop_error
 from frappy.lib import mkthread
 from frappy.lib.asynconn import AsynConn, ConnectionClosed
-from frappy.protocol.interface import decode_msg, encode_msg_frame
-from frappy.protocol.messages import COMMANDREQUEST, DESCRIPTIONREQUEST, \
-    ENABLEEVENTSREQUEST, ERRORPREFIX, EVENTREPLY, HEARTBEATREQUEST, \
-    IDENTPREFIX, IDENTREQUEST, READREPLY, READREQUEST, REQUEST2REPLY, \
-    WRITEREPLY, WRITEREQUEST
+from frappy.lib.ringbuffer import RingBuffer
+from frappy.protocol.interface import binary_size, decode_binary, \
+    decode_msg, encode_msg_frame
+from frappy.protocol.messages import BINARY_REQUEST, COMMANDREQUEST, \
+    DESCRIPTIONREQUEST, ENABLEEVENTSREQUEST, ERRORPREFIX, EVENTREPLY, \
+    HEARTBEATREQUEST, HISTORYREQUEST, IDENTPREFIX, IDENTREQUEST, \
+    MULTICHANGEREQUEST, READREPLY, READREQUEST, REQUEST2REPLY, WRITEREPLY, WRITEREQUEST
 
 # replies to be handled for cache
 UPDATE_MESSAGES = {EVENTREPLY, READREPLY, WRITEREPLY, ERRORPREFIX + READREQUEST, ERRORPREFIX + EVENTREPLY}
@@ -195,6 +201,63 @@ class Cache(dict):
         return self.undefined
 
 
+class DescriptionCache:
+    """on-disk cache of descriptive data
+
+    descriptions are stored in <directory>/<equipment_id>.<digest>.json, where
+    <digest> is a hash of the description. for every uri, a small index file
+    contains equipment_id and digest of the description seen last on this uri.
+    """
+
+    def __init__(self, directory='~/.cache/frappy/descriptions'):
+        self.directory = Path(directory).expanduser()
+
+    @staticmethod
+    def digest(description):
+        """return a digest of the description, independent of key order"""
+        return hashlib.sha1(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _indexfile(self, uri):
+        return self.directory / ('uri.' + re.sub(r'[^\w.-]', '_', uri))
+
+    def load(self, uri):
+        """return the cached description of the node at uri or None"""
+        try:
+            equipment_id, digest = self._indexfile(uri).read_text(encoding='utf-8').split()
+            with open(self.directory / f'{equipment_id}.{digest}.json', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, uri, description, digest=None):
+        """store the description of the node at uri"""
+        digest = digest or self.digest(description)
+        equipment_id = re.sub(r'[^\w.-]', '_', description.get('equipment_id', 'unknown'))
+        filename = self.directory / f'{equipment_id}.{digest}.json'
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            new = not filename.exists()
+            if new:
+                tmpfile = filename.with_suffix('.tmp')
+                with open(tmpfile, 'w', encoding='utf-8') as f:
+                    json.dump(description, f)
+                os.replace(tmpfile, filename)
+            self._indexfile(uri).write_text(f'{equipment_id} {digest}\n', encoding='utf-8')
+            if new:
+                # remove stale descriptions, but only when no other uri refers to them
+                referenced = set()
+                for indexfile in self.directory.glob('uri.*'):
+                    try:
+                        referenced.add('%s.%s.json' % tuple(indexfile.read_text(encoding='utf-8').split()))
+                    except (OSError, TypeError):
+                        pass
+                for stale in self.directory.glob(f'{equipment_id}.*.json'):
+                    if stale.name not in referenced:
+                        stale.unlink()
+        except OSError:
+            pass  # a cache which can not be written is not worth an error
+
+
 class ProxyClient:
     """common functionality for proxy clients"""
 
@@ -206,6 +269,12 @@ class ProxyClient:
 
     def __init__(self):
         self.callbacks = {cbname: defaultdict(list) for cbname in self.CALLBACK_NAMES}
+        # precomputed lists of (key, cbfunc) for update callbacks
+        # dict (<callback name>, <module name>, <parameter name>) of tuple
+        # to be cleared whenever callbacks are registered or unregistered
+        self._dispatch = {}
+        # protects self.callbacks against changes while building self._dispatch entries
+        self._callbackLock = RLock()
         # caches (module, parameter) = value, timestamp, readerror (internal names!)
         self.cache = Cache()  # dict returning Cache.undefined for missing keys
 
@@ -260,7 +329,9 @@ class ProxyClient:
                     if self.log:
                         self.log.error('error %r calling %s%r', e, cbfunc.__name__, args)
             if do_append:
-                self.callbacks[cbname][key].append(cbfunc)
+                with self._callbackLock:
+                    self.callbacks[cbname][key].append(cbfunc)
+                    self._dispatch.clear()
 
     def unregister_callback(self, key, *args, **kwds):
         """unregister a callback
@@ -269,12 +340,22 @@ class ProxyClient:
         """
         for cbfunc in args:
             kwds[cbfunc.__name__] = cbfunc
-        for cbname, func in kwds.items():
-            cblist = self.callbacks[cbname][key]
-            if func in cblist:
-                cblist.remove(func)
-            if not cblist:
-                self.callbacks[cbname].pop(key)
+        with self._callbackLock:
+            for cbname, func in kwds.items():
+                cblist = self.callbacks[cbname][key]
+                if func in cblist:
+                    cblist.remove(func)
+                if not cblist:
+                    self.callbacks[cbname].pop(key)
+            self._dispatch.clear()
+
+    def _callback_error(self, cbname, args, e):
+        if cbname != 'handleError':
+            try:
+                e.args = [f'error in callback {cbname}{args}: {e}']
+                self.callback(None, 'handleError', e)
+            except Exception:
+                pass
 
     def callback(self, key, cbname, *args):
         """perform callbacks
@@ -288,20 +369,36 @@ class ProxyClient:
             try:
                 cbfunc(*args)
             except UnregisterCallback:
-                cblist.remove(cbfunc)
+                with self._callbackLock:
+                    cblist.remove(cbfunc)
+                    self._dispatch.clear()
             except Exception as e:
-                if cbname != 'handleError':
-                    try:
-                        e.args = [f'error in callback {cbname}{args}: {e}']
-                        self.callback(None, 'handleError', e)
-                    except Exception:
-                        pass
+                self._callback_error(cbname, args, e)
         return bool(cblist)
 
+    def update_callback(self, cbname, module, param, *args):
+        """perform update callbacks
+
+        equivalent to calling self.callback with the keys None, module
+        and (module, param), but using a precomputed list of callbacks
+        """
+        key = cbname, module, param
+        cblist = self._dispatch.get(key)
+        if cblist is None:
+            with self._callbackLock:
+                cbdict = self.callbacks[cbname]
+                cblist = self._dispatch[key] = tuple(
+                    (k, f) for k in (None, module, (module, param)) for f in cbdict.get(k, ()))
+        for cbkey, cbfunc in cblist:
+            try:
+                cbfunc(*args)
+            except UnregisterCallback:
+                self.unregister_callback(cbkey, **{cbname: cbfunc})
+            except Exception as e:
+                self._callback_error(cbname, args, e)
+
     def updateValue(self, module, param, value, timestamp, readerror):
-        self.callback(None, 'updateEvent', module, param, value, timestamp, readerror)
-        self.callback(module, 'updateEvent', module, param, value, timestamp, readerror)
-        self.callback((module, param), 'updateEvent', module, param, value, timestamp, readerror)
+        self.update_callback('updateEvent', module, param, module, param, value, timestamp, readerror)
 
 
 class SecopClient(ProxyClient):
@@ -311,23 +408,30 @@ class SecopClient(ProxyClient):
     _rxthread = None
     _txthread = None
     _connthread = None
+    _cbthread = None
+    _cbqueue = None
     disconnect_time = 0  # time of last disconnect
     secop_version = ''
     descriptive_data = {}
+    descriptive_digest = None
+    description_cache = None  # a DescriptionCache, if descriptions are to be cached on disk
     modules = {}
     _last_error = None
     _update_error_count = 0
     _max_error_count = 10
 
-    def __init__(self, uri, log=Logger):
+    def __init__(self, uri, log=Logger, description_cache=None):
         """initialize SecopClient
 
         :param uri: the uri to connect to
         :param log: a logger.
                     when not given, the print command is used for messages with at least info level.
                     when None, nothing is logged at all
+        :param description_cache: a DescriptionCache object or None
         """
         super().__init__()
+        if description_cache:
+            self.description_cache = description_cache
         # maps expected replies to [request, Event, is_error, result] until a response came
         # there can only be one entry per thread calling 'request'
         self.active_requests = {}
@@ -340,6 +444,7 @@ class SecopClient(ProxyClient):
         self._lock = RLock()
         self._shutdown = Event()
         self.cleanup = []
+        self.history = {}  # dict (module, param) of RingBuffer, see history_size
         self.register_callback(None, self.handleError)
 
     def __del__(self):
@@ -390,12 +495,17 @@ class SecopClient(ProxyClient):
 
                     # now its safe to do secop stuff
                     self._running = True
+                    if self.async_callbacks and not self._cbthread:
+                        self._cbqueue = queue.SimpleQueue()
+                        self._cbthread = mkthread(self.__cbthread, self._cbqueue)
                     self._rxthread = mkthread(self.__rxthread)
                     self._txthread = mkthread(self.__txthread)
                     self.log.debug('connected to %s', self.uri)
                     # pylint: disable=unsubscriptable-object
                     self._init_descriptive_data(self.request(DESCRIPTIONREQUEST)[2])
                     self.nodename = self.properties.get('equipment_id', self.uri)
+                    if self.binary:
+                        self._request_binary()
                     if self.activate:
                         self._set_state(True, 'activating')
                         self.request(ENABLEEVENTSREQUEST)
@@ -411,6 +521,14 @@ class SecopClient(ProxyClient):
             if not self._shutdown.is_set():
                 self.log.info('%s ready', self.nodename)
 
+    def _request_binary(self):
+        try:
+            self.request(BINARY_REQUEST, None, True)
+            self.log.debug('binary transport of arrays and blobs enabled')
+        except Exception as e:
+            # the other end is probably not a frappy server
+            self.log.info('binary transport not available: %r', e)
+
     def __txthread(self):
         while self._running:
             entry = self.txq.get()
@@ -456,6 +574,13 @@ class SecopClient(ProxyClient):
                 noactivity = 0
                 try:
                     action, ident, data = decode_msg(reply)
+                    size = binary_size(data) if self.binary else 0
+                    if size:
+                        try:
+                            payload = self.io.readbytes(size, 10)
+                        except TimeoutError:
+                            raise ConnectionClosed('incomplete binary data') from None
+                        decode_binary(data, payload)
                     if ident == '.':
                         ident = None
                     if action in UPDATE_MESSAGES:
@@ -481,6 +606,8 @@ class SecopClient(ProxyClient):
                             self.updateValue(module, param, value, timestamp, readerror)
                             if action in (EVENTREPLY, ERRORPREFIX + EVENTREPLY):
                                 continue
+                except ConnectionClosed:
+                    raise
                 except Exception as e:
                     e.args = (f'error handling SECoP message {reply!r}: {e}',)
                     try:
@@ -528,6 +655,13 @@ class SecopClient(ProxyClient):
                 self.log.warning('%s disconnected', self.uri)
                 self._set_state(False, 'disconnected')
 
+    def __cbthread(self, cbqueue):
+        while True:
+            item = cbqueue.get()
+            if item is None:
+                break
+            self._update_callbacks(*item)
+
     def spawn_connect(self, connected_callback=None):
         """try to connect in background
 
@@ -588,6 +722,10 @@ class SecopClient(ProxyClient):
         if self._rxthread:
             self._rxthread.join()
             self._rxthread = None
+        if shutdown and self._cbthread:
+            # pending callbacks are still done before the worker stops
+            self._cbqueue.put(None)
+            self._cbqueue = self._cbthread = None
         if self.io:
             self.io.disconnect()
         self.io = None
@@ -605,22 +743,46 @@ class SecopClient(ProxyClient):
         except queue.Empty:
             pass
 
+    def load_cached_description(self):
+        """initialize descriptive data from the description cache
+
+        :return: True when a cached description was found
+
+        the description is revalidated on the next connect. typically
+        spawn_connect is called afterwards
+        """
+        if not self.description_cache:
+            return False
+        data = self.description_cache.load(self.uri)
+        if data is None:
+            return False
+        try:
+            self._init_descriptive_data(data)
+        except Exception as e:
+            self.log.warning('can not use cached description: %r', e)
+            return False
+        self.nodename = self.properties.get('equipment_id', self.uri)
+        return True
+
     def _init_descriptive_data(self, data):
         """rebuild descriptive data"""
+        digest = DescriptionCache.digest(data)
+        if digest == self.descriptive_digest:
+            return  # unchanged: no need to parse again
         changed_modules = None
-        if json.dumps(data, sort_keys=True) != json.dumps(self.descriptive_data, sort_keys=True):
-            if self.descriptive_data:
-                changed_modules = set()
-                modules = data.get('modules', {})
-                for modname, moddesc in self.descriptive_data['modules'].items():
-                    if json.dumps(moddesc, sort_keys=True) != json.dumps(modules.get(modname), sort_keys=True):
-                        changed_modules.add(modname)
-        self.descriptive_data = data
+        if self.descriptive_data:
+            changed_modules = set()
+            modules = data.get('modules', {})
+            for modname, moddesc in self.descriptive_data['modules'].items():
+                if json.dumps(moddesc, sort_keys=True) != json.dumps(modules.get(modname), sort_keys=True):
+                    changed_modules.add(modname)
         modules = data['modules']
         self.modules = {}
         self.properties = {k: v for k, v in data.items() if k != 'modules'}
         self.identifier = {}  # map (module, parameter) -> identifier
         self.internal = {}  # map identifier -> (module, parameter)
+        history = self.history
+        self.history = {}
         for modname, moddescr in modules.items():
             #  separate accessibles into command and parameters
             parameters = {}
@@ -628,7 +790,7 @@ class SecopClient(ProxyClient):
             accessibles = moddescr['accessibles']
             for aname, aentry in accessibles.items():
                 iname = self.internalize_name(aname)
-                datatype = get_datatype(aentry['datainfo'], iname)
+                datatype = get_shared_datatype(aentry['datainfo'], iname)
                 aentry = dict(aentry, datatype=datatype)
                 ident = f'{modname}:{aname}'
                 self.identifier[modname, iname] = ident
@@ -637,9 +799,19 @@ class SecopClient(ProxyClient):
                     commands[iname] = aentry
                 else:
                     parameters[iname] = aentry
+                    if self.history_size and isinstance(datatype, (FloatRange, IntRange, ScaledInteger)):
+                        buffer = history.get((modname, iname))  # keep history on description changes
+                        if buffer is None:
+                            buffer = RingBuffer(self.history_size)
+                        self.history[modname, iname] = buffer
             properties = {k: v for k, v in moddescr.items() if k != 'accessibles'}
             self.modules[modname] = {'accessibles': accessibles, 'parameters': parameters,
                                      'commands': commands, 'properties': properties}
+        # parsing succeeded: the description may be cached now
+        self.descriptive_data = data
+        self.descriptive_digest = digest
+        if self.description_cache:
+            self.description_cache.store(self.uri, data, digest)
         if changed_modules is not None:
             done = done_main = self.callback(None, 'descriptiveDataChange', None, self)
             for mname in changed_modules:
@@ -724,6 +896,19 @@ class SecopClient(ProxyClient):
             self.readParameter(module, parameter)
         return self.cache[module, parameter]
 
+    def getHistory(self, module, parameter, start=None, end=None):
+        """get the recorded history of a numeric parameter
+
+        :param start, end: the time range, None for no limit
+        :return: tuple (timestamps, values) of numpy arrays, NaN in values indicate an error
+
+        history is recorded only when history_size is set before connecting
+        """
+        try:
+            return self.history[module, parameter].get(start, end)
+        except KeyError:
+            raise KeyError(f'no history recorded for {module}:{parameter}') from None
+
     def setParameter(self, module, parameter, value):
         self.connect()  # make sure we are connected
         datatype = self.modules[module]['parameters'][parameter]['datatype']
@@ -731,6 +916,50 @@ class SecopClient(ProxyClient):
         self.request(WRITEREQUEST, self.identifier[module, parameter], value)
         return self.cache[module, parameter]
 
+    def setParameters(self, module, values):
+        """change several parameters of a module in one request (frappy extension)
+
+        :param values: dict <parameter> of <value>
+        :return: dict <parameter> of <cache item>
+
+        the server writes parameters sharing a common write handler together
+        """
+        self.connect()  # make sure we are connected
+        params = self.modules[module]['parameters']
+        remote_module = None
+        data = {}
+        for param, value in values.items():
+            remote_module, _, exportedname = self.identifier[module, param].partition(':')
+            data[exportedname] = params[param]['datatype'].export_value(value)
+        _, _, reply = self.request(MULTICHANGEREQUEST, remote_module, data)
+        now = time.time()
+        for exportedname, (value, qualifiers) in reply.items():
+            module, param = self.internal[f'{remote_module}:{exportedname}']
+            self.updateValue(module, param, value, min(now, qualifiers.get('t', now)), None)
+        return {param: self.cache[module, param] for param in values}
+
+    def queryHistory(self, module, parameter, start=None, end=None, buckets=1000):
+        """get the history of a parameter from the SEC node (frappy extension)
+
+        in contrast to getHistory, the data is taken from the history recorded
+        on the SEC node, reduced to <buckets> time buckets
+
+        :param parameter: the parameter name, for a tuple or struct member
+            '<parameter>.<member>'
+        :param start, end: the time range, default: the last hour
+        :param buckets: the number of time buckets the data is reduced to
+        :return: a dict with the lists 't' (the bucket start), 'min', 'max', 'mean'
+        """
+        self.connect()  # make sure we are connected
+        param, dot, member = parameter.partition('.')
+        data = {'buckets': buckets}
+        if start is not None:
+            data['start'] = start
+        if end is not None:
+            data['end'] = end
+        _, _, reply = self.request(HISTORYREQUEST, self.identifier[module, param] + dot + member, data)
+        return reply
+
     def setParameterFromString(self, module, parameter, formatted):
         """set parameter from string
 
@@ -787,9 +1016,17 @@ class SecopClient(ProxyClient):
             value = datatype.import_value(value)
         entry = CacheItem(value, timestamp, readerror, datatype)
         self.cache[(module, param)] = entry
-        self.callback(None, 'updateItem', module, param, entry)
-        self.callback(module, 'updateItem', module, param, entry)
-        self.callback((module, param), 'updateItem', module, param, entry)
+        history = self.history.get((module, param))
+        if history is not None:
+            history.append(timestamp, float('nan') if readerror else value)
+        cbqueue = self._cbqueue
+        if cbqueue:
+            cbqueue.put((module, param, value, timestamp, readerror, entry))
+        else:
+            self._update_callbacks(module, param, value, timestamp, readerror, entry)
+
+    def _update_callbacks(self, module, param, value, timestamp, readerror, entry):
+        self.update_callback('updateItem', module, param, module, param, entry)
         # TODO: change clients to use updateItem instead of updateEvent
         super().updateValue(module, param, value, timestamp, readerror)
 
@@ -797,6 +1034,16 @@ class SecopClient(ProxyClient):
 
     PREDEFINED_NAMES = set(frappy.params.PREDEFINED_ACCESSIBLES)
     activate = True
+    # True: update callbacks are called from a worker thread instead of the
+    # receiving thread, so that slow callbacks do not delay reading the socket
+    # (the cache is still updated immediately)
+    async_callbacks = False
+    # > 0: record the last <history_size> values of numeric parameters, to be
+    # shared by all consumers (see getHistory). needs numpy
+    history_size = 0
+    # True: ask a frappy server to send numeric arrays and blobs in binary,
+    # arrays are decoded with numpy. falls back to JSON if not supported
+    binary = False
 
     def internalize_name(self, name):
         """how to create internal names"""
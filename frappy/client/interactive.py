@@ -31,9 +31,9 @@ import threading
 import logging
 from pathlib import Path
 from frappy.lib import delayed_import
-from frappy.client import SecopClient, UnregisterCallback
+from frappy.client import DescriptionCache, SecopClient, UnregisterCallback
 from frappy.errors import SECoPError
-from frappy.datatypes import get_datatype, StatusType
+from frappy.datatypes import get_shared_datatype, StatusType
 
 readline = delayed_import('readline')
 
@@ -272,7 +272,7 @@ class Param:
         self.name = name
         self.prev = None
         self.prev_time = 0
-        self.datatype = get_datatype(datainfo)
+        self.datatype = get_shared_datatype(datainfo)
 
     def __get__(self, obj, owner):
         if obj is None:
@@ -378,7 +378,12 @@ class Client(SecopClient):
     secnodes = {}
     mininterval = 1
 
-    def __init__(self, uri, loglevel='info', name=''):
+    def __init__(self, uri, loglevel='info', name='', cache=False):
+        """create a client to the SEC node at uri
+
+        :param cache: when True, start with the description cached on disk
+            and revalidate it in the background
+        """
         if clientenv.namespace is None:
             #  called from a simple python interpeter
             clientenv.init(sys.modules['__main__'].__dict__)
@@ -388,17 +393,36 @@ class Client(SecopClient):
         removed_modules = []
         if prev:
             log.info('remove previous client to %s', uri)
-            for modname in prev.modules:
-                prevnode = getattr(clientenv.namespace.get(modname), '_secnode', None)
-                if prevnode == prev:
-                    removed_modules.append(modname)
-                    clientenv.namespace.pop(modname)
+            removed_modules = prev._remove_modules()
             prev.disconnect()
         self.secnodes[uri] = self
         if name:
             log.info('\n>>> %s = Client(%r)', name, uri)
-        super().__init__(uri, log)
-        self.connect()
+        super().__init__(uri, log, DescriptionCache() if cache else None)
+        if self.load_cached_description():
+            # build modules from the cached description, revalidate in the background
+            self.spawn_connect()
+        else:
+            self.connect()
+        self._create_modules(removed_modules)
+        self.register_callback(None, self.unhandledMessage, self.descriptiveDataChange)
+        log.show_time = True
+
+    def _remove_modules(self):
+        """remove the modules of this client from the namespace
+
+        :return: the list of removed module names
+        """
+        removed_modules = []
+        for modname, mobj in list(clientenv.namespace.items()):
+            if isinstance(mobj, Module) and mobj._secnode == self:
+                removed_modules.append(modname)
+                clientenv.namespace.pop(modname)
+                if 'status' in mobj._parameters:
+                    self.unregister_callback((modname, 'status'), updateEvent=mobj._status_update)
+        return removed_modules
+
+    def _create_modules(self, removed_modules):
         created_modules = []
         skipped_modules = []
         for modname, moddesc in self.modules.items():
@@ -426,8 +450,11 @@ class Client(SecopClient):
             self.log.info('skipped modules overwriting globals: %s', ' '.join(skipped_modules))
         if created_modules:
             self.log.info('created modules: %s', ' '.join(created_modules))
-        self.register_callback(None, self.unhandledMessage)
-        log.show_time = True
+
+    def descriptiveDataChange(self, module, secnode):
+        """rebuild the modules, e.g. when the cached description was outdated"""
+        self.log.info('descriptive data changed')
+        self._create_modules(self._remove_modules())
 
     def unhandledMessage(self, action, ident, data):
         """handle logging messages"""
@@ -524,13 +551,13 @@ class Console(code.InteractiveConsole):
         self.write(clientenv.short_traceback())
 
 
-def init(*nodes):
+def init(*nodes, cache=False):
     clientenv.init()
     success = not nodes
     for idx, node in enumerate(nodes):
         client_name = '_c%d' % idx
         try:
-            node = clientenv.namespace[client_name] = Client(node, name=client_name)
+            node = clientenv.namespace[client_name] = Client(node, name=client_name, cache=cache)
             clientenv.nodes.append(node)
             success = True
         except Exception as e:
@@ -277,3 +277,18 @@ def load_config(cfgfiles, log):
         log.warning('ambiguous sections in %s: %r',
                     cfgfiles, list(config.ambiguous))
     return config
+
+
+def fingerprint(value):
+    """a hashable representation of a config, for detecting changes
+
+    values other than dicts, sequences, strings and numbers are represented
+    by their repr
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, fingerprint(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(fingerprint(v) for v in value)
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return repr(value)
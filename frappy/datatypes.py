@@ -26,20 +26,26 @@
 
 import sys
 import ast
+import json
+import weakref
 from base64 import b64decode, b64encode
+from functools import lru_cache
 
 from frappy.errors import ConfigError, ProgrammingError, \
     RangeError, WrongTypeError
-from frappy.lib import clamp, generalConfig
+from frappy.lib import clamp, lazy_import, generalConfig
 from frappy.lib.enum import Enum
 from frappy.properties import HasProperties, Property
 
+np = lazy_import('numpy')
+
 generalConfig.set_default('lazy_number_validation', False)
 
 # *DEFAULT* limits for IntRange/ScaledIntegers transport serialisation
 DEFAULT_MIN_INT = -16777216
 DEFAULT_MAX_INT = 16777216
 UNLIMITED = 1 << 64  # internal limit for integers, is probably high enough for any datatype size
+MAX_EXACT_INT = 1 << 53  # integers up to this size are represented exactly as float
 
 
 def shortrepr(value):
@@ -53,6 +59,27 @@ def shortrepr(value):
     return r
 
 
+class ExportedArray(list):
+    """an exported numeric array, serialised as list by json
+
+    the numpy array is kept in .raw, for binary transport
+    """
+    def __init__(self, raw):
+        super().__init__(raw.tolist())
+        self.raw = raw
+
+
+class ExportedBlob(str):
+    """an exported blob, serialised as base64 string by json
+
+    the bytes are kept in .raw, for binary transport
+    """
+    def __new__(cls, raw):
+        obj = super().__new__(cls, b64encode(raw).decode('ascii'))
+        obj.raw = raw
+        return obj
+
+
 class SimpleDataType(HasProperties):
     """base class for simple datatypes, used in properties only"""
     default = None
@@ -135,6 +162,9 @@ class DataType(SimpleDataType):
     IS_COMMAND = False
     unit = ''
     client = False  # used on the client side
+    shared = False  # True: returned by get_shared_datatype, must not be modified
+    compile_owners = ()  # containers using the compiled functions of this datatype
+    _compiled = None  # dict <method name> of function
 
     def import_value(self, value):
         """opposite of export_value, reformat from transport to internal repr
@@ -144,6 +174,68 @@ class DataType(SimpleDataType):
         """
         return self(value)
 
+    def propertyChange(self, key):
+        if self.shared:
+            raise ProgrammingError(f'can not modify shared datatype {self!r}, use a copy')
+        self._invalidate()
+
+    def _invalidate(self):
+        """drop the compiled functions, also of the containers composed of them"""
+        self._compiled = None
+        for owner in list(self.compile_owners):
+            owner._invalidate()
+
+    def setProperty(self, key, value):
+        self.propertyChange(key)
+        super().setProperty(key, value)
+
+    def compiled(self, method):
+        """get a fast version of a method for use in hot paths
+
+        :param method: '__call__', 'validate', 'import_value' or 'export_value'
+        :return: a function behaving like the method
+
+        the function is created by compile_<method> (with leading and
+        trailing underscores stripped), with the properties captured in a
+        closure. after any property change, it is created again
+        """
+        cache = self._compiled
+        if cache is None:
+            cache = self._compiled = {}
+        func = cache.get(method)
+        if func is None:
+            func = cache[method] = self._compile(method)
+        return func
+
+    def _compiled_member(self, member, method):
+        """get the compiled method of a member, for composing a container function
+
+        the container is invalidated on property changes of the member
+        """
+        if not isinstance(member.compile_owners, weakref.WeakSet):
+            member.compile_owners = weakref.WeakSet()
+        member.compile_owners.add(self)
+        return member.compiled(method)
+
+    def _compile(self, method):
+        compiler = 'compile_' + method.strip('_')
+        for cls in type(self).__mro__:
+            if compiler in cls.__dict__:
+                return cls.__dict__[compiler](self)
+            if method in cls.__dict__:
+                break  # the method is overridden after the compiler
+        return getattr(self, method)
+
+    def compile_validate(self):
+        call = self.compiled('__call__')
+
+        def validate(value, previous=None):
+            return call(value)
+        return validate
+
+    def compile_import_value(self):
+        return self.compiled('__call__')
+
     def format_value(self, value, unit=True):
         """format a value of this type into a string
 
@@ -210,7 +302,8 @@ class Stub(DataType):
         to be called after all involved datatypes are defined
         """
         for dtcls in globals().values():
-            if isinstance(dtcls, type) and issubclass(dtcls, DataType):
+            # isinstance(dtcls, type) would trigger the lazy import of numpy
+            if issubclass(type(dtcls), type) and issubclass(dtcls, DataType):
                 for prop in dtcls.propertyDict.values():
                     stub = prop.datatype
                     if isinstance(stub, cls):
@@ -295,6 +388,58 @@ class FloatRange(HasUnit, DataType):
         """returns a python object fit for serialisation"""
         return float(value)
 
+    def compile_call(self):
+        fmax = sys.float_info.max
+
+        def call(value):
+            try:
+                value += 0.0
+            except Exception:
+                return self(value)  # lazy number validation or error
+            if -fmax <= value <= fmax:
+                return value
+            return self(value)  # infinite or NaN
+        return call
+
+    def compile_validate(self):
+        call = self.compile_call()
+        fmin, fmax = self.min, self.max
+        relres, absres = self.relative_resolution, self.absolute_resolution
+
+        def validate(value, previous=None):
+            value = call(value)
+            prec = max(abs(value * relres), absres)
+            if fmin - prec <= value <= fmax + prec:
+                return fmin if value < fmin else fmax if value > fmax else value
+            return self.validate(value)  # raise error
+        return validate
+
+    def compile_export_value(self):
+        return float
+
+    # vectorised versions of the methods above, used by ArrayOf
+    # they return None when the element-wise methods have to be used,
+    # for example for raising the appropriate error
+
+    def _array_call(self, arr):
+        if np.isnan(arr).any():
+            return None
+        return np.clip(arr.astype(float), -sys.float_info.max, sys.float_info.max)
+
+    def _array_validate(self, arr):
+        arr = self._array_call(arr)
+        if arr is None:
+            return None
+        prec = np.maximum(np.abs(arr * self.relative_resolution), self.absolute_resolution)
+        with np.errstate(over='ignore'):
+            inrange = np.all((self.min - prec <= arr) & (arr <= self.max + prec))
+        return np.clip(arr, self.min, self.max) if inrange else None
+
+    def _array_export(self, arr):
+        return arr.astype(float)
+
+    _array_import = _array_call
+
     def format_value(self, value, unit=True):
         if unit is True:
             unit = self.unit
@@ -369,6 +514,40 @@ class IntRange(DataType):
         """returns a python object fit for serialisation"""
         return int(value)
 
+    def compile_validate(self):
+        imin, imax = self.min, self.max
+
+        def validate(value, previous=None):
+            value = self(value)
+            if imin <= value <= imax:
+                return value
+            return self.validate(value)  # raise error
+        return validate
+
+    def compile_export_value(self):
+        return int
+
+    def _array_call(self, arr):
+        if arr.dtype.kind == 'f':
+            if not np.all((np.abs(arr) < MAX_EXACT_INT) & (arr == np.rint(arr))):
+                return None  # not whole numbers, or too big
+        elif arr.dtype.kind == 'u' and arr.dtype.itemsize == 8:
+            return None  # might not fit into int64
+        return arr.astype(np.int64)
+
+    def _array_validate(self, arr):
+        arr = self._array_call(arr)
+        if arr is not None and np.all((max(self.min, -1 << 63) <= arr) & (arr <= min(self.max, (1 << 63) - 1))):
+            return arr
+        return None
+
+    def _array_export(self, arr):
+        if arr.dtype.kind == 'f':
+            return None
+        return self._array_call(arr)
+
+    _array_import = _array_call
+
     def format_value(self, value, unit=True):
         return f'{value}'
 
@@ -486,6 +665,61 @@ class ScaledInteger(HasUnit, DataType):
         except Exception:
             raise WrongTypeError(f'can not import {shortrepr(value)} to scaled') from None
 
+    def compile_call(self):
+        scale = self.scale
+
+        def call(value):
+            try:
+                value += 0.0
+            except Exception:
+                return self(value)  # lazy number validation or error
+            return float(int(round(value / scale)) * scale)
+        return call
+
+    def compile_validate(self):
+        call = self.compile_call()
+        scale, smin, smax = self.scale, self.min, self.max
+        low, high = call(smin), call(smax)
+
+        def validate(value, previous=None):
+            result = call(value)
+            if smin - scale < value < smax + scale:
+                return low if result < low else high if result > high else result
+            return self.validate(value)  # raise error
+        return validate
+
+    def compile_export_value(self):
+        scale = self.scale
+
+        def export_value(value):
+            return int(round(value / scale))
+        return export_value
+
+    def _array_intval(self, arr):
+        intval = np.rint(arr.astype(float) / self.scale)
+        if np.all(np.abs(intval) < MAX_EXACT_INT):  # False also for NaN
+            return intval
+        return None
+
+    def _array_call(self, arr):
+        intval = self._array_intval(arr)
+        return None if intval is None else intval * self.scale
+
+    def _array_validate(self, arr):
+        result = self._array_call(arr)
+        if result is not None and np.all((self.min - self.scale < arr) & (arr < self.max + self.scale)):
+            return np.clip(result, self(self.min), self(self.max))
+        return None
+
+    def _array_export(self, arr):
+        intval = self._array_intval(arr)
+        return None if intval is None else intval.astype(np.int64)
+
+    def _array_import(self, arr):
+        if arr.dtype.kind == 'f' or not np.all(np.abs(arr) < MAX_EXACT_INT):
+            return None
+        return self.scale * arr.astype(float)
+
     def format_value(self, value, unit=True):
         if unit is True:
             unit = self.unit
@@ -609,10 +843,12 @@ class BLOBType(DataType):
 
     def export_value(self, value):
         """returns a python object fit for serialisation"""
-        return b64encode(value).decode('ascii')
+        return ExportedBlob(value)
 
     def import_value(self, value):
         """returns a python object from serialisation"""
+        if isinstance(value, bytes):
+            return value  # from binary transport
         try:
             return b64decode(value)
         except Exception:
@@ -682,6 +918,16 @@ class StringType(DataType):
         """returns a python object fit for serialisation"""
         return f'{value}'
 
+    def compile_call(self):
+        minchars, maxchars, isUTF8 = self.minchars, self.maxchars, self.isUTF8
+
+        def call(value):
+            if (isinstance(value, str) and minchars <= len(value) <= maxchars
+                    and (isUTF8 or value.isascii()) and '\0' not in value):
+                return value
+            return self(value)  # raise error
+        return call
+
     def format_value(self, value, unit=True):
         return repr(value)
 
@@ -773,6 +1019,8 @@ class ArrayOf(DataType):
                       default=0)
     maxlen = Property('maximum number of elements', IntRange(0, UNLIMITED), extname='maxlen',
                       mandatory=True)
+    # arrays of at least this size with numeric members are processed with numpy
+    vectorise_minlen = 32
 
     def __init__(self, members, minlen=0, maxlen=None):
         super().__init__()
@@ -832,9 +1080,32 @@ class ArrayOf(DataType):
         except TypeError:
             raise WrongTypeError(f'{type(value).__name__} can not be converted to ArrayOf DataType') from None
 
+    def _vectorised(self, method, value):
+        """apply the vectorised version of a method of the members
+
+        :param method: the name of the vectorised method
+        :param value: the array
+        :return: a numpy array or None when the element-wise method has to be used
+        """
+        func = getattr(self.members, method, None)
+        if func is None or not np:
+            return None
+        try:
+            if len(value) < self.vectorise_minlen:
+                return None
+            arr = np.asarray(value)
+        except Exception:
+            return None
+        if arr.ndim != 1 or arr.dtype.kind not in 'biuf':
+            return None
+        return func(arr)
+
     def __call__(self, value):
         """accepts any sequence, converts to tuple (immutable!)"""
         self.check_type(value)
+        result = self._vectorised('_array_call', value)
+        if result is not None:
+            return tuple(result.tolist())
         try:
             return tuple(self.members(v) for v in value)
         except Exception as e:
@@ -843,6 +1114,9 @@ class ArrayOf(DataType):
 
     def validate(self, value, previous=None):
         self.check_type(value)
+        result = self._vectorised('_array_validate', value)
+        if result is not None:
+            return tuple(result.tolist())
         try:
             if previous:
                 return tuple(self.members.validate(v, p) for v, p in zip(value, previous))
@@ -854,12 +1128,56 @@ class ArrayOf(DataType):
     def export_value(self, value):
         """returns a python object fit for serialisation"""
         self.check_type(value)
+        result = self._vectorised('_array_export', value)
+        if result is not None:
+            return ExportedArray(result)
         return [self.members.export_value(elem) for elem in value]
 
     def import_value(self, value):
         """returns a python object from serialisation"""
+        result = self._vectorised('_array_import', value)
+        if result is not None:
+            return tuple(result.tolist())
         return tuple(self.members.import_value(elem) for elem in value)
 
+    def _compile_elements(self, method, resulttype=tuple, check=True):
+        """compose an array function from the compiled method of the members
+
+        anything not on the straight path (vectorised arrays, errors)
+        is delegated to the method
+        """
+        convert = self._compiled_member(self.members, method)
+        minlen, maxlen = (self.minlen, self.maxlen) if check else (0, UNLIMITED)
+        if np and hasattr(self.members, '_array_call'):
+            vectorise_minlen = self.vectorise_minlen
+        else:
+            vectorise_minlen = UNLIMITED
+        maxlen = min(maxlen, vectorise_minlen - 1)
+        slow = getattr(self, method)
+
+        def func(value, previous=None):
+            if previous:
+                return slow(value, previous)
+            try:
+                if minlen <= len(value) <= maxlen:
+                    return resulttype([convert(v) for v in value])
+            except Exception:
+                pass
+            return slow(value)
+        return func
+
+    def compile_call(self):
+        return self._compile_elements('__call__')
+
+    def compile_validate(self):
+        return self._compile_elements('validate')
+
+    def compile_export_value(self):
+        return self._compile_elements('export_value', list)
+
+    def compile_import_value(self):
+        return self._compile_elements('import_value', check=False)
+
     def format_value(self, value, unit=True):
         innerunit = False
         if unit is True:
@@ -950,6 +1268,41 @@ class TupleOf(DataType):
         """returns a python object from serialisation"""
         return tuple(sub.import_value(elem) for sub, elem in zip(self.members, value))
 
+    def _compile_members(self, method, resulttype=tuple, check=True):
+        """compose a tuple function from the compiled methods of the members
+
+        errors are handled by the method
+        """
+        funcs = tuple(self._compiled_member(m, method) for m in self.members)
+        size = len(funcs)
+        slow = getattr(self, method)
+        if resulttype is list:
+            resulttype = None  # avoid copying the list
+
+        def func(value, previous=None):
+            if previous is not None:
+                return slow(value, previous)
+            try:
+                if not check or len(value) == size:
+                    result = [f(v) for f, v in zip(funcs, value)]
+                    return resulttype(result) if resulttype else result
+            except Exception:
+                pass
+            return slow(value)
+        return func
+
+    def compile_call(self):
+        return self._compile_members('__call__')
+
+    def compile_validate(self):
+        return self._compile_members('validate')
+
+    def compile_export_value(self):
+        return self._compile_members('export_value', list)
+
+    def compile_import_value(self):
+        return self._compile_members('import_value', check=False)
+
     def format_value(self, value, unit=True):
         return f"({', '.join([sub.format_value(elem, unit) for sub, elem in zip(self.members, value)])})"
 
@@ -1062,6 +1415,84 @@ class StructOf(DataType):
         return {str(k): self.members[k].import_value(v)
                 for k, v in value.items()}
 
+    def _compile_check(self, allow_optional=False):
+        """compile check_type with precomputed member sets
+
+        returns a function returning the value as a dict, the checks
+        of the slow path are done only when the fast one fails
+        """
+        names = frozenset(self.members)
+        if self.client or allow_optional:
+            mandatory = names - frozenset(self.optional)
+        else:
+            mandatory = names
+        check_type = self.check_type
+
+        def check(value):
+            if isinstance(value, dict):
+                keys = value.keys()
+                if keys <= names and mandatory <= keys:
+                    return value
+            check_type(value, allow_optional)  # raises an error in most cases
+            return dict(value)
+        return check
+
+    def _compile_items(self, method):
+        """precomputed list of (name, compiled method) in member order"""
+        return [(k, self._compiled_member(m, method)) for k, m in self.members.items()]
+
+    def compile_call(self):
+        items = self._compile_items('__call__')
+        check = self._compile_check()
+
+        def call(value):
+            value = check(value)
+            try:
+                result = {}
+                for key, func in items:
+                    val = value.get(key)
+                    if val is not None:
+                        result[key] = func(val)
+                return ImmutableDict(result)
+            except Exception:
+                return self(value)  # raise error
+        return call
+
+    def compile_validate(self):
+        items = self._compile_items('validate')
+        check = self._compile_check(True)
+
+        def validate(value, previous=None):
+            value = check(value)
+            try:
+                result = dict(previous or {})
+                for key, func in items:
+                    val = value.get(key)
+                    if val is not None:
+                        result[key] = func(val)
+                return ImmutableDict(result)
+            except Exception:
+                return self.validate(value, previous)  # raise error
+        return validate
+
+    def compile_export_value(self):
+        items = self._compile_items('export_value')
+        check = self._compile_check()
+
+        def export_value(value):
+            value = check(value)
+            return {key: func(value[key]) for key, func in items if key in value}
+        return export_value
+
+    def compile_import_value(self):
+        items = self._compile_items('import_value')
+        check = self._compile_check(True)
+
+        def import_value(value):
+            value = check(value)
+            return {key: func(value[key]) for key, func in items if key in value}
+        return import_value
+
     def format_value(self, value, unit=True):
         if unit is False:
             return '{%s}' % (', '.join(['%r: %s' % (k, self.members[k].format_value(v, False))
@@ -1339,6 +1770,32 @@ class StatusType(TupleOf):
     def __getattr__(self, key):
         return self.enum[key]
 
+    status_cache_size = 256  # max. number of cached exported status values
+
+    def compile_export_value(self):
+        """status values are exported on every change, but are mostly the same
+
+        keep the exported form of the recent values. The returned lists are
+        shared and must not be modified
+        """
+        export = super().compile_export_value()
+        cache = {}
+        maxsize = self.status_cache_size
+
+        def export_value(value):
+            try:
+                return cache[value]
+            except KeyError:
+                pass
+            except TypeError:  # not hashable, e.g. a list
+                return export(value)
+            result = export(value)
+            if len(cache) >= maxsize:
+                cache.clear()
+            cache[value] = result
+            return result
+        return export_value
+
 
 def floatargs(kwds):
     return {k: v for k, v in kwds.items() if k in
@@ -1402,3 +1859,43 @@ def get_datatype(json, pname=''):
         return datatype
     except Exception as e:
         raise WrongTypeError(f'invalid data descriptor: {json!r} ({str(e)})') from None
+
+
+def _mark_shared(datatype):
+    if datatype is None:
+        return
+    datatype.shared = True
+    if isinstance(datatype, CommandType):
+        members = datatype.argument, datatype.result
+    else:
+        members = getattr(datatype, 'members', ())
+        if isinstance(members, DataType):
+            members = [members]
+        elif isinstance(members, dict):
+            members = members.values()
+    for member in members:
+        _mark_shared(member)
+
+
+@lru_cache(maxsize=1024)
+def _get_shared_datatype(key, pname):
+    datatype = get_datatype(json.loads(key), pname)
+    _mark_shared(datatype)
+    return datatype
+
+
+def get_shared_datatype(datainfo, pname=''):
+    """like get_datatype, but returns the same instance for equal datainfo
+
+    intended for clients, where the same datainfo (e.g. for status) appears
+    many times. the returned datatype must not be modified, use a copy for this
+    """
+    if datainfo is None:
+        return None
+    try:
+        key = json.dumps(datainfo, sort_keys=True)
+    except TypeError:
+        return get_datatype(datainfo, pname)  # raise the appropriate error
+    if '"enum"' not in key:
+        pname = ''  # pname is used for naming enums only
+    return _get_shared_datatype(key, pname)
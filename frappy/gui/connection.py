@@ -20,25 +20,40 @@
 #
 # *****************************************************************************
 
-from frappy.gui.qt import QObject, pyqtSignal
+import threading
+
+from frappy.gui.qt import QObject, QTimer, pyqtSignal
 
 import frappy.client
+from frappy.errors import SECoPError
+from frappy.lib import mkthread
 
 
 class QSECNode(QObject):
     newData = pyqtSignal(str, str, object)  # module, parameter, data
+    newDataBatch = pyqtSignal(object)  # dict <(module, parameter)> of data
+    newDataSeries = pyqtSignal(object)  # dict <(module, parameter)> of list of data
     stateChange = pyqtSignal(str, bool, str)  # node name, online, connection state
     unhandledMsg = pyqtSignal(str)  # message
     descriptionChanged = pyqtSignal(str, object) # contactpoint, self
     logEntry = pyqtSignal(str)
+    historyData = pyqtSignal(str, str, object)  # module, parameter, history
+    update_interval = 40  # ms, updates are collected and emitted at most once per interval
 
-    def __init__(self, uri, parent_logger, parent=None):
+    def __init__(self, uri, parent_logger, parent=None, description_cache=None):
         super().__init__(parent)
+        self._pending = {}  # dict <(module, parameter)> of list of updates, not yet emitted
+        self._pendingLock = threading.Lock()
+        self._flushTimer = QTimer(self)
+        self._flushTimer.timeout.connect(self.flushUpdates)
+        self._flushTimer.start(self.update_interval)
         self.log = parent_logger.getChild(uri)
-        self.conn = conn = frappy.client.SecopClient(uri, self.log)
+        self.conn = conn = frappy.client.SecopClient(uri, self.log, description_cache)
         conn.validate_data = True
         self.contactPoint = conn.uri
-        conn.connect()
+        cached = conn.load_cached_description()
+        if not cached:
+            conn.connect()
         self.equipmentId = conn.properties['equipment_id']
         self.log.info('Switching to logger %s', self.equipmentId)
         self.log.name = '.'.join((parent_logger.name, self.equipmentId))
@@ -49,6 +64,9 @@ class QSECNode(QObject):
         self.log.debug('SECoP Version: %s', conn.secop_version)
         conn.register_callback(None, self.updateItem, self.nodeStateChange,
                                self.unhandledMessage, self.descriptiveDataChange)
+        if cached:
+            # revalidate in the background, descriptionChanged is emitted on changes
+            conn.spawn_connect()
 
     # provide methods from old baseclient for making other gui code work
     def reconnect(self):
@@ -77,6 +95,28 @@ class QSECNode(QObject):
     def getParameter(self, module, parameter):
         return self.conn.getParameter(module, parameter, True)
 
+    def queryHistory(self, module, parameter, start=None, end=None, buckets=1000):
+        return self.conn.queryHistory(module, parameter, start, end, buckets)
+
+    def requestHistory(self, module, parameter, start=None, end=None, buckets=1000):
+        """query the history in the background
+
+        historyData is emitted with the result, not when the history is
+        not available
+        """
+        mkthread(self._requestHistory, module, parameter, start, end, buckets)
+
+    def _requestHistory(self, module, parameter, start, end, buckets):
+        try:
+            history = self.conn.queryHistory(module, parameter, start, end, buckets)
+        except SECoPError as e:
+            self.log.debug('no history for %s:%s: %r', module, parameter, e)
+            return
+        except (ConnectionError, TimeoutError, OSError) as e:
+            self.log.warning('can not get history for %s:%s: %r', module, parameter, e)
+            return
+        self.historyData.emit(module, parameter, history)
+
     def execCommand(self, module, command, argument):
         return self.conn.execCommand(module, command, argument)
 
@@ -98,7 +138,25 @@ class QSECNode(QObject):
         return self.modules[module]['parameters'][parameter]
 
     def updateItem(self, module, parameter, item):
-        self.newData.emit(module, parameter, item)
+        # called from the client thread
+        with self._pendingLock:
+            self._pending.setdefault((module, parameter), []).append(item)
+
+    def flushUpdates(self):
+        """emit the collected updates
+
+        newDataSeries gets all updates, e.g. for plots,
+        newDataBatch and newData only the latest item per parameter
+        """
+        with self._pendingLock:
+            if not self._pending:
+                return
+            series, self._pending = self._pending, {}
+        self.newDataSeries.emit(series)
+        batch = {key: items[-1] for key, items in series.items()}
+        self.newDataBatch.emit(batch)
+        for (module, parameter), item in batch.items():
+            self.newData.emit(module, parameter, item)
 
     def nodeStateChange(self, online, state):
         self.stateChange.emit(self.nodename, online, state)
@@ -112,4 +170,5 @@ class QSECNode(QObject):
         self.descriptionChanged.emit(self.contactPoint, self)
 
     def terminate_connection(self):
+        self._flushTimer.stop()
         self.conn.disconnect()
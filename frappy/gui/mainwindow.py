@@ -26,6 +26,7 @@ from frappy.gui.qt import QAction, QByteArray, QInputDialog, QKeySequence, \
     QWidget, pyqtSignal, pyqtSlot
 
 import frappy.version
+from frappy.client import DescriptionCache
 from frappy.gui.connection import QSECNode
 from frappy.gui.logwindow import LogWindow, LogWindowHandler
 from frappy.gui.nodewidget import NodeWidget
@@ -106,6 +107,8 @@ class MainWindow(QMainWindow):
         Colors._setPalette(self.palette())
 
         self._nodeWidgets = {}
+        # descriptions are cached on disk only with --cache, as in frappy-cli
+        self.descriptionCache = DescriptionCache() if args.cache else None
 
         if args.detailed:
             self.actionDetailed_View.setChecked(True)
@@ -229,7 +232,8 @@ class MainWindow(QMainWindow):
             self.tab.setCurrentWidget(prevWidget)
             return
         # create client
-        node = QSECNode(host, self.log, parent=self)
+        node = QSECNode(host, self.log, parent=self,
+                        description_cache=self.descriptionCache)
         nodeWidget = NodeWidget(node)
         nodeWidget.setParent(self)
         nodeWidget.consoleTextSent.connect(self.historySerializer.append)
@@ -147,7 +147,7 @@ class ModuleOverview(QTreeWidget):
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         # self.customContextMenuRequested.connect(self._contextMenu)
 
-        self._node.newData.connect(self._updateValue)
+        self._node.newDataBatch.connect(self._updateValues)
         self.currentItemChanged.connect(self.handleCurrentItemChanged)
         #self.itemDoubleClicked.connect(self.handleDoubleClick)
 
@@ -187,8 +187,9 @@ class ModuleOverview(QTreeWidget):
                 continue
             module.valueChanged('status', cache['status'])
 
-    def _updateValue(self, module, parameter, value):
-        self._modules[module].valueChanged(parameter, value)
+    def _updateValues(self, batch):
+        for (module, parameter), value in batch.items():
+            self._modules[module].valueChanged(parameter, value)
 
     def _rebuildAdvanced(self, advanced):
         self.setRootIsDecorated(advanced)
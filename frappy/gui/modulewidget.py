@@ -252,7 +252,7 @@ class ModuleWidget(QWidget):
         for param, val in cache.items():
             self._updateValue(self._name, param, val)
 
-        node.newData.connect(self._updateValue)
+        node.newDataBatch.connect(self._updateValues)
 
     def _initModuleInfo(self):
         props = dict(self._node.getModuleProperties(self._name))
@@ -295,6 +295,11 @@ class ModuleWidget(QWidget):
         if param in self._paramDisplays:
             self._paramDisplays[param].setText(val.formatted())
 
+    def _updateValues(self, batch):
+        for (mod, param), val in batch.items():
+            if mod == self._name and param in self._paramDisplays:
+                self._paramDisplays[param].setText(val.formatted())
+
     def _addParam(self, param, row):
         paramProps = self._node.getProperties(self._name, param)
         if paramProps['readonly']:
@@ -22,12 +22,14 @@
 
 import time
 
-from frappy.gui.qt import QLabel, Qt, QVBoxLayout, QWidget, pyqtSignal
+from frappy.gui.qt import QComboBox, QHBoxLayout, QLabel, Qt, QVBoxLayout, \
+    QWidget, pyqtSignal
 
 from frappy.gui.util import Colors
 from frappy.lib import delayed_import
+from frappy.lib.downsample import curve_period, downsample
+from frappy.lib.ringbuffer import RingBuffer
 
-np = delayed_import('numpy')
 pg = delayed_import('pyqtgraph')
 
 
@@ -67,22 +69,38 @@ class PlotPlaceHolderWidget(QWidget):
     def update(self, module, param, value):
         pass
 
+    def updateSeries(self, series):
+        pass
+
     def closeEvent(self, event):
         self.closed.emit(self)
         event.accept()
 
+
+MAX_POINTS = 100000  # maximum number of points kept per curve
+TIME_WINDOWS = [('all', None), ('10 min', 600), ('1 hour', 3600),
+                ('6 hours', 6 * 3600), ('1 day', 24 * 3600)]
+BACKFILL_BUCKETS = 2000  # number of points for the history from the SEC node
+PLOT_POINTS = 4000  # maximum number of points passed to a curve
+
+
 # TODO:
-# - timer-based updates when receiving no updates from the node
-#   in order to make slower updates not jump that much?
 # - remove curves again
 class PlotWidget(QWidget):
     closed = pyqtSignal(object)
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, maxpoints=MAX_POINTS):
         super().__init__(parent)
         self.win = pg.GraphicsLayoutWidget()
         self.curves = {}
-        self.data = {}
+        self.tails = {}  # horizontal lines from the last point to now
+        self.data = {}  # RingBuffer per curve
+        self.periods = {}  # period per curve, see frappy.lib.downsample
+        self.changed = set()  # names of curves to be redrawn
+        self.nodes = set()  # nodes connected to updateSeries
+        self.backfilling = set()  # names of curves waiting for the history
+        self.maxpoints = maxpoints
+        self.timeWindow = None
         self.timer = pg.QtCore.QTimer()
         self.timer.timeout.connect(self.scrollUpdate)
 
@@ -94,7 +112,17 @@ class PlotWidget(QWidget):
         self.plot.setAxisItems({'bottom': pg.DateAxisItem()})
         self.plot.setLabel('bottom', 'Time')
         self.plot.setLabel('left', 'Value')
+        self.windowCombo = QComboBox()
+        for label, _ in TIME_WINDOWS:
+            self.windowCombo.addItem(label)
+        self.windowCombo.currentIndexChanged.connect(
+            lambda idx: self.setTimeWindow(TIME_WINDOWS[idx][1]))
+        hl = QHBoxLayout()
+        hl.addWidget(QLabel('Time window:'))
+        hl.addWidget(self.windowCombo)
+        hl.addStretch()
         l = QVBoxLayout()
+        l.addLayout(hl)
         l.addWidget(self.win)
         self.setLayout(l)
 
@@ -108,32 +136,80 @@ class PlotWidget(QWidget):
         if 'min' in paramData and 'max' in paramData:
             curve.setXRange(paramData['min'], paramData['max'])
 
-        curve.setDownsampling(method='peak')
-        self.data[name] = (np.array([]),np.array([]))
+        # decimate to the resolution of the view, draw only visible points
+        curve.setDownsampling(auto=True, method='peak')
+        curve.setClipToView(True)
+        self.data[name] = RingBuffer(self.maxpoints)
+        self.periods[name] = curve_period(param, paramData['datatype'])
         self.curves[name] = curve
-        node.newData.connect(self.update)
+        self.tails[name] = self.plot.plot()
+        if node not in self.nodes:
+            self.nodes.add(node)
+            node.newDataSeries.connect(self.updateSeries)
+            node.historyData.connect(self.backfill)
+        # fill in the history recorded on the SEC node, if available
+        self.backfilling.add(name)
+        node.requestHistory(module, param, time.time() - TIME_WINDOWS[-1][1],
+                            None, BACKFILL_BUCKETS)
+
+    def backfill(self, module, param, history):
+        """insert the history from the SEC node before the live data"""
+        name = f'{module}:{param}'
+        if name not in self.backfilling:
+            return  # requested by an other plot
+        self.backfilling.discard(name)
+        data = self.data[name]
+        live = data.get()
+        first = live[0][0] if len(live[0]) else float('inf')
+        data.clear()
+        for t, value in zip(history['t'], history['mean']):
+            if t >= first:
+                break
+            data.append(t, float('nan') if value is None else value)
+        for t, value in zip(*live):
+            data.append(t, value)
+        self.changed.add(name)
 
     def setCurveColor(self, module, param, color):
-        curve = self.curves[f'{module}:{param}']
-        curve.setPen(color)
+        name = f'{module}:{param}'
+        self.curves[name].setPen(color)
+        self.tails[name].setPen(color)
+
+    def setTimeWindow(self, seconds):
+        """show only the last <seconds>, None: show all"""
+        self.timeWindow = seconds
+        self.changed.update(self.curves)
+        if seconds is None:
+            self.plot.enableAutoRange(x=True)
 
     def scrollUpdate(self):
-        for cname, curve in self.curves.items():
-            x,y = self.data[cname]
-            x = np.append(x, time.time())
-            y = np.append(y, y[-1])
-            curve.setData(x,y)
+        now = time.time()
+        start = None if self.timeWindow is None else now - self.timeWindow
+        for name in self.changed:
+            self.curves[name].setData(*downsample(
+                *self.data[name].get(start), PLOT_POINTS, self.periods[name]))
+        self.changed.clear()
+        # extend all curves up to now, without redrawing the full curve
+        for name, tail in self.tails.items():
+            last = self.data[name].last()
+            if last:
+                tail.setData([last[0], now], [last[1], last[1]])
+        if start is not None:
+            self.plot.setXRange(start, now, padding=0)
 
     def update(self, module, param, value):
         name = f'{module}:{param}'
         if name not in self.curves:
             return
-        curve = self.curves[name]
-        x,y = self.data[name]
-        x = np.append(x, value.timestamp)
-        y = np.append(y, float(value.value))
-        self.data[name] = (x,y)
-        curve.setData(x,y)
+        # the curve is redrawn by the next scrollUpdate
+        self.data[name].append(value.timestamp,
+                               float('nan') if value.readerror else float(value.value))
+        self.changed.add(name)
+
+    def updateSeries(self, series):
+        for (module, param), values in series.items():
+            for value in values:
+                self.update(module, param, value)
 
     def closeEvent(self, event):
         self.closed.emit(self)
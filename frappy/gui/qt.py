@@ -33,7 +33,7 @@ from xml.sax.saxutils import escape as toHtmlEscaped
 try:
     from PyQt6 import uic
     from PyQt6.QtCore import QByteArray, QEvent, QMimeData, QObject, QPoint, \
-        QPointF, QPropertyAnimation, QRectF, QSettings, QSize, Qt, \
+        QPointF, QPropertyAnimation, QRectF, QSettings, QSize, Qt, QTimer, \
         pyqtProperty, pyqtSignal, pyqtSlot
     from PyQt6.QtGui import QAction, QBrush, QColor, QCursor, QDrag, QFont, \
         QFontMetrics, QIcon, QKeyEvent, QKeySequence, QMouseEvent, QPainter, \
@@ -53,7 +53,7 @@ try:
 except ImportError as e:
     from PyQt5 import uic
     from PyQt5.QtCore import QByteArray, QEvent, QMimeData, QObject, QPoint, \
-        QPointF, QPropertyAnimation, QRectF, QSettings, QSize, Qt, \
+        QPointF, QPropertyAnimation, QRectF, QSettings, QSize, Qt, QTimer, \
         pyqtProperty, pyqtSignal, pyqtSlot
     from PyQt5.QtGui import QBrush, QColor, QCursor, QDrag, QFont, \
         QFontMetrics, QIcon, QKeyEvent, QKeySequence, QMouseEvent, QPainter, \
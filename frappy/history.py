@@ -0,0 +1,238 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""built-in history
+
+The history is stored in <directory>/<module>/<parameter>/ in chunks of
+generalConfig.history_chunk seconds. Each chunk consists of two append-only
+files <chunk start>.t and <chunk start>.v, containing the timestamps and
+the values as float64 numbers in native byte order. NaN marks an undefined
+value, e.g. after an error update.
+
+Only numeric parameters are stored. Members of tuples and structs are stored
+as separate curves named <parameter>.<member>.
+
+The writer is used like a connection of the dispatcher. Updates are put into
+a queue and written by a background thread every generalConfig.history_interval
+seconds. Use HistoryReader for retrieving the data, or HistoryWriter.query for
+data decimated to time buckets, as used for the '_history' request.
+"""
+
+import os
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from queue import SimpleQueue
+
+from frappy.datatypes import BoolType, EnumType, FloatRange, IntRange, \
+    ScaledInteger, StructOf, TupleOf, get_datatype
+from frappy.errors import NoSuchParameterError
+from frappy.lib import generalConfig, mkthread
+from frappy.lib.downsample import bucket_stats, curve_period, expand_period
+
+generalConfig.set_default('history_interval', 1.0)
+generalConfig.set_default('history_chunk', 24 * 3600)
+
+NAN = float('nan')
+
+
+def make_curves(dt, key):
+    """create the conversion list for a datatype
+
+    :return: a list of tuple (<conversion function>, <curve key>, <datatype>)
+    """
+    if isinstance(dt, (EnumType, IntRange, BoolType, FloatRange)):
+        return [(float, key, dt)]
+    if isinstance(dt, ScaledInteger):
+        return [(dt.import_value, key, dt)]
+    if isinstance(dt, TupleOf):
+        items = enumerate(dt.members)
+    elif isinstance(dt, StructOf):
+        items = dt.members.items()
+    else:
+        return []  # strings, arrays, blobs are not stored
+    result = []
+    for subkey, elmtype in items:
+        for fun, subcurve, subtype in make_curves(elmtype, f'{key}.{subkey}'):
+            result.append((lambda v, k=subkey, f=fun: f(v[k]), subcurve, subtype))
+    return result
+
+
+class HistoryWriter:
+    """built-in history writer, to be used as a connection of the dispatcher"""
+
+    def __init__(self, directory, dispatcher, log):
+        self.directory = Path(directory)
+        self.dispatcher = dispatcher
+        self.log = log
+        self.curves = {}  # dict <module:parameter> of list of (<function>, <curve key>, <datatype>)
+        self.last = {}  # dict <curve key> of last timestamp
+        self.periods = {}  # dict <curve key> of period, see frappy.lib.downsample
+        self.queue = SimpleQueue()
+        self.thread = None
+
+    def init(self, msg):
+        """initialize from the 'describing' message and activate updates"""
+        _, _, description = msg
+        for modname, moddesc in description['modules'].items():
+            for pname, pdesc in moddesc['accessibles'].items():
+                if 'datainfo' not in pdesc or 'arguments' in pdesc['datainfo']:
+                    continue  # commands
+                key = f'{modname}:{pname}'
+                self.curves[key] = make_curves(get_datatype(pdesc['datainfo']), key)
+                for _, curve, dt in self.curves[key]:
+                    self.periods[curve] = curve_period(pname, dt)
+        self.thread = mkthread(self.run)
+        self.dispatcher.handle_activate(self, None, None)
+
+    def query(self, key, start, end, buckets):
+        """get the decimated history of a curve
+
+        :param key: '<module>:<parameter>[.<member>]', with exported names
+        :return: see frappy.lib.downsample.bucket_stats
+        """
+        if key not in self.periods:
+            raise NoSuchParameterError(f'no history for {key!r}')
+        times, values = HistoryReader(self.directory).get(key, start, end)
+        return bucket_stats(*expand_period(times, values, self.periods[key]), start, end, buckets)
+
+    def send_reply(self, msg):
+        """called by the dispatcher, the message is handled by the writer thread"""
+        self.queue.put(msg)
+
+    def close(self):
+        """write pending data and stop the writer thread"""
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        running = True
+        while running:
+            msgs = [self.queue.get()]
+            time.sleep(generalConfig.history_interval)  # collect updates
+            while not self.queue.empty():
+                msgs.append(self.queue.get())
+            if None in msgs:
+                running = False
+            try:
+                self.write(self.convert(m for m in msgs if m))
+            except Exception as e:
+                self.log.error('can not write history: %r', e)
+
+    def convert(self, msgs):
+        """convert update messages
+
+        :return: dict <curve key> of list of (<timestamp>, <value>)
+        """
+        points = {}
+        for action, ident, data in msgs:
+            curves = self.curves.get(ident)
+            if not curves:
+                continue
+            if action == 'update':
+                value, qualifiers = data[0], data[1]
+            elif action == 'error_update':
+                value, qualifiers = None, data[2]
+            else:
+                continue
+            tm = qualifiers.get('t') or time.time()
+            for fun, key, _ in curves:
+                try:
+                    converted = NAN if value is None else fun(value)
+                except Exception:
+                    converted = NAN
+                # timestamps within a curve must not decrease
+                tm = max(tm, self.last.get(key, 0))
+                self.last[key] = tm
+                points.setdefault(key, []).append((tm, converted))
+        return points
+
+    def write(self, points):
+        chunksize = generalConfig.history_chunk
+        for key, items in points.items():
+            modname, pname = key.split(':', 1)
+            curvedir = self.directory / modname / pname
+            chunks = {}
+            for tm, value in items:
+                times, values = chunks.setdefault(
+                    int(tm // chunksize * chunksize), (array('d'), array('d')))
+                times.append(tm)
+                values.append(value)
+            os.makedirs(curvedir, exist_ok=True)
+            for chunk, (times, values) in chunks.items():
+                with open(curvedir / f'{chunk}.t', 'ab') as tf, \
+                        open(curvedir / f'{chunk}.v', 'ab') as vf:
+                    # after a crash, one of the files might be longer
+                    size = min(tf.tell(), vf.tell())
+                    tf.truncate(size)
+                    vf.truncate(size)
+                    times.tofile(tf)
+                    values.tofile(vf)
+
+
+def read_array(filename):
+    result = array('d')
+    with open(filename, 'rb') as f:
+        data = f.read()
+    # ignore an incomplete number at the end
+    result.frombytes(data[:len(data) // result.itemsize * result.itemsize])
+    return result
+
+
+class HistoryReader:
+    """read access to the history written by HistoryWriter"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def keys(self):
+        """return the available curve keys '<module>:<parameter>[.<member>]'"""
+        return sorted(f'{curvedir.parent.name}:{curvedir.name}'
+                      for curvedir in self.directory.glob('*/*') if curvedir.is_dir())
+
+    def chunks(self, key):
+        """return the sorted list of chunk start times of a curve"""
+        curvedir = self.directory.joinpath(*key.split(':', 1))
+        return sorted(int(f.stem) for f in curvedir.glob('*.t'))
+
+    def get(self, key, start=None, end=None):
+        """get the data of a curve within a time range
+
+        :param key: the curve key
+        :param start, end: the time range, None: unlimited
+        :return: a tuple (<timestamps>, <values>) of arrays
+        """
+        curvedir = self.directory.joinpath(*key.split(':', 1))
+        chunks = self.chunks(key)
+        times = array('d')
+        values = array('d')
+        for i, chunk in enumerate(chunks):
+            if end is not None and chunk > end:
+                break
+            if start is not None and i + 1 < len(chunks) and chunks[i + 1] <= start:
+                continue
+            tchunk = read_array(curvedir / f'{chunk}.t')
+            vchunk = read_array(curvedir / f'{chunk}.v')
+            lo = 0 if start is None else bisect_left(tchunk, start)
+            hi = len(tchunk) if end is None else bisect_right(tchunk, end)
+            hi = min(hi, len(vchunk))  # after a crash, values might be missing
+            times.extend(tchunk[lo:hi])
+            values.extend(vchunk[lo:hi])
+        return times, values
@@ -57,7 +57,8 @@ class HasIO(Module):
             opts = {'uri': self.uri, 'description': f'communication device for {name}',
                     'visibility': 'expert'}
             ioname = self.ioDict.get(self.uri)
-            if not ioname:
+            if ioname not in srv.secnode.modules:
+                # not created yet, or not kept on a hot restart
                 ioname = opts.get('io') or f'{name}_io'
                 io = self.ioClass(ioname, srv.log.getChild(ioname), opts, srv)  # pylint: disable=not-callable
                 io.callingModule = []
@@ -177,7 +178,7 @@ class IOBase(Communicator):
                 self.log.error(self._last_error)
                 if not isinstance(e, CommunicationFailedError):
                     # when this happens on startup, assume it is not worth to continue
-                    self.secNode.error_count += 1
+                    self.secNode.countError()
             raise SilentError(repr(e)) from e
         return self.is_connected
 
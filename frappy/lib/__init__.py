@@ -23,6 +23,7 @@
 """Define helpers"""
 
 import importlib
+import importlib.util
 import linecache
 import re
 import socket
@@ -492,3 +493,27 @@ def delayed_import(modname):
     except Exception:
         return _Raiser(modname)
     return module
+
+
+def lazy_import(modname):
+    """Return a module, which is imported on first attribute access.
+
+    Intended for heavy modules like numpy, which are not needed by all
+    servers. Like with delayed_import, a missing module raises an exception
+    on access and evaluates to False.
+    """
+    module = sys.modules.get(modname)
+    if module is not None:
+        return module
+    try:
+        spec = importlib.util.find_spec(modname)
+    except ImportError:
+        spec = None
+    if spec is None:
+        return _Raiser(modname)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[modname] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,172 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""downsampling of time series, based on NumPy
+
+used for history queries and for plotting. timestamps must be sorted,
+NaN values indicate errors (gaps in the curve).
+
+The period of a curve is the typical lifetime of a value: points closer than
+period may be connected by a straight line, else the line is drawn horizontally
+from a point up to a point <period> before the next one. Period 0 gives a
+stepped curve (e.g. for a target), None a curve where all points are connected.
+The period of a parameter is given by curve_period, both for the history
+recorded on the SEC node and for plotting.
+"""
+
+from frappy.datatypes import BoolType, EnumType, IntRange
+from frappy.lib import lazy_import
+
+np = lazy_import('numpy')
+
+
+def curve_period(pname, datatype):
+    """return the period of the curve of a parameter or a member of it
+
+    targets and discrete values (enums, bools and integers) are drawn as
+    stepped curves, for all other curves the points are connected
+    """
+    if pname == 'target' or isinstance(datatype, (EnumType, BoolType, IntRange)):
+        return 0
+    return None
+
+
+def expand_period(t, v, period):
+    """insert points for drawing a curve with straight lines
+
+    for each gap longer than period, a point with the previous value is
+    inserted <period> before the next point
+    """
+    if period is None or len(t) < 2:
+        return t, v
+    t = np.asarray(t, dtype=float)
+    v = np.asarray(v, dtype=float)
+    gaps = np.flatnonzero(np.diff(t) > period)
+    if not len(gaps):
+        return t, v
+    return (np.insert(t, gaps + 1, t[gaps + 1] - period),
+            np.insert(v, gaps + 1, v[gaps]))
+
+
+def minmax(t, v, nbuckets):
+    """keep the points with the minimum and the maximum value per time bucket
+
+    the first error (NaN) of each sequence of errors is kept, so that gaps
+    remain visible. the result has at most 2 * nbuckets points, plus errors
+    """
+    if len(t) <= 2 * nbuckets:
+        return t, v
+    width = (t[-1] - t[0]) / nbuckets or 1
+    bucket = np.minimum(((t - t[0]) / width).astype(int), nbuckets - 1)
+    valid = ~np.isnan(v)
+    vi = np.flatnonzero(valid)
+    # indices of valid points, sorted by bucket, then by value
+    order = vi[np.lexsort((v[vi], bucket[vi]))]
+    newbucket = bucket[order[1:]] != bucket[order[:-1]]
+    first = order[np.concatenate(([True], newbucket))]
+    last = order[np.concatenate((newbucket, [True]))]
+    gapstart = np.flatnonzero(~valid & np.concatenate(([True], valid[:-1])))
+    idx = np.unique(np.concatenate((first, last, gapstart)))
+    return t[idx], v[idx]
+
+
+def lttb(t, v, npoints):
+    """largest triangle three buckets downsampling
+
+    keeps the visual shape of a curve with npoints points. within a bucket
+    containing errors, the first error is kept
+    """
+    n = len(t)
+    if npoints >= n or npoints < 3:
+        return t, v
+    # the first and the last point are kept, the others are divided into buckets
+    edges = np.linspace(1, n - 1, npoints - 1).astype(int)
+    edges = np.append(edges, n)
+    idx = np.empty(npoints, dtype=int)
+    idx[0] = 0
+    idx[-1] = n - 1
+    a = 0
+    for i in range(npoints - 2):
+        lo, hi = edges[i], edges[i + 1]
+        vb = v[lo:hi]
+        isnan = np.isnan(vb)
+        if isnan.any():
+            a = lo + np.argmax(isnan)
+        else:
+            # the average of the next bucket is the third corner of the triangle
+            nlo, nhi = edges[i + 1], edges[i + 2]
+            tavg = t[nlo:nhi].mean()
+            vavg = np.nanmean(v[nlo:nhi]) if not np.isnan(v[nlo:nhi]).all() else v[a]
+            area = np.abs((t[a] - tavg) * (vb - v[a]) - (t[a] - t[lo:hi]) * (vavg - v[a]))
+            a = lo + np.argmax(np.nan_to_num(area))
+        idx[i + 1] = a
+    return t[idx], v[idx]
+
+
+def downsample(t, v, npoints, period=None, method='minmax'):
+    """downsample a curve to about npoints points for plotting
+
+    :param t, v: the timestamps and values
+    :param npoints: the number of points of the result
+        (minmax: at most npoints points, plus errors)
+    :param period: see module doc, None: no points are inserted
+    :param method: 'minmax' or 'lttb'
+    """
+    t = np.asarray(t, dtype=float)
+    v = np.asarray(v, dtype=float)
+    t, v = expand_period(t, v, period)
+    if method == 'lttb':
+        return lttb(t, v, npoints)
+    if method == 'minmax':
+        return minmax(t, v, max(1, npoints // 2))
+    raise ValueError(f'unknown downsampling method {method!r}')
+
+
+def bucket_stats(t, v, start, end, nbuckets):
+    """reduce data to minimum, maximum and mean per time bucket
+
+    :param t, v: the timestamps and values
+    :param start, end: the time range to be divided into buckets
+    :param nbuckets: the number of buckets
+    :return: a dict with the lists 't' (the bucket start), 'min', 'max'
+        and 'mean'. Empty buckets are omitted. NaN values are ignored, a
+        bucket with NaN values only gives None.
+    """
+    t = np.asarray(t, dtype=float)
+    v = np.asarray(v, dtype=float)
+    width = (end - start) / nbuckets
+    if width <= 0:
+        return {'t': [], 'min': [], 'max': [], 'mean': []}
+    lo, hi = np.searchsorted(t, start, 'left'), np.searchsorted(t, end, 'right')
+    t = t[lo:hi]
+    v = v[lo:hi]
+    bucket = np.minimum(((t - start) / width).astype(int), nbuckets - 1)
+    buckets, first = np.unique(bucket, return_index=True)
+    result = {'t': (start + buckets * width).tolist()}
+    if not len(t):
+        result.update(min=[], max=[], mean=[])
+        return result
+    valid = ~np.isnan(v)
+    counts = np.add.reduceat(valid.astype(int), first)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.add.reduceat(np.where(valid, v, 0), first) / counts
+    for key, values in (('min', np.fmin.reduceat(v, first)),
+                        ('max', np.fmax.reduceat(v, first)),
+                        ('mean', mean)):
+        # None for buckets without valid values (JSON has no NaN)
+        result[key] = [None if c == 0 else x for c, x in zip(counts.tolist(), values.tolist())]
+    return result
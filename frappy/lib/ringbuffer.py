@@ -0,0 +1,94 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""fixed size ring buffer for time series, based on NumPy"""
+
+import threading
+
+from frappy.lib import lazy_import
+
+np = lazy_import('numpy')
+
+
+class RingBuffer:
+    """ring buffer of (timestamp, value) pairs with fixed size
+
+    appending is O(1), when full, the oldest points are overwritten.
+    timestamps must not decrease, a decreasing timestamp is replaced by the
+    previous one. This way, range queries are done by bisection.
+    values are stored as float, errors are typically stored as NaN
+    """
+
+    def __init__(self, maxlen):
+        self.maxlen = maxlen
+        self._t = np.zeros(maxlen)
+        self._v = np.zeros(maxlen)
+        self._pos = 0  # index for the next point
+        self._len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._len
+
+    def append(self, timestamp, value):
+        with self._lock:
+            pos = self._pos
+            if self._len:
+                timestamp = max(timestamp, self._t[pos - 1])
+            self._t[pos] = timestamp
+            self._v[pos] = value
+            pos += 1
+            if pos == self.maxlen:
+                pos = 0
+            self._pos = pos
+            if self._len < self.maxlen:
+                self._len += 1
+
+    def clear(self):
+        with self._lock:
+            self._pos = self._len = 0
+
+    def last(self):
+        """return the last (timestamp, value) pair or None"""
+        with self._lock:
+            if not self._len:
+                return None
+            return self._t[self._pos - 1], self._v[self._pos - 1]
+
+    def _segments(self):
+        """the filled parts of the buffer in chronological order"""
+        if self._len < self.maxlen:
+            return [slice(0, self._len)]
+        return [slice(self._pos, self.maxlen), slice(0, self._pos)]
+
+    def get(self, start=None, end=None):
+        """get points with start <= timestamp <= end
+
+        :param start: start time or None for the oldest point
+        :param end: end time or None for the newest point
+        :return: tuple (timestamps, values) of numpy arrays (copies)
+        """
+        with self._lock:
+            tparts = []
+            vparts = []
+            for seg in self._segments():
+                t = self._t[seg]
+                i = 0 if start is None else np.searchsorted(t, start, 'left')
+                j = len(t) if end is None else np.searchsorted(t, end, 'right')
+                tparts.append(t[i:j])
+                vparts.append(self._v[seg][i:j])
+            return np.concatenate(tparts), np.concatenate(vparts)
@@ -0,0 +1,127 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""profiling of the server startup
+
+activated by frappy-server --profile-startup: reports the time spent for
+imports, module construction, initialization and the first poll
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class ImportTimer:
+    """meta path finder measuring the time for executing imported modules"""
+
+    def __init__(self, imports):
+        self.imports = imports  # dict <module name> of (<total time>, <own time>)
+        self.local = threading.local()
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, 'find_spec', None)
+            if finder is self or find_spec is None:
+                continue
+            spec = find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        if isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return spec  # builtin or frozen module, or a namespace package
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            stack = self.local.__dict__.setdefault('stack', [])
+            nested = [0]  # time spent in nested imports
+            stack.append(nested)
+            t = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                total = time.perf_counter() - t
+                stack.pop()
+                if stack:
+                    stack[-1][0] += total
+                self.imports[name] = total, total - nested[0]
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass  # loader without instance dict
+        return spec
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = {}  # dict <module name> of (<total time>, <own time>)
+        self.phases = {}  # dict <phase> of dict <module name> of <time>
+        self.lock = threading.Lock()
+        self.timer = ImportTimer(self.imports)
+
+    def start(self):
+        sys.meta_path.insert(0, self.timer)
+
+    def stop(self):
+        if self.timer in sys.meta_path:
+            sys.meta_path.remove(self.timer)
+
+    @contextmanager
+    def measure(self, phase, name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            t = time.perf_counter() - t
+            with self.lock:
+                times = self.phases.setdefault(phase, {})
+                times[name] = times.get(name, 0) + t
+
+    def report(self, count=20):
+        """return the report as a list of lines"""
+        lines = [f'startup took {time.perf_counter() - self.started:.3f} s',
+                 f'imports: {len(self.imports)} modules, the slowest (own, including nested imports):']
+        for name, (total, own) in sorted(self.imports.items(), key=lambda v: -v[1][1])[:count]:
+            lines.append(f'  {own * 1000:8.1f} ms {total * 1000:8.1f} ms  {name}')
+        for phase, times in self.phases.items():
+            lines.append(f'{phase}: {sum(times.values()):.3f} s, the slowest:')
+            for name, t in sorted(times.items(), key=lambda v: -v[1])[:count]:
+                lines.append(f'  {t * 1000:8.1f} ms  {name}')
+        return lines
+
+
+profile = None  # the active StartupProfile
+
+
+def start_profile():
+    """start profiling. to be called before importing frappy.server"""
+    global profile  # pylint: disable=global-statement
+    profile = StartupProfile()
+    profile.start()
+    return profile
+
+
+def measure(phase, name):
+    """context manager measuring a phase of the startup, when profiling is active"""
+    if profile is None:
+        return nullcontext()
+    return profile.measure(phase, name)
@@ -21,15 +21,31 @@
 # *****************************************************************************
 
 
+import atexit
 import os
-from os.path import dirname, join
+import struct
+import threading
+import time
+from collections import deque
+from os.path import dirname, join, splitext
+from queue import SimpleQueue
 from logging import DEBUG, INFO, addLevelName
 import mlzlog
 
-from frappy.lib import generalConfig
+from frappy.lib import generalConfig, mkthread
 from frappy.datatypes import BoolType
 from frappy.properties import Property
 
+# max. number of remote log messages queued per connection
+generalConfig.set_default('remote_log_queue_size', 1000)
+# max. number of remote log messages per second and connection
+generalConfig.set_default('remote_log_rate', 200)
+# 'text' or 'compact' (binary, see read_compact_comlog)
+generalConfig.set_default('comlog_format', 'text')
+
+# record of a compact comlog file: timestamp, length of the utf-8 encoded message
+COMPACT_RECORD = struct.Struct('<dI')
+
 OFF = 99
 COMLOG = 15
 addLevelName(COMLOG, 'COMLOG')
@@ -85,6 +101,90 @@ class RemoteLogHandler(mlzlog.Handler):
         return 'RemoteLogHandler()'
 
 
+class RemoteLogQueue:
+    """queue for the remote log messages of one connection
+
+    the messages are sent by a background thread, so that a module logging
+    a message does not wait for the connection. when the queue is full or
+    the rate exceeds generalConfig.remote_log_rate, messages are dropped,
+    and the number of dropped messages is sent later as a warning.
+    """
+    summary_interval = 1  # min. interval between messages about dropped messages
+
+    def __init__(self, send):
+        self.send = send  # function(<module name>, <level name>, <message>)
+        self.maxlen = generalConfig.remote_log_queue_size
+        self.rate = generalConfig.remote_log_rate
+        self.tokens = self.rate
+        self.last = time.monotonic()
+        self.last_summary = 0
+        self.queue = deque()
+        self.dropped = {}  # dict <module name> of <number of dropped messages>
+        self.cond = threading.Condition()
+        self.busy = False
+        self.running = True
+        mkthread(self.run)
+
+    def put(self, modname, levelname, msg):
+        with self.cond:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens < 1 or len(self.queue) >= self.maxlen:
+                self.dropped[modname] = self.dropped.get(modname, 0) + 1
+            else:
+                self.tokens -= 1
+                self.queue.append((modname, levelname, msg))
+            self.cond.notify_all()
+
+    def _get_items(self):
+        """wait for messages to be sent"""
+        with self.cond:
+            while self.running:
+                if self.queue:
+                    items = list(self.queue)
+                    self.queue.clear()
+                    self.busy = True
+                    return items
+                if self.dropped:
+                    delay = self.last_summary + self.summary_interval - time.monotonic()
+                    if delay <= 0:
+                        self.last_summary = time.monotonic()
+                        items = [(modname, 'warning', f'{n} log messages dropped')
+                                 for modname, n in self.dropped.items()]
+                        self.dropped = {}
+                        self.busy = True
+                        return items
+                else:
+                    delay = None
+                self.busy = False
+                self.cond.notify_all()
+                self.cond.wait(delay)
+            return []
+
+    def run(self):
+        while True:
+            items = self._get_items()
+            if not items:
+                return
+            try:
+                for item in items:
+                    self.send(*item)
+            except Exception:
+                # the connection is probably broken
+                self.close()
+
+    def flush(self, timeout=1):
+        """wait until the queued messages are sent"""
+        with self.cond:
+            self.cond.wait_for(lambda: not (self.running and (self.queue or self.busy)), timeout)
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+
 class LogfileHandler(mlzlog.LogfileHandler):
 
     def __init__(self, logdir, rootname, max_days=0):
@@ -112,11 +212,161 @@ class LogfileHandler(mlzlog.LogfileHandler):
 
 
 class ComLogfileHandler(LogfileHandler):
-    """handler for logging communication"""
+    """handler for logging communication
+
+    the records are written by the comlog writer thread, see ComLogQueueHandler
+    """
+
+    def __init__(self, logdir, rootname, max_days=0, compact=False):
+        self.compact = compact
+        super().__init__(logdir, rootname, max_days)
+        if compact:
+            self.mode = 'ab'
+
+    def getChild(self, name):
+        child = type(self)(dirname(self.baseFilename), name, self.max_days, self.compact)
+        child.setLevel(self.level)
+        return child
+
+    def _open(self):
+        if self.compact:
+            self.baseFilename = splitext(self.baseFilename)[0] + '.bin'
+        return super()._open()
 
     def format(self, record):
         return f'{self.formatter.formatTime(record)} {record.getMessage()}'
 
+    def write_batch(self, records):
+        """write several records, flushing the file only once"""
+        records = [r for r in records if r.levelno >= self.level and self.filter(r)]
+        if not records:
+            return
+        self.acquire()
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            if time.time() >= self.rollover_at:
+                self.doRollover()
+            if self.compact:
+                data = []
+                for record in records:
+                    msg = record.getMessage().encode('utf-8')
+                    data.append(COMPACT_RECORD.pack(record.created, len(msg)))
+                    data.append(msg)
+                self.stream.write(b''.join(data))
+            else:
+                self.stream.write(''.join(f'{self.format(r)}\n' for r in records))
+            self.stream.flush()
+        except Exception:
+            self.handleError(records[-1])
+        finally:
+            self.release()
+
+
+def read_compact_comlog(filename):
+    """read a comlog file written in compact format
+
+    :return: a generator of (<timestamp>, <message>)
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    pos = 0
+    while pos + COMPACT_RECORD.size <= len(data):
+        timestamp, length = COMPACT_RECORD.unpack_from(data, pos)
+        pos += COMPACT_RECORD.size
+        yield timestamp, data[pos:pos + length].decode('utf-8', errors='replace')
+        pos += length
+
+
+class ComLogWriter:
+    """background thread writing the comlog records of all modules
+
+    the records are collected in batches, so that a file is flushed only
+    once per batch
+    """
+    def __init__(self):
+        self.queue = SimpleQueue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def put(self, handler, record):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = mkthread(self.run)
+        self.queue.put((handler, record))
+
+    def flush(self, timeout=1):
+        """wait until the queued records are written"""
+        if self.thread:
+            done = threading.Event()
+            self.queue.put((None, done))
+            done.wait(timeout)
+
+    def run(self):
+        while True:
+            batches = {}  # dict <handler> of <list of records>
+            events = []
+            item = self.queue.get()
+            while True:
+                handler, record = item
+                if handler is None:
+                    events.append(record)
+                else:
+                    batches.setdefault(handler, []).append(record)
+                if self.queue.empty():
+                    break
+                item = self.queue.get()
+            for handler, records in batches.items():
+                if hasattr(handler, 'write_batch'):
+                    handler.write_batch(records)
+                else:
+                    for record in records:
+                        handler.handle(record)
+            for event in events:
+                event.set()
+
+
+comlogWriter = ComLogWriter()
+atexit.register(comlogWriter.flush)
+
+
+class ComLogQueueHandler(mlzlog.Handler):
+    """pass records to the comlog writer thread
+
+    the communicating thread does not wait for disk I/O
+    """
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+
+    def emit(self, record):
+        # format now, the arguments might be changed later
+        record.msg = record.getMessage()
+        record.args = None
+        comlogWriter.put(self.target, record)
+
+
+def comlog_wanted(log):
+    """check whether any handler of the logger would handle a COMLOG record
+
+    the level of the loggers is DEBUG, the levels are set on the handlers.
+    checking this is cheaper than creating a record, which typically is
+    dropped by all handlers
+    """
+    modname = log.name.split('.')[-1]
+    while log:
+        for handler in log.handlers:
+            if isinstance(handler, RemoteLogHandler):
+                if any(lev <= COMLOG for lev in handler.subscriptions.get(modname, {}).values()):
+                    return True
+            elif handler.level <= COMLOG:
+                return True
+        if not log.propagate:
+            break
+        log = log.parent
+    return False
+
 
 class HasComlog:
     """mixin for modules with comlog"""
@@ -130,11 +380,13 @@ class HasComlog:
             self._comLog = mlzlog.Logger(f'COMLOG.{self.name}')
             self._comLog.handlers[:] = []
             directory = join(logger.logdir, logger.rootname, 'comlog', self.secNode.name)
-            self._comLog.addHandler(ComLogfileHandler(
-                directory, self.name, max_days=generalConfig.getint('comlog_days', 7)))
+            self._comLog.addHandler(ComLogQueueHandler(ComLogfileHandler(
+                directory, self.name, max_days=generalConfig.getint('comlog_days', 7),
+                compact=generalConfig.comlog_format == 'compact')))
 
     def comLog(self, msg, *args, **kwds):
-        self.log.log(COMLOG, msg, *args, **kwds)
+        if comlog_wanted(self.log):
+            self.log.log(COMLOG, msg, *args, **kwds)
         if self._comLog:
             self._comLog.info(msg, *args)
 
@@ -32,7 +32,7 @@ from frappy.datatypes import ArrayOf, BoolType, FloatRange, IntRange, NoneOr, \
 
 from frappy.errors import BadValueError, CommunicationFailedError, ConfigError, \
     ProgrammingError, SECoPError, secop_error, RangeError
-from frappy.lib import formatException, mkthread, UniqueObject, generalConfig
+from frappy.lib import formatException, mkthread, UniqueObject, generalConfig, startup
 from frappy.params import Accessible, Command, Parameter, Limit, PREDEFINED_ACCESSIBLES
 from frappy.properties import HasProperties, Property
 from frappy.logging import RemoteLogHandler
@@ -45,6 +45,24 @@ Done = UniqueObject('Done')
 indicating that the setter is triggered already"""
 
 wrapperClasses = {}
+generatedClasses = {}
+
+
+def generated_class(key, create):
+    """get a class created on the fly, from the cache if possible
+
+    :param key: a hashable key, determining the created class completely
+    :param create: a function creating the class, called when key is not cached yet
+    :return: the class
+
+    creating a module class is expensive (see HasAccessibles.__init_subclass__).
+    modules creating their class on the fly would do this again for every
+    instance and on every restart of the server
+    """
+    cls = generatedClasses.get(key)
+    if cls is None:
+        cls = generatedClasses[key] = create()
+    return cls
 
 
 class HasAccessibles(HasProperties):
@@ -126,7 +144,7 @@ class HasAccessibles(HasProperties):
                             if value is Done:  # TODO: to be removed when all code using Done is updated
                                 return getattr(self, pname)
                             pobj = self.accessibles[pname]
-                            value = pobj.datatype(value)
+                            value = pobj.datatype.compiled('__call__')(value)
                         except Exception as e:
                             self.log.debug("read_%s failed with %r", pname, e)
                             if isinstance(e, SECoPError):
@@ -171,7 +189,7 @@ class HasAccessibles(HasProperties):
                 def new_wfunc(self, value, pname=pname, wfunc=wfunc, check_funcs=cfuncs):
                     with self.accessLock:
                         self.log.debug('validate %r to datatype of %r', value, pname)
-                        validate = self.parameters[pname].datatype.validate
+                        validate = self.parameters[pname].datatype.compiled('validate')
                         try:
                             new_value = validate(value)
                             for c in check_funcs:
@@ -189,6 +207,7 @@ class HasAccessibles(HasProperties):
                         self.announceUpdate(pname, new_value, validate=False)
                         return new_value
 
+                new_wfunc.check_funcs = cfuncs  # used in writeParameters
                 new_wfunc.__name__ = wname
                 new_wfunc.__qualname__ = wrapped_name + '.' + wname
                 new_wfunc.__module__ = cls.__module__
@@ -490,7 +509,7 @@ class Module(HasAccessibles):
             pobj.value = pobj.default
         else:
             # value given explicitly, either by cfg or as Parameter argument
-            pobj.given = True  # for PersistentMixin
+            pobj.given = True
             if hasattr(self, 'write_' + pname):
                 self.writeDict[pname] = pobj.value
             if pobj.default is None:
@@ -518,31 +537,45 @@ class Module(HasAccessibles):
             if not err:
                 try:
                     if validate:
-                        value = pobj.datatype(value)
+                        value = pobj.datatype.compiled('__call__')(value)
                 except Exception as e:
                     err = e
                 else:
-                    changed = pobj.value != value or pobj.readerror
+                    propertyValues = pobj.propertyValues
+                    previous = propertyValues.get('value')
+                    # the identity check avoids comparing unchanged structured values
+                    changed = pobj.readerror or (value is not previous and previous != value)
                     # store the value even in case of error
-                    pobj.value = value
+                    # the value property is not validated again, as value is already converted
+                    propertyValues['value'] = value
             if err:
-                if secop_error(err) == pobj.readerror:
-                    return  # no updates for repeated errors
                 err = secop_error(err)
+                if err == pobj.readerror:
+                    return  # no updates for repeated errors
                 value_err = value, err
             else:
                 if not changed and timestamp < (pobj.timestamp or 0) + pobj.omit_unchanged_within:
                     # no change within short time -> omit
                     return
                 value_err = (value,)
-            pobj.timestamp = timestamp or time.time()
+            announce = pobj.export
+            if announce and pobj.deadband_limits and not err:
+                # the deadband applies only to the updates sent to the clients
+                if pobj.readerror or not pobj.within_deadband(value, timestamp):
+                    pobj.announced_value = value
+                    pobj.announced_time = timestamp
+                else:
+                    announce = False  # insignificant change
+            pobj.timestamp = timestamp
             pobj.readerror = err
-            for cbfunc, cbargs in self.paramCallbacks[pname]:
-                try:
-                    cbfunc(*cbargs, *value_err)
-                except Exception:
-                    pass
-            if pobj.export:
+            callbacks = self.paramCallbacks[pname]
+            if callbacks:
+                for cbfunc, cbargs in callbacks:
+                    try:
+                        cbfunc(*cbargs, *value_err)
+                    except Exception:
+                        pass
+            if announce:
                 self.updateCallback(self, pobj)
 
     def addCallback(self, pname, callback_function, *args):
@@ -719,12 +752,14 @@ class Module(HasAccessibles):
         try:
             for mobj in modules:
                 # TODO when needed: here we might add a call to a method :meth:`beforeWriteInit`
-                mobj.writeInitParams()
-                mobj.initialReads()
+                with startup.measure('first poll', mobj.name):
+                    mobj.writeInitParams()
+                    mobj.initialReads()
             # call all read functions a first time
             for m in polled_modules:
-                for mobj, rfunc, _ in m.pollInfo.polled_parameters:
-                    mobj.callPollFunc(rfunc, raise_com_failed=True)
+                with startup.measure('first poll', m.name):
+                    for mobj, rfunc, _ in m.pollInfo.polled_parameters:
+                        mobj.callPollFunc(rfunc, raise_com_failed=True)
             # TODO when needed: here we might add calls to a method :meth:`afterInitPolls`
         except CommunicationFailedError as e:
             # when communication failed, probably all parameters and may be more modules are affected.
@@ -820,6 +855,40 @@ class Module(HasAccessibles):
                     except Exception:
                         self.log.error(formatException())
 
+    def writeParameters(self, values):
+        """write several parameters in one go
+
+        :param values: dict <parameter name> of <value>
+        :return: dict <parameter name> of <resulting value>
+
+        all values are validated and checked before writing the first one.
+        parameters handled by the same CommonWriteHandler are written
+        with one call of the handler.
+        """
+        with self.accessLock:
+            validated = {}
+            for pname, value in values.items():
+                wfunc = getattr(self, 'write_' + pname, None)
+                if wfunc is None:
+                    raise ProgrammingError(f'{self.name}.{pname} is not writable')
+                pobj = self.parameters[pname]
+                value = pobj.datatype.compiled('validate')(value, previous=pobj.value)
+                for check in getattr(wfunc, 'check_funcs', ()):
+                    if check(self, value):
+                        break
+                validated[pname] = value
+            # a CommonWriteHandler takes the values of its other parameters from writeDict
+            self.writeDict.update(validated)
+            try:
+                for pname in validated:
+                    value = self.writeDict.pop(pname, Done)
+                    if value is not Done:  # else already written by a common handler
+                        getattr(self, 'write_' + pname)(value)
+            finally:
+                for pname in validated:
+                    self.writeDict.pop(pname, None)
+            return {pname: getattr(self, pname) for pname in validated}
+
     def setRemoteLogging(self, conn, level, send_log):
         if self.remoteLogHandler is None:
             # for non-mlzlog loggers: search parents for remoteloghandler
@@ -878,4 +947,4 @@ class Module(HasAccessibles):
         if generalConfig.raise_config_errors:
             raise ConfigError(error) if isinstance(error, str) else error
         self.log.error(str(error))
-        self.secNode.error_count += 1
+        self.secNode.countError()
@@ -24,9 +24,11 @@
 
 import inspect
 from frappy.datatypes import ArrayOf, BoolType, CommandType, DataType, \
-    DataTypeType, DefaultType, EnumType, FloatRange, NoneOr, OrType, StringType, \
-    StructOf, TextType, TupleOf, ValueType, visibility_validator
-from frappy.errors import BadValueError, ProgrammingError, WrongTypeError
+    DataTypeType, DefaultType, EnumType, FloatRange, IntRange, NoneOr, OrType, \
+    ScaledInteger, StringType, StructOf, TextType, TupleOf, ValueType, \
+    visibility_validator
+from frappy.errors import BadValueError, ConfigError, ProgrammingError, \
+    WrongTypeError
 from frappy.lib import generalConfig
 from frappy.properties import HasProperties, Property
 
@@ -44,6 +46,7 @@ class Accessible(HasProperties):
 
     param.ownProperties contains the properties to be used for inheritance
     """
+    __slots__ = ()
 
     ownProperties = None
     optional = False
@@ -138,6 +141,14 @@ class Parameter(Accessible):
     """
     # storage for Parameter settings + value + qualifiers
 
+    # Parameters are copied for every module instance, including all properties.
+    # The frequently used attributes are slots, the value stays in propertyValues.
+    # The __dict__ slot allows to attach other attributes, the instance dict is
+    # created only then
+    __slots__ = ('name', 'optional', 'ownProperties', 'omit_unchanged_within',
+                 'timestamp', 'readerror', 'given', 'specifier', 'deadband_limits',
+                 'announced_value', 'announced_time', '__dict__')
+
     description = Property(
         'mandatory description of the parameter', TextType(),
         extname='description', mandatory=True, export='always')
@@ -183,19 +194,37 @@ class Parameter(Accessible):
           or the minimum time between updates of equal values [sec]''',
         OrType(FloatRange(0), EnumType(always=0, never=999999999, default=-1)),
         export=False, default=-1)
+    deadband = Property(
+        '''[internal] minimum change of a numeric value to be announced
+
+        - 0: no deadband (default)
+        - 'resolution': use absolute_resolution and relative_resolution of the datatype
+        - a number: the absolute deadband''',
+        OrType(FloatRange(0), EnumType(resolution=-1)), export=False, default=0)
+    relative_deadband = Property(
+        '[internal] minimum change of a numeric value to be announced, relative to the value',
+        FloatRange(0), export=False, default=0)
+    max_silence = Property(
+        '''[internal] max. time between updates of a parameter with deadband [sec]
+
+        0: no limit. with a deadband, unchanged values are then sent only once,
+        independent of update_unchanged''', FloatRange(0), export=False, default=0)
     influences = Property(
         'optional hint about affected parameters', ArrayOf(StringType()),
         extname='influences', export=True, mandatory=False, default=[])
 
-    # used on the instance copy only
-    # value = None
-    timestamp = 0
-    readerror = None
-    omit_unchanged_within = 0
-
     def __init__(self, description=None, datatype=None, inherit=True, optional=False, **kwds):
         super().__init__()
         self.optional = optional
+        # used on the instance copy only
+        self.timestamp = 0
+        self.readerror = None
+        self.omit_unchanged_within = 0
+        self.given = False  # value given in the cfg or as Parameter argument
+        self.specifier = None  # '<module>:<exported name>' for updates
+        self.deadband_limits = None  # (absolute, relative) or None
+        self.announced_value = None  # reference value for the deadband
+        self.announced_time = 0  # time of the last update sent with a deadband
         if 'poll' in kwds and generalConfig.tolerate_poll_property:
             kwds.pop('poll')
         if datatype is None:
@@ -313,14 +342,37 @@ class Parameter(Accessible):
                     # clear, if it does not match datatype
                     pass
         if modobj:
+            if self.export:
+                self.specifier = f'{modobj.name}:{self.export}'
             if self.update_unchanged == -1:
                 t = modobj.omit_unchanged_within
                 self.omit_unchanged_within = generalConfig.omit_unchanged_within if t is None else t
             else:
                 self.omit_unchanged_within = float(self.update_unchanged)
+            absolute, relative = self.deadband, self.relative_deadband
+            if absolute == -1:  # 'resolution'
+                absolute = getattr(self.datatype, 'absolute_resolution', 0)
+                relative = max(relative, getattr(self.datatype, 'relative_resolution', 0))
+                self.deadband_limits = absolute, relative
+            elif absolute or relative:
+                self.deadband_limits = absolute, relative
+
+    def within_deadband(self, value, timestamp):
+        """check whether the update of a value may be omitted
+
+        this is the case when the change to the last announced value is
+        below the deadband, and the last announced update is not older than max_silence
+        """
+        previous = self.announced_value
+        if previous is None:
+            return False
+        if self.max_silence and timestamp >= self.announced_time + self.max_silence:
+            return False  # heartbeat
+        absolute, relative = self.deadband_limits
+        return abs(value - previous) < max(absolute, abs(previous) * relative)
 
     def export_value(self):
-        return self.datatype.export_value(self.value)
+        return self.datatype.compiled('export_value')(self.value)
 
     def for_export(self):
         return dict(self.exportProperties(), readonly=self.readonly)
@@ -350,6 +402,9 @@ class Parameter(Accessible):
     def checkProperties(self):
         super().checkProperties()
         self.datatype.checkProperties()
+        if self.deadband or self.relative_deadband:
+            if not isinstance(self.datatype, (FloatRange, IntRange, ScaledInteger)):
+                raise ConfigError('a deadband needs a numeric datatype')
 
 
 class Command(Accessible):
@@ -555,6 +610,7 @@ class Command(Accessible):
 
 class Limit(Parameter):
     """a special limit parameter"""
+    __slots__ = ()
     POSTFIXES = {'min', 'max', 'limits'}  # allowed postfixes
 
     def __set_name__(self, owner, name):
@@ -49,25 +49,235 @@ class MyClass(PersistentMixin, ...):
             <fix encoder turns by comparing loaded self.encoder with encoder from hw>
         else:
             self.saveParameters()
+
+Saving is done in the background by a common writer thread: changes within
+generalConfig.persistent_delay seconds are collected and written in one go,
+and on shutdownModule the pending data is written immediately.
+
+generalConfig.persistent_store selects where the data is stored:
+
+- 'json': one file <equipment_id>.<module>.json per module (default)
+- 'sqlite': one database <equipment_id>.sqlite per SEC node
 """
 
 import os
 import json
+import sqlite3
+import threading
+import time
 
-from frappy.lib import generalConfig
+from frappy.errors import ConfigError
+from frappy.lib import generalConfig, mkthread
 from frappy.datatypes import EnumType
 from frappy.params import Parameter, Property, Command, Limit
 from frappy.modules import Module
 
+# delay in seconds for collecting changes before writing them to disk
+# 0: write immediately, in the thread calling saveParameters
+generalConfig.set_default('persistent_delay', 1.0)
+# minimum interval between fsync calls, 0: always fsync before replacing a file
+generalConfig.set_default('persistent_fsync_interval', 60.0)
+# 'json' or 'sqlite'
+generalConfig.set_default('persistent_store', 'json')
+
+
+def write_json(filename, data, fsync=False):
+    """write data to a json file
+
+    the data is written to a temporary file first, which then replaces the
+    original file, so that the file contains either the old or the new data
+    in case of a crash
+    """
+    persistentdir = filename.parent
+    tmpfile = persistentdir / (filename.name + '.tmp')
+    if not persistentdir.is_dir():
+        persistentdir.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(tmpfile, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.write('\n')
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmpfile, filename)
+    finally:
+        try:
+            os.remove(tmpfile)
+        except FileNotFoundError:
+            pass
+
+
+class JsonStore:
+    """persistent data in one json file per module"""
+
+    def __init__(self, persistentdir, equipment_id):
+        self.persistentdir = persistentdir
+        self.equipment_id = equipment_id
+
+    def filename(self, modname):
+        return self.persistentdir / f'{self.equipment_id}.{modname}.json'
+
+    def load(self, modname):
+        try:
+            with open(self.filename(modname), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self, items, fsync):
+        """save data of several modules
+
+        :param items: dict <module name> of <data>
+        :param fsync: whether to force the data to disk
+        """
+        for modname, data in items.items():
+            write_json(self.filename(modname), data, fsync)
+
+
+class SqliteStore:
+    """persistent data of all modules in one sqlite database per SEC node"""
+
+    def __init__(self, persistentdir, equipment_id):
+        self.filename = persistentdir / f'{equipment_id}.sqlite'
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            self.filename.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.filename, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS persistent '
+                              '(module TEXT PRIMARY KEY, data TEXT)')
+        return self.conn
+
+    def load(self, modname):
+        with self.lock:
+            row = self.connect().execute(
+                'SELECT data FROM persistent WHERE module=?', (modname,)).fetchone()
+        try:
+            return json.loads(row[0]) if row else {}
+        except ValueError:
+            return {}
+
+    def save(self, items, fsync):
+        with self.lock:
+            conn = self.connect()
+            conn.execute(f'PRAGMA synchronous={"FULL" if fsync else "NORMAL"}')
+            with conn:  # one transaction for all modules
+                conn.executemany('INSERT OR REPLACE INTO persistent VALUES (?, ?)',
+                                 [(k, json.dumps(v)) for k, v in items.items()])
+
+    def close(self):
+        with self.lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
+
+STORES = {'json': JsonStore, 'sqlite': SqliteStore}
+stores = {}  # dict (<store class>, <persistentdir>, <equipment_id>) of <store>
+
+
+def get_store(equipment_id):
+    """get the store for the SEC node given by equipment_id"""
+    kind = generalConfig.persistent_store
+    try:
+        cls = STORES[kind]
+    except KeyError:
+        raise ConfigError(f'unknown persistent_store {kind!r}') from None
+    key = cls, generalConfig.logdir / 'persistent', equipment_id
+    store = stores.get(key)
+    if store is None:
+        store = stores[key] = cls(*key[1:])
+    return store
+
+
+class PersistentWriter:
+    """write-behind for persistent data of all modules
+
+    the latest data per module is kept until it is written by the writer thread
+    """
+    def __init__(self):
+        self.pending = {}  # dict (<store>, <module name>) of (<data>, <logger>)
+        self.lock = threading.Lock()  # protects pending
+        self.write_lock = threading.Lock()  # only one thread writes at a time
+        self.trigger = threading.Event()
+        self.thread = None
+        self.last_fsync = 0
+
+    def save(self, store, modname, data, log):
+        """schedule data of a module to be written"""
+        with self.lock:
+            self.pending[store, modname] = data, log
+        if not self.schedule():
+            self.flush(store, modname)
+
+    def schedule(self):
+        """trigger the writer thread, if writing is delayed
+
+        :return: True when the writer thread will write the pending data
+        """
+        if not generalConfig.persistent_delay:
+            return False
+        with self.lock:
+            if self.thread is None:
+                self.thread = mkthread(self.run)
+        self.trigger.set()
+        return True
+
+    def flush(self, store=None, modname=None):
+        """write pending data of a module or of all modules"""
+        with self.write_lock:
+            with self.lock:
+                if store is None:
+                    todo, self.pending = self.pending, {}
+                elif (store, modname) in self.pending:
+                    todo = {(store, modname): self.pending.pop((store, modname))}
+                else:
+                    return
+            now = time.time()
+            fsync = now > self.last_fsync + generalConfig.persistent_fsync_interval
+            if fsync:
+                self.last_fsync = now
+            bystore = {}  # the data of one store is saved in one go
+            for (store_, name), (data, log) in todo.items():
+                bystore.setdefault(store_, ({}, log))[0][name] = data
+            failed = False
+            for store_, (items, log) in bystore.items():
+                try:
+                    store_.save(items, fsync)
+                except Exception as e:
+                    with self.lock:
+                        for name in items:
+                            # retry later, unless there is newer data
+                            self.pending.setdefault((store_, name), todo[store_, name])
+                    log.error('can not save persistent data: %r', e)
+                    failed = True
+        if failed:
+            # retry after persistent_delay, when not delayed on the next save
+            self.schedule()
+
+    def run(self):
+        while True:
+            self.trigger.wait()
+            # collect changes for persistent_delay
+            time.sleep(generalConfig.persistent_delay)
+            self.trigger.clear()
+            self.flush()
+
+
+persistentWriter = PersistentWriter()
+
 
 class PersistentParam(Parameter):
     persistent = Property('persistence flag (auto means: save automatically on any change)',
                           EnumType(off=0, on=1, auto=2), default=1)
-    given = False
+    __slots__ = ()
 
 
 class PersistentLimit(Limit, Parameter):
-    pass
+    __slots__ = ()
 
 
 class PersistentMixin(Module):
@@ -75,9 +285,7 @@ class PersistentMixin(Module):
 
     def __init__(self, name, logger, cfgdict, srv):
         super().__init__(name, logger, cfgdict, srv)
-        persistentdir = generalConfig.logdir / 'persistent'
-        os.makedirs(persistentdir, exist_ok=True)
-        self.persistentFile = persistentdir / f'{self.secNode.equipment_id}.{self.name}.json'
+        self.persistentStore = get_store(self.secNode.equipment_id)
         self.initData = {}  # "factory" settings
         loaded = self.loadPersistentData()
         for pname, pobj in self.parameters.items():
@@ -95,11 +303,8 @@ class PersistentMixin(Module):
         self.__save_params()
 
     def loadPersistentData(self):
-        try:
-            with open(self.persistentFile, 'r', encoding='utf-8') as f:
-                self.persistentData = json.load(f)
-        except (FileNotFoundError, ValueError):
-            self.persistentData = {}
+        persistentWriter.flush(self.persistentStore, self.name)
+        self.persistentData = self.persistentStore.load(self.name)
         result = {}
         for pname, value in self.persistentData.items():
             try:
@@ -147,20 +352,11 @@ class PersistentMixin(Module):
                 if getattr(v, 'persistent', False)}
         if data != self.persistentData:
             self.persistentData = data
-            persistentdir = self.persistentFile.parent
-            tmpfile = self.persistentFile.parent / (self.persistentFile.name + '.tmp')
-            if not persistentdir.is_dir():
-                persistentdir.mkdir(parents=True, exist_ok=True)
-            try:
-                with open(tmpfile, 'w', encoding='utf-8') as f:
-                    json.dump(self.persistentData, f, indent=2)
-                    f.write('\n')
-                os.rename(tmpfile, self.persistentFile)
-            finally:
-                try:
-                    os.remove(tmpfile)
-                except FileNotFoundError:
-                    pass
+            persistentWriter.save(self.persistentStore, self.name, data, self.log)
+
+    def shutdownModule(self):
+        persistentWriter.flush(self.persistentStore, self.name)
+        super().shutdownModule()
 
     @Command()
     def factory_reset(self):
@@ -31,6 +31,8 @@ UNSET = UniqueObject('undefined value')  #: an unset value, not even None
 
 
 class HasDescriptors:
+    __slots__ = ()
+
     @classmethod
     def __init_subclass__(cls):
         # when migrating old style declarations, sometimes the trailing comma is not removed
@@ -81,7 +83,9 @@ class Property:
         return instance.propertyValues.get(self.name, self.default)
 
     def __set__(self, instance, value):
-        instance.propertyValues[self.name] = self.datatype.validate(value)
+        value = self.datatype.validate(value)
+        instance.propertyChange(self.name)
+        instance.propertyValues[self.name] = value
 
     def __set_name__(self, owner, name):
         self.name = name
@@ -114,7 +118,7 @@ class HasProperties(HasDescriptors):
     - bare values overriding properties should be kept as properties
     - include also attributes of type Property on base classes not inheriting HasProperties
     """
-    propertyValues = None
+    __slots__ = ('propertyValues',)
 
     def __init__(self):
         super().__init__()
@@ -190,6 +194,9 @@ class HasProperties(HasDescriptors):
                 res[po.extname] = val
         return res
 
+    def propertyChange(self, key):
+        """called before a property value is changed, by setProperty or by assignment"""
+
     def setProperty(self, key, value):
         # this is overwritten by Param.setProperty and DataType.setProperty
         # in oder to extend setting to inner properties
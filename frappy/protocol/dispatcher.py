@@ -35,23 +35,26 @@ import threading
 from time import time as currenttime
 
 from frappy.errors import NoSuchCommandError, NoSuchModuleError, \
-    NoSuchParameterError, ProtocolError, ReadOnlyError
+    NoSuchParameterError, NotImplementedSECoPError, ProtocolError, ReadOnlyError
+from frappy.logging import RemoteLogQueue
 from frappy.params import Parameter
-from frappy.protocol.messages import COMMANDREPLY, DESCRIPTIONREPLY, \
-    DISABLEEVENTSREPLY, ENABLEEVENTSREPLY, ERRORPREFIX, EVENTREPLY, \
-    HEARTBEATREPLY, IDENTREPLY, IDENTREQUEST, LOG_EVENT, LOGGING_REPLY, \
-    READREPLY, WRITEREPLY
+from frappy.protocol.messages import BINARY_REPLY, COMMANDREPLY, \
+    DESCRIPTIONREPLY, DISABLEEVENTSREPLY, ENABLEEVENTSREPLY, ERRORPREFIX, \
+    EVENTREPLY, HEARTBEATREPLY, HISTORYREPLY, IDENTREPLY, IDENTREQUEST, \
+    LOG_EVENT, LOGGING_REPLY, MULTICHANGEREPLY, READREPLY, WRITEREPLY
 
 
 def make_update(modulename, pobj):
+    # the specifier is precomputed in pobj.finish
+    specifier = pobj.specifier or f'{modulename}:{pobj.export}'
+    timestamp = pobj.timestamp
     if pobj.readerror:
-        return (ERRORPREFIX + EVENTREPLY, f'{modulename}:{pobj.export}',
+        return (ERRORPREFIX + EVENTREPLY, specifier,
                 # error-report !
                 [pobj.readerror.name, str(pobj.readerror),
-                 {'t': pobj.timestamp} if pobj.timestamp else {}])
-    return (EVENTREPLY, f'{modulename}:{pobj.export}',
-            [pobj.export_value(),
-             {'t': pobj.timestamp} if pobj.timestamp else {}])
+                 {'t': timestamp} if timestamp else {}])
+    return (EVENTREPLY, specifier,
+            [pobj.export_value(), {'t': timestamp} if timestamp else {}])
 
 
 class Dispatcher:
@@ -67,6 +70,7 @@ class Dispatcher:
         # eventname is <modulename> or <modulename>:<parametername>
         self._subscriptions = {}
         self._lock = threading.RLock()
+        self._log_queues = {}  # dict <connection> of RemoteLogQueue
         self.name = name
         self.restart = srv.restart
         self.shutdown = srv.shutdown
@@ -80,13 +84,15 @@ class Dispatcher:
         if reallyall:
             listeners = self._connections
         else:
-            # all subscribers to module:param
-            listeners = self._subscriptions.get(msg[1], set()).copy()
-            # all subscribers to module
-            module = msg[1].split(':', 1)[0]
-            listeners.update(self._subscriptions.get(module, set()))
             # all generic subscribers
-            listeners.update(self._active_connections)
+            listeners = set(self._active_connections)
+            subscriptions = self._subscriptions
+            if subscriptions:
+                # all subscribers to module:param
+                specifier = msg[1]
+                listeners.update(subscriptions.get(specifier, ()))
+                # all subscribers to module
+                listeners.update(subscriptions.get(specifier.partition(':')[0], ()))
         for conn in listeners:
             conn.send_reply(msg)
 
@@ -119,6 +125,9 @@ class Dispatcher:
         for _evt, conns in list(self._subscriptions.items()):
             conns.discard(conn)
         self.set_all_log_levels(conn, 'off')
+        queue = self._log_queues.pop(conn, None)
+        if queue:
+            queue.close()
         self._active_connections.discard(conn)
 
     def remove_connection(self, conn):
@@ -145,7 +154,7 @@ class Dispatcher:
             result = cobj.result.export_value(result)
         return result, {'t': currenttime()}
 
-    def _setParameterValue(self, modulename, exportedname, value):
+    def _getWritableParameter(self, modulename, exportedname):
         moduleobj = self.secnode.get_module(modulename)
         if moduleobj is None:
             raise NoSuchModuleError(f'Module {modulename!r} does not exist')
@@ -158,16 +167,39 @@ class Dispatcher:
             raise ReadOnlyError(f"Parameter {modulename}:{pname} is constant and can not be changed remotely")
         if pobj.readonly:
             raise ReadOnlyError(f"Parameter {modulename}:{pname} can not be changed remotely")
+        return moduleobj, pname, pobj
 
+    def _setParameterValue(self, modulename, exportedname, value):
+        moduleobj, pname, pobj = self._getWritableParameter(modulename, exportedname)
         # convert transported value to internal value
-        value = pobj.datatype.import_value(value)
+        value = pobj.datatype.compiled('import_value')(value)
         # verify range
-        value = pobj.datatype.validate(value, previous=pobj.value)
+        value = pobj.datatype.compiled('validate')(value, previous=pobj.value)
         # note: exceptions are handled in handle_request, not here!
         getattr(moduleobj, 'write_' + pname)(value)
         # return value is ignored here, as already handled
         return pobj.export_value(), {'t': pobj.timestamp} if pobj.timestamp else {}
 
+    def _setParameterValues(self, modulename, data):
+        """change several parameters of a module
+
+        :param data: dict <exported name> of <transported value>
+        :return: dict <exported name> of [<value>, <qualifiers>]
+        """
+        if not isinstance(data, dict) or not data:
+            raise ProtocolError('a multichange request needs a JSON object with parameter values')
+        moduleobj = None
+        values = {}
+        pobjs = {}
+        for exportedname, value in data.items():
+            moduleobj, pname, pobj = self._getWritableParameter(modulename, exportedname)
+            # convert transported value to internal value, validated in writeParameters
+            values[pname] = pobj.datatype.compiled('import_value')(value)
+            pobjs[exportedname] = pobj
+        moduleobj.writeParameters(values)
+        return {exportedname: [pobj.export_value(), {'t': pobj.timestamp} if pobj.timestamp else {}]
+                for exportedname, pobj in pobjs.items()}
+
     def _getParameterValue(self, modulename, exportedname):
         moduleobj = self.secnode.get_module(modulename)
         if moduleobj is None:
@@ -247,6 +279,38 @@ class Dispatcher:
             modulename, pname = specifier.split(':', 1)
         return (WRITEREPLY, specifier, list(self._setParameterValue(modulename, pname, data)))
 
+    def handle__multichange(self, conn, specifier, data):
+        """change several parameters of a module
+
+        parameters written by a common write handler are written together
+        """
+        if not specifier or ':' in specifier:
+            raise ProtocolError('multichange requests need a module as specifier!')
+        return MULTICHANGEREPLY, specifier, self._setParameterValues(specifier, data)
+
+    def handle__history(self, conn, specifier, data):
+        """get the history of a parameter from the built-in history
+
+        data is a JSON object with the optional keys 'start' and 'end' (default:
+        the last hour) and 'buckets' (default 1000): the number of time buckets
+        the data is reduced to
+        """
+        history = getattr(self.srv, 'history', None)
+        if history is None:
+            raise NotImplementedSECoPError('no history on this SEC node')
+        data = data or {}
+        if not isinstance(data, dict):
+            raise ProtocolError('a history request needs a JSON object as data')
+        try:
+            end = float(data.get('end') or currenttime())
+            start = float(data.get('start') or end - 3600)
+            buckets = int(data.get('buckets', 1000))
+        except (TypeError, ValueError):
+            raise ProtocolError('invalid history request') from None
+        if not 0 < buckets <= 100000:
+            raise ProtocolError('buckets must be within 1 .. 100000')
+        return HISTORYREPLY, specifier, history.query(specifier, start, end, buckets)
+
     def handle_do(self, conn, specifier, data):
         if not specifier:
             raise ProtocolError('do requests need a specifier!')
@@ -306,8 +370,23 @@ class Dispatcher:
         return (DISABLEEVENTSREPLY, None, None)
 
     def send_log_msg(self, conn, modname, level, msg):
-        """send log message """
-        conn.send_reply((LOG_EVENT, f'{modname}:{level}', msg))
+        """send log message
+
+        the message is queued and sent from a separate thread, see RemoteLogQueue
+        """
+        queue = self._log_queues.get(conn)
+        if queue is None:
+            with self._lock:
+                queue = self._log_queues.get(conn)
+                if queue is None:
+                    queue = self._log_queues[conn] = RemoteLogQueue(
+                        lambda modname, level, msg: conn.send_reply((LOG_EVENT, f'{modname}:{level}', msg)))
+        queue.put(modname, level, msg)
+
+    def flush_log_messages(self, timeout=1):
+        """wait until queued log messages are sent"""
+        for queue in list(self._log_queues.values()):
+            queue.flush(timeout)
 
     def set_all_log_levels(self, conn, level):
         for modobj in self.secnode.modules.values():
@@ -320,3 +399,10 @@ class Dispatcher:
         else:
             self.set_all_log_levels(conn, level)
         return LOGGING_REPLY, specifier, level
+
+    def handle__binary(self, conn, specifier, data):
+        """switch binary transport of numeric arrays and blobs on or off"""
+        if not hasattr(conn, 'binary'):
+            raise ProtocolError('binary transport is not supported on this interface')
+        conn.binary = bool(data)
+        return BINARY_REPLY, None, conn.binary
@@ -22,7 +22,12 @@
 
 import json
 
+from frappy.lib import lazy_import
+
+np = lazy_import('numpy')
+
 EOL = b'\n'
+BINARY_KEY = '$binary'
 
 
 def encode_msg_frame(action, specifier=None, data=None):
@@ -34,6 +39,47 @@ def encode_msg_frame(action, specifier=None, data=None):
     return ' '.join(msg).strip().encode('utf-8') + EOL
 
 
+def has_binary(data):
+    """check if the value in data can be sent in binary"""
+    return isinstance(data, list) and bool(data) and hasattr(data[0], 'raw')
+
+
+def encode_msg_frame_binary(action, specifier=None, data=None):
+    """like encode_msg_frame, but an array or blob value is sent in binary
+
+    when the value (the first element of data) is an exported numeric array
+    or blob, it is replaced by {"$binary": [<dtype>, <number of bytes>]},
+    and the bytes are appended after the end of line.
+    <dtype> is 'bytes' for blobs, else a numpy dtype string like '<f8'
+    """
+    if not has_binary(data):
+        return encode_msg_frame(action, specifier, data)
+    raw = data[0].raw
+    if isinstance(raw, bytes):
+        dtype, payload = 'bytes', raw
+    else:
+        dtype, payload = raw.dtype.str, raw.tobytes()
+    placeholder = {BINARY_KEY: [dtype, len(payload)]}
+    return encode_msg_frame(action, specifier, [placeholder] + data[1:]) + payload
+
+
+def binary_size(data):
+    """the number of bytes following the message, 0 if none"""
+    try:
+        return data[0][BINARY_KEY][1]
+    except (TypeError, KeyError, IndexError):
+        return 0
+
+
+def decode_binary(data, payload):
+    """replace the placeholder in data by the value decoded from payload
+
+    arrays are decoded into read-only numpy arrays, without copying
+    """
+    dtype = data[0][BINARY_KEY][0]
+    data[0] = payload if dtype == 'bytes' else np.frombuffer(payload, dtype)
+
+
 def get_msg(_bytes):
     """try to deframe the next msg in (binary) input
     always return a tuple (msg, remaining_input)
@@ -29,7 +29,8 @@ import time
 from frappy.datatypes import BoolType, StringType
 from frappy.lib import SECoP_DEFAULT_PORT
 from frappy.properties import Property
-from frappy.protocol.interface import decode_msg, encode_msg_frame, get_msg
+from frappy.protocol.interface import decode_msg, encode_msg_frame, \
+    encode_msg_frame_binary, get_msg
 from frappy.protocol.interface.handler import ConnectionClose, \
     RequestHandler, DecodeError
 from frappy.protocol.messages import HELPREQUEST
@@ -52,6 +53,7 @@ class TCPRequestHandler(RequestHandler):
         super().setup()
         self.request.settimeout(60)
         self.data = b''
+        self.binary = False  # switched on by the binary request
 
     def finish(self):
         """called when handle() terminates, i.e. the socket closed"""
@@ -98,7 +100,10 @@ class TCPRequestHandler(RequestHandler):
         if not data:
             self.log.error('should not reply empty data!')
             return
-        outdata = encode_msg_frame(*data)
+        if self.binary:
+            outdata = encode_msg_frame_binary(*data)
+        else:
+            outdata = encode_msg_frame(*data)
         with self.send_lock:
             if self.running:
                 try:
@@ -24,6 +24,7 @@ from functools import partial
 from websockets.exceptions import ConnectionClosedOK, ConnectionClosedError
 from websockets.sync.server import CloseCode, serve
 
+from frappy.protocol.interface import encode_msg_frame_binary, has_binary
 from frappy.protocol.interface.handler import ConnectionClose, \
     RequestHandler, DecodeError
 from frappy.protocol.messages import HELPREQUEST
@@ -50,6 +51,7 @@ class WSRequestHandler(RequestHandler):
     def setup(self):
         super().setup()
         self.server.connections.add(self)
+        self.binary = False  # switched on by the binary request
 
     def finish(self):
         """called when handle() terminates, i.e. the socket closed"""
@@ -108,7 +110,11 @@ class WSRequestHandler(RequestHandler):
         if not data:
             self.log.error('should not reply empty data!')
             return
-        outdata = encode_msg_frame_str(*data)
+        if self.binary and has_binary(data):
+            # a binary websocket message: the text line followed by the bytes
+            outdata = encode_msg_frame_binary(*data)
+        else:
+            outdata = encode_msg_frame_str(*data)
         with self.send_lock:
             if self.running:
                 try:
@@ -66,6 +66,19 @@ LOGGING_REPLY = 'logging'
 LOG_EVENT = 'log'
 # + [module:level] + json_string (message)
 
+# frappy extension: numeric arrays and blobs are sent in binary after the message
+BINARY_REQUEST = '_binary'
+BINARY_REPLY = '_binary'
+# + json bool (on / off)
+
+# frappy extension: change several parameters of a module in one request
+MULTICHANGEREQUEST = '_multichange'  # +module +json object <parameter> of <value>
+MULTICHANGEREPLY = '_multichanged'  # +module +json object <parameter> of [<value>, <qualifiers>]
+
+# frappy extension: query the history of a parameter, decimated to time buckets
+HISTORYREQUEST = '_history'  # +module:parameter[.member] +json object {start, end, buckets}
+HISTORYREPLY = '_historydata'  # +module:parameter[.member] +json object {t, min, max, mean}
+
 # helper mapping to find the REPLY for a REQUEST
 # do not put IDENTREQUEST/IDENTREPLY here, as this needs anyway extra treatment
 REQUEST2REPLY = {
@@ -78,6 +91,9 @@ REQUEST2REPLY = {
     HEARTBEATREQUEST:     HEARTBEATREPLY,
     HELPREQUEST:          HELPREPLY,
     LOGGING_REQUEST:      LOGGING_REPLY,
+    BINARY_REQUEST:       BINARY_REPLY,
+    MULTICHANGEREQUEST:   MULTICHANGEREPLY,
+    HISTORYREQUEST:       HISTORYREPLY,
 }
 
 
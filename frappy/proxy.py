@@ -24,6 +24,7 @@ from frappy.client import SecopClient, decode_msg, encode_msg_frame
 from frappy.datatypes import StringType
 from frappy.errors import BadValueError, CommunicationFailedError, ConfigError
 from frappy.lib import get_class
+from frappy.modulebase import generated_class
 from frappy.modules import Drivable, Module, Readable, Writable
 from frappy.params import Command, Parameter
 from frappy.properties import Property
@@ -189,7 +190,12 @@ def proxy_class(remote_class, name=None):
         rcls = get_class(remote_class)
     if name is None:
         name = rcls.__name__
+    # the class is cached, as it is created for every proxy module instance
+    return generated_class(('proxy', rcls, name),
+                           lambda: _create_proxy_class(rcls, name, remote_class))
 
+
+def _create_proxy_class(rcls, name, remote_class):
     for proxycls in PROXY_CLASSES:
         if issubclass(rcls, proxycls.__bases__[-1]):
             # avoid 'should not be redefined' warning
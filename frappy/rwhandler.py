@@ -181,9 +181,11 @@ class WriteParameters(dict):
 
     def __missing__(self, key):
         try:
-            return self.obj.writeDict.pop(key)
+            value = self.obj.writeDict.pop(key)
         except KeyError:
             return getattr(self.obj, key)
+        self[key] = value  # the value is no longer in writeDict
+        return value
 
     def as_tuple(self, *keys):
         """return values of given keys as a tuple"""
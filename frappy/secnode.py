@@ -19,16 +19,42 @@
 #
 # *****************************************************************************
 
+import threading
 import time
 from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+from frappy.attached import Attached, AttachedDict
+from frappy.config import fingerprint
 from frappy.dynamic import Pinata
 from frappy.errors import NoSuchModuleError, NoSuchParameterError, SECoPError, \
     ConfigError, ProgrammingError
-from frappy.lib import get_class, generalConfig
+from frappy.lib import get_class, generalConfig, startup
 from frappy.version import get_version
 from frappy.modules import Module
 
+# number of threads for creating and initializing modules
+# 1: create and initialize all modules sequentially
+generalConfig.set_default('module_init_threads', 1)
+
+
+def module_references(value, names):
+    """return the names of modules referenced in a module config
+
+    any string value in <names> is considered as a reference. this catches
+    attached modules, but may include strings which are meant differently
+    """
+    if isinstance(value, str):
+        return {value} if value in names else set()
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, (list, tuple)):
+        return set()
+    result = set()
+    for item in value:
+        result.update(module_references(item, names))
+    return result
+
 
 class SecNode:
     """Managing the modules.
@@ -47,6 +73,13 @@ class SecNode:
         self.srv = srv
         self.error_count = 0  # count catchable errors during initialization
         self.name = name
+        self._module_locks = {}  # locks for creating and initializing modules
+        self._kept_modules = {}  # modules kept running from before a hot restart
+        self._lock = threading.Lock()
+
+    def _module_lock(self, modulename):
+        with self._lock:
+            return self._module_locks.setdefault(modulename, threading.RLock())
 
     def add_secnode_property(self, prop, value):
         """Add SECNode property. If starting with an underscore, it is exported
@@ -63,7 +96,12 @@ class SecNode:
         if generalConfig.raise_config_errors:
             raise ConfigError(error) if isinstance(error, str) else error
         self.log.error(str(error))
-        self.error_count += 1
+        self.countError()
+
+    def countError(self):
+        """count a catchable error during initialization (thread safe)"""
+        with self._lock:
+            self.error_count += 1
 
     def get_secnode_property(self, prop):
         """Get SECNode property.
@@ -75,29 +113,35 @@ class SecNode:
     def get_module(self, modulename):
         """ Returns a fully initialized module. Or None, if something went
         wrong during instatiating/initializing the module."""
-        modobj = self.get_module_instance(modulename)
-        if modobj is None:
-            return None
-        if modobj._isinitialized:
+        modobj = self.modules.get(modulename)
+        if modobj is not None and modobj._isinitialized:
             return modobj
+        with self._module_lock(modulename):
+            # the lock prevents a concurrent initialization on startup
+            modobj = self.get_module_instance(modulename)
+            if modobj is None:
+                return None
+            if modobj._isinitialized:
+                return modobj
 
-        # also call earlyInit on the modules
-        self.log.debug('initializing module %r', modulename)
-        modobj.earlyInit()
-        if not modobj.earlyInitDone:
-            self.logError(ProgrammingError(
-                f'module {modulename}: '
-                'Module.earlyInit was not called, probably missing super call'))
-            modobj.earlyInitDone = True
-        modobj.initModule()
-        if not modobj.initModuleDone:
-            self.logError(ProgrammingError(
-                f'module {modulename}: '
-                'Module.initModule was not called, probably missing super call'))
-            modobj.initModuleDone = True
-        modobj._isinitialized = True
-        self.log.debug('initialized module %r', modulename)
-        return modobj
+            # also call earlyInit on the modules
+            self.log.debug('initializing module %r', modulename)
+            with startup.measure('initModule', modulename):
+                modobj.earlyInit()
+                if not modobj.earlyInitDone:
+                    self.logError(ProgrammingError(
+                        f'module {modulename}: '
+                        'Module.earlyInit was not called, probably missing super call'))
+                    modobj.earlyInitDone = True
+                modobj.initModule()
+                if not modobj.initModuleDone:
+                    self.logError(ProgrammingError(
+                        f'module {modulename}: '
+                        'Module.initModule was not called, probably missing super call'))
+                    modobj.initModuleDone = True
+            modobj._isinitialized = True
+            self.log.debug('initialized module %r', modulename)
+            return modobj
 
     def get_module_instance(self, modulename):
         """ Returns the module in its current initialization state or creates a
@@ -111,6 +155,9 @@ class SecNode:
         if modulename in list(self.modules.values()):
             # it's actually already the module object
             return modulename
+        modobj = self._kept_modules.get(modulename)
+        if modobj is not None:
+            return modobj
 
         # create module from srv.module_cfg, store and return
         self.log.debug('attempting to create module %r', modulename)
@@ -123,7 +170,8 @@ class SecNode:
         classname = opts.pop('cls')
         try:
             if isinstance(classname, str):
-                cls = get_class(classname)
+                with startup.measure('class import', modulename):
+                    cls = get_class(classname)
             else:
                 cls = classname
             if not issubclass(cls, Module):
@@ -134,51 +182,168 @@ class SecNode:
                 self.logError(f'{classname} not found')
                 return None
             raise
-        modobj = cls(modulename, self.log.parent.getChild(modulename),
-                     opts, self.srv)
+        with startup.measure('module creation', modulename):
+            modobj = cls(modulename, self.log.parent.getChild(modulename),
+                         opts, self.srv)
         return modobj
 
     def create_modules(self):
-        self.modules = OrderedDict()
-
+        # self.modules may already contain modules kept running on a hot restart
         # create and initialize modules
+        nthreads = generalConfig.module_init_threads
         todos = list(self.srv.module_cfg.items())
+        if nthreads > 1 and len(todos) > 1:
+            todos = self._create_modules_parallel(nthreads, todos)
         while todos:
             modname, options = todos.pop(0)
-            if modname in self.modules:
-                # already created via Attached
-                continue
-            # For Pinata modules: we need to access this in Self.get_module
-            self.srv.module_cfg[modname] = options
-            modobj = self.get_module_instance(modname)  # lazy
-            if modobj is None:
-                self.log.debug('Module %s returned None', modname)
-                continue
-            self.modules[modname] = modobj
-            if isinstance(modobj, Pinata):
-                # scan for dynamic devices
-                pinata = self.get_module(modname)
-                pinata_modules = list(pinata.scanModules())
-                for name, _cfg in pinata_modules:
-                    if name in self.srv.module_cfg:
-                        self.log.error('Module %s, from pinata %s, already '
-                                       'exists in config file!', name, modname)
-                self.log.info('Pinata %s found %d modules',
-                              modname, len(pinata_modules))
-                todos.extend(pinata_modules)
+            todos.extend(self._create_module(modname, options))
         # initialize all modules
-        for modname in self.modules:
-            modobj = self.get_module(modname)
-            # check attached modules for existence
-            # normal properties are retrieved too, but this does not harm
-            for prop in modobj.propertyDict:
-                try:
-                    getattr(modobj, prop)
-                except SECoPError as e:
-                    if generalConfig.raise_config_errors:
-                        raise
-                    self.error_count += 1
-                    modobj.logError(e)
+        if nthreads > 1 and len(self.modules) > 1:
+            self._init_modules_parallel(nthreads)
+        else:
+            for modname in self.modules:
+                self._init_module(modname)
+
+    def _create_module(self, modname, options):
+        """create a module
+
+        :return: the list of (<name>, <options>) of the modules provided
+            by a Pinata module, still to be created
+        """
+        if modname in self.modules:
+            # already created via Attached
+            return []
+        # For Pinata modules: we need to access this in Self.get_module
+        self.srv.module_cfg[modname] = options
+        modobj = self.get_module_instance(modname)  # lazy
+        if modobj is None:
+            self.log.debug('Module %s returned None', modname)
+            return []
+        self.modules[modname] = modobj
+        if not isinstance(modobj, Pinata):
+            return []
+        # scan for dynamic devices
+        pinata = self.get_module(modname)
+        pinata_modules = list(pinata.scanModules())
+        for name, _cfg in pinata_modules:
+            if name in self.srv.module_cfg:
+                self.log.error('Module %s, from pinata %s, already '
+                               'exists in config file!', name, modname)
+        self.log.info('Pinata %s found %d modules',
+                      modname, len(pinata_modules))
+        return pinata_modules
+
+    def _create_group(self, todos):
+        pinata_modules = []
+        for modname, options in todos:
+            pinata_modules.extend(self._create_module(modname, options))
+        return pinata_modules
+
+    def _create_modules_parallel(self, nthreads, todos):
+        """create modules in a thread pool
+
+        modules referring to each other in their config or sharing an uri are
+        created sequentially in config order, as the creation of a module may
+        rely on modules created before, e.g. a communicator shared by uri.
+        The groups of linked modules are created in parallel.
+
+        :return: the list of (<name>, <options>) of the modules provided
+            by Pinata modules, still to be created
+        """
+        names = {name for name, _ in todos}
+        parent = {}
+
+        def root(key):
+            while parent.get(key, key) != key:
+                key = parent[key]
+            return key
+
+        for name, options in todos:
+            uri = options.get('uri')
+            uri = uri.get('value') if isinstance(uri, dict) else uri
+            for other in module_references(options, names) | ({('uri', uri)} if uri else set()):
+                parent[root(other)] = root(name)
+        groups = {}
+        for name, options in todos:
+            groups.setdefault(root(name), []).append((name, options))
+        before = list(self.modules)  # kept modules created on the fly
+        pinata_modules = []
+        with ThreadPoolExecutor(nthreads, thread_name_prefix='create') as executor:
+            for future in [executor.submit(self._create_group, g) for g in groups.values()]:
+                pinata_modules.extend(future.result())  # raise errors in the main thread
+        # restore the order of sequential creation: modules created on the fly
+        # are placed before the first module using them
+        order = dict.fromkeys(before)
+        dependencies = self._dependencies()
+        for name, _ in todos:
+            if name in self.modules:
+                order.update(dict.fromkeys(sorted(dependencies[name] - names)))
+                order[name] = None
+        order.update(dict.fromkeys(self.modules))
+        modules = dict(self.modules)
+        self.modules.clear()
+        self.modules.update((name, modules[name]) for name in order)
+        return pinata_modules
+
+    def _init_module(self, modname):
+        modobj = self.get_module(modname)
+        # check attached modules for existence
+        # normal properties are retrieved too, but this does not harm
+        for prop in modobj.propertyDict:
+            try:
+                getattr(modobj, prop)
+            except SECoPError as e:
+                if generalConfig.raise_config_errors:
+                    raise
+                self.countError()
+                modobj.logError(e)
+
+    def _dependencies(self):
+        """return a dict <module name> of the names of its attached modules
+
+        taken from the created modules, this includes modules attached
+        implicitly, e.g. a communicator created from an uri
+        """
+        result = {}
+        for name, modobj in self.modules.items():
+            depends = {m.name for m in modobj.attachedModules.values()}
+            for pname, prop in modobj.propertyDict.items():
+                value = modobj.propertyValues.get(pname)
+                if isinstance(prop, Attached):
+                    value = [value]
+                elif isinstance(prop, AttachedDict):
+                    value = (value or {}).values()
+                else:
+                    continue
+                depends.update(getattr(v, 'name', v) for v in value if v)
+            result[name] = (depends & set(self.modules)) - {name}
+        return result
+
+    def _init_modules_parallel(self, nthreads):
+        """initialize modules in a thread pool
+
+        a module is initialized only after its attached modules.
+        Independent modules are initialized in parallel.
+        """
+        todo = self._dependencies()
+        done = set()
+        running = {}
+        with ThreadPoolExecutor(nthreads, thread_name_prefix='init') as executor:
+            while todo or running:
+                for name, deps in list(todo.items()):
+                    if deps <= done:
+                        del todo[name]
+                        running[executor.submit(self._init_module, name)] = name
+                if not running:
+                    # cyclic references: initialize the rest sequentially
+                    self.log.warning('cyclic references in %s', ', '.join(todo))
+                    for name in todo:
+                        self._init_module(name)
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done.add(running.pop(future))
+                    future.result()  # raise errors in the main thread
 
     def export_accessibles(self, modobj):
         self.log.debug('export_accessibles(%r)', modobj.name)
@@ -247,19 +412,88 @@ class SecNode:
     #     for k in [kk for kk in self._subscriptions if kk.startswith(f'{modulename}:')]:
     #         self._subscriptions.pop(k, None)
 
-    def shutdown_modules(self):
-        """Call 'shutdownModule' for all modules."""
+    def shutdown_modules(self, keep=()):
+        """Call 'shutdownModule' for all modules.
+
+        :param keep: the names of the modules to be kept running on a hot restart
+        """
+        modules = [mod for name, mod in self.modules.items() if name not in keep]
         # stop pollers
-        for mod in self.modules.values():
+        for mod in modules:
             mod.stopPollThread()
             # do not yet join here, as we want to wait in parallel
         now = time.time()
         deadline = now + 0.5  # should be long enough for most read functions to finish
-        for mod in self.modules.values():
+        for mod in modules:
             mod.joinPollThread(max(0.0, deadline - now))
             now = time.time()
         for name in self._getSortedModules():
-            self.modules[name].shutdownModule()
+            if name not in keep:
+                self.modules[name].shutdownModule()
+
+    def reusable_modules(self, fingerprints, new_cfg):
+        """determine the modules to be kept running on a hot restart
+
+        :param fingerprints: dict <module name> of the fingerprint of the config
+            the running modules were created from
+        :param new_cfg: the new module config
+        :return: dict <module name> of module object
+
+        modules are kept when their config is unchanged, but modules linked to
+        a module to be recreated are recreated too. modules are linked when one is
+        attached to the other, referenced in the config of the other or polled by
+        the poll thread of the other. modules created on the fly, like a communicator
+        created from an uri, are kept together with a module linked to them.
+        Pinata modules are always recreated, as the modules they provide may change.
+        """
+        names = set(self.modules) | set(new_cfg)
+        links = {}
+
+        def link(name, other):
+            links.setdefault(name, set()).add(other)
+            links.setdefault(other, set()).add(name)
+
+        for name, modobj in self.modules.items():
+            for other in list(modobj.attachedModules.values()) + list(modobj.polledModules):
+                link(name, other.name)
+            for other in module_references(self.srv.module_cfg.get(name), names):
+                link(name, other)
+        for name, cfg in new_cfg.items():
+            for other in module_references(cfg, names):
+                link(name, other)
+        keep = set()
+        for name, modobj in self.modules.items():
+            if isinstance(modobj, Pinata):
+                continue
+            if name in fingerprints:
+                if fingerprint(new_cfg.get(name)) == fingerprints[name]:
+                    keep.add(name)
+            elif name not in new_cfg:  # created on the fly
+                keep.add(name)
+        todo = names - keep
+        while todo:
+            for other in links.get(todo.pop(), ()):
+                if other in keep:
+                    keep.discard(other)
+                    todo.add(other)
+        # modules created on the fly are kept only together with a module linked to them
+        keep -= {name for name in keep - set(fingerprints) if not links.get(name, set()) & keep}
+        return {name: self.modules[name] for name in keep}
+
+    def keep_modules(self, modules):
+        """take over the modules kept running on a hot restart
+
+        :param modules: the modules returned by reusable_modules of the previous SecNode
+
+        configured modules are added in create_modules, in the order of the config,
+        modules created on the fly are added here
+        """
+        for modname, modobj in modules.items():
+            modobj.secNode = self
+            modobj.updateCallback = self.srv.dispatcher.announce_update
+            if modname not in self.srv.module_cfg:
+                self.add_module(modobj, modname)
+        self._kept_modules = modules
 
     def _getSortedModules(self):
         """Sort modules topologically by inverse dependency.
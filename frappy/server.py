@@ -30,9 +30,10 @@ import time
 
 import mlzlog
 
-from frappy.config import load_config
+from frappy.config import fingerprint, load_config
 from frappy.errors import ConfigError, ProgrammingError
-from frappy.lib import formatException, generalConfig, get_class, mkthread
+from frappy.lib import formatException, generalConfig, get_class, lazy_import, \
+    mkthread, startup
 from frappy.lib.multievent import MultiEvent
 from frappy.logging import init_remote_logging
 from frappy.params import PREDEFINED_ACCESSIBLES
@@ -40,15 +41,11 @@ from frappy.secnode import SecNode
 from frappy.protocol.discovery import UDPListener
 
 generalConfig.set_default('raise_config_errors', False)
-
-try:
-    from daemon import DaemonContext
-    try:
-        from daemon import pidlockfile
-    except ImportError:
-        import daemon.pidfile as pidlockfile
-except ImportError:
-    DaemonContext = None
+# directory for the built-in history, None: no built-in history. needs numpy
+generalConfig.set_default('history_dir', None)
+# hot restart (opt-in): reload the config on restart and keep modules with
+# unchanged config running. default: full restart with the config loaded on startup
+generalConfig.set_default('hot_restart', False)
 
 try:
     # pylint: disable=unused-import
@@ -106,20 +103,50 @@ class Server:
             self.log = parent_logger.getChild(name)
         init_remote_logging(self.log)
 
-        merged_cfg = load_config(cfgfiles, self.log)
-        self.node_cfg = merged_cfg.pop('node')
-        self.module_cfg = merged_cfg
-        if interface:
-            self.node_cfg['interface'] = str(interface)
-        elif not self.node_cfg.get('interface'):
-            raise ConfigError('No interface specified in configuration or arguments!')
-
         self._cfgfiles = cfgfiles
+        self._interface = interface
+        self._loadCfg()
+        if generalConfig.history_dir and not lazy_import('numpy'):
+            raise ConfigError('the built-in history (history_dir) needs numpy, which is not installed')
+        self._kept_modules = {}  # modules kept running on a hot restart
         self._pidfile = generalConfig.piddir / (name + '.pid')
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
 
         self.discovery = None
+        self.history = None
+
+    def _loadCfg(self):
+        merged_cfg = load_config(self._cfgfiles, self.log)
+        self.node_cfg = merged_cfg.pop('node')
+        self.module_cfg = merged_cfg
+        if self._interface:
+            self.node_cfg['interface'] = str(self._interface)
+        elif not self.node_cfg.get('interface'):
+            raise ConfigError('No interface specified in configuration or arguments!')
+        # the module config is modified when creating the modules
+        self._fingerprints = {name: fingerprint(cfg) for name, cfg in merged_cfg.items()}
+        self._node_fingerprint = fingerprint(
+            {k: v for k, v in self.node_cfg.items() if k not in ('interface', 'secondary')})
+
+    def _reloadCfg(self):
+        """reload the config on a hot restart
+
+        :return: dict <module name> of modules to be kept running
+        """
+        node_fingerprint, fingerprints = self._node_fingerprint, self._fingerprints
+        try:
+            self._loadCfg()
+        except Exception as e:
+            self.log.error('can not reload config, keep running modules: %r', e)
+            return dict(self.secnode.modules)
+        if self._node_fingerprint != node_fingerprint:
+            self.log.info('node config changed: recreate all modules')
+            return {}
+        keep = self.secnode.reusable_modules(fingerprints, self.module_cfg)
+        self.log.info('keep %d modules running, recreate the others: %s', len(keep),
+                      ', '.join(m for m in self.secnode.modules if m not in keep) or 'none')
+        return keep
 
     def signal_handler(self, num, frame):
         if hasattr(self, 'interfaces') and self.interfaces:
@@ -130,8 +157,16 @@ class Server:
             signal.default_int_handler(num, frame)
 
     def start(self):
-        if not DaemonContext:
-            raise ConfigError('can not daemonize, as python-daemon is not installed')
+        # pylint: disable=import-outside-toplevel
+        # python-daemon is imported only when needed
+        try:
+            from daemon import DaemonContext
+            try:
+                from daemon import pidlockfile
+            except ImportError:
+                import daemon.pidfile as pidlockfile
+        except ImportError:
+            raise ConfigError('can not daemonize, as python-daemon is not installed') from None
         piddir = self._pidfile.parent
         if not piddir.is_dir():
             piddir.mkdir(parents=True)
@@ -240,7 +275,11 @@ class Server:
                     systemd.daemon.notify('RELOADING=1')
                 else:
                     systemd.daemon.notify('STOPPING=1')
-            self.secnode.shutdown_modules()
+            if self._restart and generalConfig.hot_restart:
+                self._kept_modules = self._reloadCfg()
+            self.secnode.shutdown_modules(self._kept_modules)
+            if self.history:
+                self.history.close()
             if self._restart:
                 self.restart_hook()
                 self.log.info('restarting')
@@ -295,6 +334,8 @@ class Server:
         cls = get_class(opts.pop('cls'))
         self.secnode = SecNode(self.name, self.log.getChild('secnode'), opts, self)
         self.dispatcher = cls(self.name, self.log.getChild('dispatcher'), opts, self)
+        self.secnode.keep_modules(self._kept_modules)
+        self._kept_modules = {}
 
         # add other options as SECNode properties, those with '_' prefixed will
         # get exported
@@ -311,6 +352,8 @@ class Server:
             if not self._testonly:
                 start_events = MultiEvent(default_timeout=30)
                 for modname, modobj in self.secnode.modules.items():
+                    if modobj.startModuleDone:
+                        continue  # kept running on a hot restart
                     # startModule must return either a timeout value or None (default 30 sec)
                     start_events.name = f'module {modname}'
                     if self.secnode.error_count:
@@ -331,6 +374,7 @@ class Server:
             self.log.error('%d errors during initialisation', self.secnode.error_count)
             sys.exit(1)
         if self._testonly:
+            self.reportStartup()
             return
         self.log.info('waiting for modules being started')
         start_events.name = None
@@ -342,6 +386,7 @@ class Server:
             self.log.error('%d errors during startup', self.secnode.error_count)
             sys.exit(1)
         self.log.info('all modules started')
+        self.reportStartup()
         history_path = os.environ.get('FRAPPY_HISTORY')
         if history_path:
             from frappy_psi.historywriter import \
@@ -350,6 +395,13 @@ class Server:
             # treat writer as a connection
             self.dispatcher.add_connection(writer)
             writer.init(self.dispatcher.handle_describe(writer, None, None))
+        history_dir = generalConfig.history_dir
+        if history_dir:
+            from frappy.history import \
+                HistoryWriter  # pylint: disable=import-outside-toplevel
+            self.history = HistoryWriter(history_dir, self.dispatcher, self.log.getChild('history'))
+            self.dispatcher.add_connection(self.history)
+            self.history.init(self.dispatcher.handle_describe(self.history, None, None))
         # TODO: if ever somebody wants to implement an other history writer:
         # - a general config file /etc/secp/frappy.conf or <frappy repo>/etc/frappy.conf
         #   might be introduced, which contains the log, pid and cfg directory path and
@@ -358,3 +410,12 @@ class Server:
         #   history_path = os.environ.get('ALTERNATIVE_HISTORY')
         #   if history_path:
         #       from frappy_<xx>.historywriter import ... etc.
+
+    def reportStartup(self):
+        """log the startup profile, when enabled with --profile-startup"""
+        profile = startup.profile
+        if profile:
+            profile.stop()
+            for line in profile.report():
+                self.log.info(line)
+            startup.profile = None
@@ -19,7 +19,7 @@
 
 import time
 import frappyhistory  # pylint: disable=import-error
-from frappy.datatypes import get_datatype, IntRange, FloatRange, ScaledInteger,\
+from frappy.datatypes import get_shared_datatype, IntRange, FloatRange, ScaledInteger,\
     EnumType, BoolType, StringType, TupleOf, StructOf
 
 
@@ -102,7 +102,7 @@ class FrappyHistoryWriter(frappyhistory.FrappyWriter):
                 ident = key = modname + ':' + pname
                 if pname.startswith('_') and pname[1:] not in self.predefined_names:
                     key = modname + ':' + pname[1:]
-                dt = get_datatype(pdesc['datainfo'])
+                dt = get_shared_datatype(pdesc['datainfo'])
                 cvt_list = make_cvt_list(dt, key)
                 for _, hkey, opts in cvt_list:
                     if pname == 'value':
@@ -43,7 +43,7 @@ from frappy.core import IDLE, BUSY, ERROR, DISABLED
 from frappy.errors import ConfigError, HardwareError, ReadFailedError, CommunicationFailedError
 from frappy.lib import generalConfig, mkthread, lazy_property
 from frappy.lib.asynconn import AsynConn, ConnectionClosed
-from frappy.modulebase import Done
+from frappy.modulebase import Done, generated_class
 from frappy.modules import Attached, Command, Drivable, \
     Module, Parameter, Property, Readable, Writable
 
@@ -455,6 +455,7 @@ class SeaModule(Module):
     io = Attached()
 
     path2param = None
+    extra_params = None  # dict <module name>.<parameter name> of parameters for extra modules
     sea_object = None
     hdbpath = None  # hdbpath for main writable
 
@@ -549,8 +550,20 @@ class SeaModule(Module):
                 paramdesc['key'] = 'target'
                 paramdesc['readonly'] = False
             extra_module_set = set(cfgdict.pop('extra_modules', ()))
+        # the class is cached, as creating it is expensive, in case of many parameters
+        key = cls, name, json.dumps([sea_object, base, params, sorted(extra_module_set)], sort_keys=True)
+        newcls = generated_class(key, lambda: cls._create_class(
+            name, sea_object, base, params, extra_module_set))
+        extra_modules.update(newcls.extra_params)
+        return Module.__new__(newcls)
+
+    @classmethod
+    def _create_class(cls, name, sea_object, base, params, extra_module_set):
+        # pylint: disable=too-many-locals
         path2param = {}
-        attributes = {'sea_object': sea_object, 'path2param': path2param}
+        extra_params = {}
+        attributes = {'sea_object': sea_object, 'path2param': path2param,
+                      'extra_params': extra_params}
 
         # some guesses about visibility (may be overriden in *_cfg.py):
         if sea_object in ('table', 'cc'):
@@ -606,7 +619,7 @@ class SeaModule(Module):
 
             hdbpath = '/'.join([base] + pathlist)
             if key in extra_module_set:
-                extra_modules[name + '.' + key] = sea_object, base, paramdesc
+                extra_params[name + '.' + key] = sea_object, base, paramdesc
                 continue  # skip this parameter
             path2param.setdefault(hdbpath, []).append((name, key))
             attributes[key] = pobj
@@ -648,9 +661,7 @@ class SeaModule(Module):
                 pobj.__set_name__(cls, pname)
 
         classname = f'{cls.__name__}_{name}'
-        newcls = type(classname, (cls,), attributes)
-        result = Module.__new__(newcls)
-        return result
+        return type(classname, (cls,), attributes)
 
     def updateEvent(self, module, parameter, value, timestamp, readerror):
         upd = getattr(self, 'update_' + parameter, None)
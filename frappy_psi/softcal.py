@@ -24,13 +24,15 @@ import os
 from os.path import basename, dirname, exists, join
 
 import numpy as np
-from scipy.interpolate import splev, splrep  # pylint: disable=import-error
 
 from frappy.core import Attached, BoolType, Parameter, Readable, StringType, \
     FloatRange, nopoll
+from frappy.lib import lazy_import
 from frappy_psi.convergence import HasConvergence
 from frappy_psi.picontrol import PImixin
 
+interpolate = lazy_import('scipy.interpolate')
+
 
 def linear(x):
     return x
@@ -160,7 +162,7 @@ class CalCurve:
         elif np.any(x[:-1] >= x[1:]):  # some not increasing
             raise ValueError(f'calib curve {calibspec} is not monotonic')
         try:
-            self.spline = splrep(x, y, s=0, k=min(3, len(x) - 1))
+            self.spline = interpolate.splrep(x, y, s=0, k=min(3, len(x) - 1))
         except (ValueError, TypeError) as e:
             raise ValueError(f'invalid calib curve {calibspec}') from e
 
@@ -169,7 +171,7 @@ class CalCurve:
 
         value might be a single value or an numpy array
         """
-        result = splev(self.convert_x(value), self.spline)
+        result = interpolate.splev(self.convert_x(value), self.spline)
         return self.convert_y(result)
 
 
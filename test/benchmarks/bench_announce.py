@@ -0,0 +1,87 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""benchmark the update path: Module.announceUpdate -> dispatcher -> connection
+
+usage: python -m test.benchmarks.bench_announce [nupdates] [--profile]
+"""
+
+import cProfile
+import logging
+import pstats
+import sys
+import time
+
+from frappy.datatypes import FloatRange, StatusType
+from frappy.lib import generalConfig
+from frappy.modules import Readable
+from frappy.params import Parameter
+from frappy.protocol.dispatcher import Dispatcher
+
+
+class ConnectionStub:
+    def __init__(self):
+        self.count = 0
+
+    def send_reply(self, msg):
+        self.count += 1
+
+
+class ServerStub:
+    restart = shutdown = None
+
+    def __init__(self):
+        self.secnode = None
+        self.dispatcher = Dispatcher('dispatcher', logging.getLogger('bench'), {}, self)
+
+
+class Synthetic(Readable):
+    value = Parameter('main value', FloatRange(unit='K'))
+    other = Parameter('a parameter with a callback', FloatRange())
+
+
+def run(modobj, nupdates):
+    update = modobj.announceUpdate
+    status = (StatusType.IDLE, 'ok'), (StatusType.WARN, 'drifting')
+    t = time.perf_counter()
+    for i in range(nupdates // 4):
+        update('value', i * 0.1)
+        update('other', i * 0.2)
+        update('status', status[i % 2])
+        update('value', None, ValueError('bad reading'))
+    return time.perf_counter() - t
+
+
+def main(nupdates=200000, profile=False):
+    generalConfig.testinit(omit_unchanged_within=0)
+    srv = ServerStub()
+    conn = ConnectionStub()
+    srv.dispatcher.add_connection(conn)
+    srv.dispatcher._active_connections.add(conn)
+    modobj = Synthetic('synthetic', logging.getLogger('bench'), {'description': 'synthetic'}, srv)
+    modobj.addCallback('other', lambda value, err=None: None)
+    if profile:
+        prof = cProfile.Profile()
+        prof.runcall(run, modobj, nupdates)
+        pstats.Stats(prof).sort_stats('tottime').print_stats(15)
+        return
+    t = run(modobj, nupdates)
+    print(f'{nupdates} updates in {t:.2f} s: {nupdates / t:.0f} updates/s, {conn.count} messages')
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:] if a != '--profile'), profile='--profile' in sys.argv)
@@ -0,0 +1,51 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""benchmark numeric ArrayOf: vectorised versus element-wise processing
+
+usage: python -m test.benchmarks.bench_arrayof [size]
+"""
+
+import sys
+import timeit
+
+from frappy.datatypes import UNLIMITED, ArrayOf, FloatRange, IntRange, \
+    ScaledInteger
+
+
+def bench(members, values, number=20):
+    fast = ArrayOf(members, 0, len(values))
+    slow = ArrayOf(members, 0, len(values))
+    slow.vectorise_minlen = UNLIMITED
+    exported = fast.export_value(values)
+    print(repr(members))
+    for meth, arg in [('validate', values), ('export_value', values),
+                      ('import_value', exported)]:
+        tslow = timeit.timeit(lambda: getattr(slow, meth)(arg), number=number) / number
+        tfast = timeit.timeit(lambda: getattr(fast, meth)(arg), number=number) / number
+        print(f'  {meth:13s} element-wise {tslow * 1e3:8.3f} ms'
+              f'  vectorised {tfast * 1e3:8.3f} ms  ({tslow / tfast:5.1f} x)')
+
+
+def main(size=10000):
+    bench(FloatRange(-1e6, 1e6), [i * 0.5 for i in range(size)])
+    bench(IntRange(0, 10 * size), list(range(size)))
+    bench(ScaledInteger(0.001, -1e6, 1e6), [i * 0.5 for i in range(size)])
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
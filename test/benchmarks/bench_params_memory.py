@@ -0,0 +1,85 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""benchmark memory used by the parameters of a large generated configuration
+
+usage: python -m test.benchmarks.bench_params_memory [nmodules] [nparams]
+
+run on two revisions for comparing the memory footprint before and after a change
+"""
+
+import gc
+import logging
+import sys
+import time
+import tracemalloc
+
+from frappy.datatypes import FloatRange, IntRange, StatusType, StringType
+from frappy.lib import generalConfig
+from frappy.modules import Readable
+from frappy.params import Parameter
+
+
+class DispatcherStub:
+    def announce_update(self, moduleobj, pobj):
+        pass
+
+
+class ServerStub:
+    def __init__(self):
+        self.dispatcher = DispatcherStub()
+        self.secnode = type('SecNodeStub', (), {'raise_config_errors': False})
+
+
+def make_class(nparams):
+    """a module class with <nparams> parameters of mixed types"""
+    types = [lambda: FloatRange(unit='K'), lambda: IntRange(0, 100),
+             lambda: StringType(), lambda: StatusType(Readable)]
+    attrs = {f'par{i}': Parameter(f'parameter {i}', types[i % len(types)](), readonly=False)
+             for i in range(nparams)}
+    return type('GeneratedModule', (Readable,), attrs)
+
+
+def main(nmodules=500, nparams=20):
+    generalConfig.testinit()
+    cls = make_class(nparams)
+    srv = ServerStub()
+    log = logging.getLogger('bench')
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    t = time.perf_counter()
+    modules = []
+    for i in range(nmodules):
+        cfg = {'description': f'module {i}', 'par0': {'unit': 'mK'}}
+        modobj = cls(f'mod{i}', log, cfg, srv)
+        for pname, pobj in modobj.parameters.items():
+            # create the runtime state as on a running server
+            modobj.announceUpdate(pname, pobj.value)
+        modules.append(modobj)
+    t = time.perf_counter() - t
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(st.size_diff for st in after.compare_to(before, 'filename'))
+    count = sum(len(m.parameters) for m in modules)
+    print(f'{nmodules} modules, {count} parameters, created in {t:.2f} s')
+    print(f'  total {total / 1e6:8.2f} MB  per parameter {total / count:8.0f} bytes')
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
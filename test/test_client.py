@@ -0,0 +1,172 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""test the SECoP client (without connection)"""
+
+import threading
+from collections import defaultdict
+
+import pytest
+
+from frappy.client import DescriptionCache, SecopClient, UnregisterCallback
+from frappy.errors import WrongTypeError
+
+
+DESCRIPTION = {
+    'equipment_id': 'test.node',
+    'description': 'test node',
+    'modules': {
+        'temp': {
+            'description': 'a thermometer',
+            'interface_classes': ['Readable'],
+            'accessibles': {
+                'value': {'description': 'temperature', 'readonly': True,
+                          'datainfo': {'type': 'double', 'unit': 'K'}},
+                'status': {'description': 'status', 'readonly': True,
+                           'datainfo': {'type': 'tuple', 'members': [
+                               {'type': 'enum', 'members': {'IDLE': 100, 'ERROR': 400}},
+                               {'type': 'string'}]}},
+            },
+        },
+    },
+}
+
+
+def test_description_cache(tmpdir):
+    cache = DescriptionCache(tmpdir)
+    assert cache.load('localhost:5000') is None
+    cache.store('localhost:5000', DESCRIPTION)
+    assert cache.load('localhost:5000') == DESCRIPTION
+    assert cache.load('otherhost:5000') is None
+
+    changed = dict(DESCRIPTION, description='changed')
+    cache.store('localhost:5000', changed)
+    assert cache.load('localhost:5000') == changed
+    # the stale description is removed
+    assert len(tmpdir.listdir(lambda p: p.ext == '.json')) == 1
+
+    # a description still referenced by another uri is kept
+    cache.store('otherhost:5000', changed)
+    cache.store('localhost:5000', DESCRIPTION)
+    assert cache.load('otherhost:5000') == changed
+    assert cache.load('localhost:5000') == DESCRIPTION
+    assert len(tmpdir.listdir(lambda p: p.ext == '.json')) == 2
+
+
+def test_client_from_cache(tmpdir):
+    cache = DescriptionCache(tmpdir)
+    client = SecopClient('localhost:5000', None, cache)
+    assert not client.load_cached_description()
+
+    invalid = dict(DESCRIPTION, modules={'temp': {'accessibles': {'value': {}}}})
+    with pytest.raises(KeyError):
+        client._init_descriptive_data(invalid)
+    assert cache.load('localhost:5000') is None  # not stored when parsing fails
+
+    client._init_descriptive_data(DESCRIPTION)  # as done on connect
+    assert cache.load('localhost:5000') == DESCRIPTION
+
+    client = SecopClient('localhost:5000', None, cache)
+    assert client.load_cached_description()
+    assert client.nodename == 'test.node'
+    assert set(client.modules['temp']['parameters']) == {'value', 'status'}
+
+    changes = []
+    client.register_callback(None, descriptiveDataChange=lambda m, c: changes.append(m))
+    client._init_descriptive_data(DESCRIPTION)  # unchanged description
+    assert changes == []
+
+    changed = {k: v for k, v in DESCRIPTION.items() if k != 'modules'}
+    changed['modules'] = {'temp': dict(DESCRIPTION['modules']['temp'], description='changed')}
+    client._init_descriptive_data(changed)
+    assert changes == [None]
+    assert client.modules['temp']['properties']['description'] == 'changed'
+
+
+def test_update_callbacks():
+    client = SecopClient('localhost:5000', None)
+    client._init_descriptive_data(DESCRIPTION)
+    calls = []
+
+    def updateItem(module, param, item):
+        calls.append(('all', param, item.value))
+
+    def module_cb(module, param, item):
+        calls.append(('module', param, item.value))
+
+    def oneshot(module, param, value, timestamp, readerror):
+        calls.append(('oneshot', param, value))
+        raise UnregisterCallback()
+
+    client.register_callback(None, updateItem)
+    client.register_callback('temp', updateItem=module_cb)
+    client.register_callback(('temp', 'value'), updateEvent=oneshot)
+    client.updateValue('temp', 'value', 1.5, 1000, None)
+    assert calls == [('all', 'value', 1.5), ('module', 'value', 1.5), ('oneshot', 'value', 1.5)]
+    calls.clear()
+    client.updateValue('temp', 'value', 2.5, 1001, None)
+    assert calls == [('all', 'value', 2.5), ('module', 'value', 2.5)]
+    calls.clear()
+    client.unregister_callback('temp', updateItem=module_cb)
+    client.updateValue('temp', 'value', 3.5, 1002, None)
+    assert calls == [('all', 'value', 3.5)]
+    assert client.cache['temp', 'value'].value == 3.5
+
+
+def test_register_while_dispatching():
+    client = SecopClient('localhost:5000', None)
+    client._init_descriptive_data(DESCRIPTION)
+    calls = []
+
+    def updateEvent(module, param, value, timestamp, readerror):
+        calls.append(value)
+
+    threads = []
+
+    class Callbacks(defaultdict):
+        def get(self, key, default=None):
+            if key == ('temp', 'value') and not threads:
+                # register a callback from an other thread while the list of callbacks is built
+                thread = threading.Thread(target=client.register_callback,
+                                          args=(None, updateEvent), kwargs={'callimmediately': False})
+                threads.append(thread)
+                thread.start()
+                thread.join(0.1)
+            return super().get(key, default)
+
+    client.callbacks['updateEvent'] = Callbacks(list)
+    client.updateValue('temp', 'value', 1.5, 1000, None)
+    threads[0].join()
+    client.updateValue('temp', 'value', 2.5, 1001, None)
+    assert calls[-1:] == [2.5]
+
+
+def test_history():
+    np = pytest.importorskip('numpy')
+    client = SecopClient('localhost:5000', None)
+    client.history_size = 10
+    client._init_descriptive_data(DESCRIPTION)
+    assert list(client.history) == [('temp', 'value')]  # only numeric parameters
+    for i in range(15):
+        client.updateValue('temp', 'value', i, 1000 + i, None)
+    client.updateValue('temp', 'value', None, 1015, WrongTypeError('bad'))
+    t, v = client.getHistory('temp', 'value', 1010)
+    assert list(t) == [1010, 1011, 1012, 1013, 1014, 1015]
+    assert list(v[:-1]) == [10, 11, 12, 13, 14]
+    assert np.isnan(v[-1])
+    with pytest.raises(KeyError):
+        client.getHistory('temp', 'status')
@@ -23,8 +23,9 @@
 # pylint: disable=redefined-outer-name
 import pytest
 
-from frappy.config import Collector, Config, Mod, NodeCollector, load_config, \
-    process_file, to_config_path
+from frappy.config import Collector, Config, Mod, NodeCollector, fingerprint, \
+    load_config, process_file, to_config_path
+from frappy.datatypes import FloatRange
 from frappy.errors import ConfigError
 from frappy.lib import generalConfig
 
@@ -139,3 +140,15 @@ def test_process_file(direc, log):
 def test_full(direc, log):
     ret = load_config(['pyfile_cfg.py'], log)
     do_asserts(ret)
+
+
+def test_fingerprint(direc, log):
+    first = load_config(['pyfile_cfg.py'], log)
+    second = load_config(['pyfile_cfg.py'], log)
+    assert fingerprint(first) == fingerprint(second)
+    second['foo']['value']['unit'] = 'K'
+    assert fingerprint(first['foo']) != fingerprint(second['foo'])
+    assert fingerprint(first['bar']) == fingerprint(second['bar'])
+    # datatypes are compared by their repr
+    assert fingerprint({'datatype': FloatRange(0, 1)}) == fingerprint({'datatype': FloatRange(0, 1)})
+    assert fingerprint({'datatype': FloatRange(0, 1)}) != fingerprint({'datatype': FloatRange(0, 2)})
@@ -25,9 +25,9 @@
 import pytest
 
 from frappy.datatypes import ArrayOf, BLOBType, BoolType, CommandType, \
-    ConfigError, DataType, EnumType, FloatRange, \
-    IntRange, ProgrammingError, ScaledInteger, StatusType, StringType, \
-    StructOf, TextType, TupleOf, ValueType, get_datatype
+    ConfigError, DataType, EnumType, FloatRange, IntRange, LimitsType, \
+    ProgrammingError, ScaledInteger, StatusType, StringType, StructOf, \
+    TextType, TupleOf, ValueType, get_datatype, get_shared_datatype
 from frappy.errors import BadValueError, RangeError, WrongTypeError
 from frappy.lib import generalConfig
 
@@ -375,6 +375,45 @@ def test_ArrayOf():
     assert dt.to_string(dt([[1, 2]])) == "[['a', 'b']]"
 
 
+@pytest.mark.parametrize('members, values', [
+    (FloatRange(-10, 10), [i * 0.37 - 9 for i in range(50)]),
+    (FloatRange(), [1, 2.5, True, float('inf')] * 10),
+    (FloatRange(0, 1), [0.5] * 40 + [1 + 1e-9]),  # silently clamped
+    (IntRange(-100, 100), list(range(-50, 50))),
+    (IntRange(), [1.0, 2, True] * 20),
+    (ScaledInteger(0.01, -5, 5), [i * 0.123 - 4.9 for i in range(80)]),
+    (ScaledInteger(0.5, 0, 10), [10.2] * 40),  # silently clamped
+])
+def test_ArrayOf_vectorised(members, values):
+    pytest.importorskip('numpy')
+    dt = ArrayOf(members, 0, 1000)
+    elementwise = ArrayOf(members, 0, 1000)
+    elementwise.vectorise_minlen = 1001
+    assert dt._vectorised('_array_validate', values) is not None
+    for meth in 'validate', '__call__', 'export_value', 'import_value':
+        result = getattr(dt, meth)(values)
+        expected = getattr(elementwise, meth)(values)
+        assert result == expected
+        assert isinstance(result, type(expected))
+        assert [type(v) for v in result] == [type(v) for v in expected]
+    exported = dt.export_value(dt.validate(values))
+    assert dt.import_value(exported) == elementwise.import_value(exported)
+
+
+@pytest.mark.parametrize('members, values, error', [
+    (FloatRange(-10, 10), [0] * 40 + [11], RangeError),
+    (FloatRange(), [0] * 40 + ['x'], WrongTypeError),
+    (FloatRange(), [0] * 40 + [float('nan')], RangeError),
+    (IntRange(-100, 100), [0] * 40 + [101], RangeError),
+    (IntRange(), [0] * 40 + [1.5], WrongTypeError),
+    (ScaledInteger(0.5, 0, 10), [0] * 40 + [11], RangeError),
+])
+def test_ArrayOf_vectorised_errors(members, values, error):
+    pytest.importorskip('numpy')
+    with pytest.raises(error):
+        ArrayOf(members, 0, 1000).validate(values)
+
+
 def test_TupleOf():
     # test constructor catching illegal arguments
     with pytest.raises(ProgrammingError):
@@ -713,3 +752,113 @@ def test_value_type_rejecting(validator, value):
     assert t(value) == value
     with pytest.raises(ConfigError):
         tv(value)
+
+
+@pytest.mark.parametrize('dt, values', [
+    (FloatRange(-10, 10), [0, 1.5, True, 10 + 1e-9, 11, float('inf'), float('nan'), 'x', None]),
+    (IntRange(-10, 10), [0, 5, 5.0, 5.5, 11, True, 'x']),
+    (ScaledInteger(0.1, -1, 1), [0.123, 1.04, 1.2, -5, 'x']),
+    (StringType(1, 5), ['abc', '', 'toolong', 'ä', 'a\0', 5]),
+    (StringType(isUTF8=True), ['ä']),
+    (ArrayOf(FloatRange(0, 1), 1, 3), [[0.5, 1], [], [0, 0, 0, 0], [2], ['x'], 5, [0.5] * 50]),
+    (ArrayOf(FloatRange(0, 1), 0, 100), [[0.5] * 50, [0.5] * 49 + [2]]),
+    (TupleOf(IntRange(0, 5), StringType()), [(1, 'a'), [1, 'a'], (7, 'a'), (1,), 1]),
+    (LimitsType(FloatRange()), [(1, 2), (2, 1)]),
+    (StructOf(a=IntRange(0, 5), b=ArrayOf(StringType())), [
+        {'a': 1, 'b': ['x']}, {'a': 1}, {'a': 9, 'b': []}, {'a': 1, 'b': [], 'c': 1}]),
+    pytest.param(StatusType('IDLE', 'BUSY'), [(100, 'ok'), ('BUSY', 'moving'), (1, '')],
+                 id='StatusType'),
+])
+def test_compiled(dt, values):
+    def result(func, value, *args):
+        try:
+            return repr(func(value, *args))  # repr: nan != nan
+        except Exception as e:
+            return type(e), str(e)
+
+    for value in values:
+        for meth in '__call__', 'validate', 'export_value', 'import_value':
+            expected = result(getattr(dt, meth), value)
+            assert result(dt.compiled(meth), value) == expected
+        if isinstance(dt, (TupleOf, StructOf)):
+            previous = dt.default
+            expected = result(dt.validate, value, previous)
+            assert result(dt.compiled('validate'), value, previous) == expected
+
+
+def test_compiled_invalidation():
+    dt = ArrayOf(FloatRange(0, 10), 0, 5)
+    validate = dt.compiled('validate')
+    assert dt.compiled('validate') is validate  # cached
+    assert validate([5]) == (5,)
+    dt.setProperty('max', 2)  # property of the member
+    with pytest.raises(RangeError):
+        dt.compiled('validate')([5])
+    dt.members.set_properties(max=10)
+    assert dt.compiled('validate')([5]) == (5,)
+    # assignment of a property, as in frappy_psi.magfield
+    dt.members.max = 2
+    with pytest.raises(RangeError):
+        dt.compiled('validate')([5])
+
+    # invalidation is propagated through nested containers, but not to others
+    other = FloatRange(0, 10)
+    other_validate = other.compiled('validate')
+    dt = ArrayOf(TupleOf(FloatRange(0, 10), StringType()), 0, 5)
+    assert dt.compiled('validate')([(5, 'x')]) == ((5, 'x'),)
+    dt.members.members[0].max = 2
+    with pytest.raises(RangeError):
+        dt.compiled('validate')([(5, 'x')])
+    assert other.compiled('validate') is other_validate
+
+
+def test_compiled_struct_and_status():
+    dt = StructOf(optional=['b'], a=IntRange(0, 10), b=StringType())
+    export = dt.compiled('export_value')
+    assert export({'a': 1, 'b': 'x'}) == {'a': 1, 'b': 'x'}
+    assert dt.compiled('import_value')({'a': 1}) == {'a': 1}
+    assert dt.compiled('validate')({'a': 3}, {'a': 2, 'b': 'x'}) == {'a': 3, 'b': 'x'}
+    with pytest.raises(WrongTypeError):
+        export({'a': 1, 'c': 2})  # superfluous member
+    with pytest.raises(WrongTypeError):
+        dt.compiled('__call__')({'b': 'x'})  # missing member
+    with pytest.raises(RangeError):
+        dt.compiled('validate')({'a': 11})
+
+    dt = StatusType('IDLE', 'BUSY')
+    export = dt.compiled('export_value')
+    idle = export((dt.IDLE, 'ok'))
+    assert idle == [100, 'ok']
+    assert export((100, 'ok')) is idle  # cached
+    assert export([dt.BUSY, 'moving']) == [300, 'moving']  # not hashable
+    with pytest.raises(RangeError):
+        export((400, 'error'))  # invalid values are not cached
+    with pytest.raises(RangeError):
+        export((400, 'error'))
+
+
+def test_get_shared_datatype():
+    dt = get_shared_datatype({'type': 'double', 'unit': 'K', 'min': 0})
+    assert dt is get_shared_datatype({'min': 0, 'unit': 'K', 'type': 'double'})
+    assert dt is get_shared_datatype({'type': 'double', 'unit': 'K', 'min': 0}, 'other')
+    assert dt is not get_shared_datatype({'type': 'double', 'unit': 'mK', 'min': 0})
+    assert repr(dt) == repr(get_datatype({'type': 'double', 'unit': 'K', 'min': 0}))
+    with pytest.raises(ProgrammingError):
+        dt.setProperty('unit', 'mK')
+    with pytest.raises(ProgrammingError):
+        dt.unit = 'mK'
+    assert dt.unit == 'K'
+    copied = dt.copy()
+    copied.setProperty('unit', 'mK')
+    assert dt.unit == 'K'
+
+    status = StatusType('IDLE', 'BUSY').export_datatype()
+    dt = get_shared_datatype(status, 'status')
+    assert dt is get_shared_datatype(status, 'status')
+    assert dt is not get_shared_datatype(status, 'other')  # enums are named after the parameter
+    with pytest.raises(ProgrammingError):
+        dt.members[1].setProperty('maxchars', 10)
+
+    with pytest.raises(WrongTypeError):
+        get_shared_datatype({'type': 'unknown'})
+
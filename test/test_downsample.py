@@ -0,0 +1,119 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""test downsampling of time series"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+# pylint: disable=wrong-import-position
+from frappy.datatypes import EnumType, FloatRange, IntRange
+from frappy.lib.downsample import bucket_stats, curve_period, downsample, \
+    expand_period, lttb, minmax
+
+
+def synthetic(n=1000000, seed=1):
+    """a long noisy sine with a spike and a gap of errors"""
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.uniform(0.5, 1.5, n))
+    v = np.sin(t / 10000) + rng.normal(0, 0.01, n)
+    v[n // 3] = 5  # spike
+    v[n // 2:n // 2 + 100] = np.nan  # errors
+    return t, v
+
+
+def test_bucket_stats():
+    nan = float('nan')
+    times = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    values = [0, 1, 2, 3, nan, nan, 6, 7, 8, 9, 10]
+    result = bucket_stats(times, values, 0, 10, 5)
+    assert result == {'t': [0, 2, 4, 6, 8],
+                      'min': [0, 2, None, 6, 8],
+                      'max': [1, 3, None, 7, 10],  # the end is included in the last bucket
+                      'mean': [0.5, 2.5, None, 6.5, 9]}
+    # empty buckets are omitted
+    result = bucket_stats(times, values, 0, 100, 10)
+    assert result['t'] == [0, 10]
+    assert result['max'] == [9, 10]
+    assert bucket_stats(times, values, 20, 30, 10)['t'] == []
+
+
+def test_bucket_stats_long():
+    t, v = synthetic()
+    result = bucket_stats(t, v, t[0], t[-1], 1000)
+    assert len(result['t']) == 1000
+    assert max(x for x in result['max'] if x is not None) == 5
+    valid = v[~np.isnan(v)]
+    assert min(x for x in result['min'] if x is not None) == valid.min()
+    assert abs(np.mean([x for x in result['mean'] if x is not None]) - valid.mean()) < 0.01
+
+
+def test_minmax():
+    t, v = synthetic()
+    td, vd = minmax(t, v, 1000)
+    assert len(td) <= 2001
+    assert np.all(np.diff(td) > 0)
+    # extrema and errors are kept
+    assert np.nanmax(vd) == 5
+    assert np.nanmin(vd) == np.nanmin(v)
+    assert np.isnan(vd).sum() == 1
+    assert np.isin(td, t).all()
+
+
+def test_lttb():
+    t, v = synthetic(100000)
+    td, vd = lttb(t, v, 500)
+    assert len(td) == 500
+    assert td[0] == t[0] and td[-1] == t[-1]
+    assert np.all(np.diff(td) > 0)
+    assert 5 in vd  # the spike is the largest triangle in its bucket
+    assert np.isnan(vd).any()
+    # apart from the spike, the kept points follow the original curve
+    normal = ~np.isnan(vd) & (vd != 5)
+    assert np.abs(vd[normal] - np.sin(td[normal] / 10000)).max() < 0.1
+
+
+def test_expand_period():
+    t = np.array([0, 1, 10, 11])
+    v = np.array([1, 2, 3, 4])
+    # stepped curve
+    te, ve = expand_period(t, v, 0)
+    assert list(te) == [0, 1, 1, 10, 10, 11, 11]
+    assert list(ve) == [1, 1, 2, 2, 3, 3, 4]
+    # period 2: only the long gap is stepped
+    te, ve = expand_period(t, v, 2)
+    assert list(te) == [0, 1, 8, 10, 11]
+    assert list(ve) == [1, 2, 2, 3, 4]
+    assert expand_period(t, v, None) == (t, v)
+
+
+def test_curve_period():
+    assert curve_period('value', FloatRange()) is None
+    assert curve_period('target', FloatRange()) == 0
+    assert curve_period('value', IntRange()) == 0
+    assert curve_period('status.0', EnumType(IDLE=100)) == 0
+
+
+def test_downsample():
+    t, v = synthetic(100000)
+    for method in 'minmax', 'lttb':
+        td, vd = downsample(t, v, 1000, period=0, method=method)
+        assert len(td) <= 1002
+        assert np.nanmax(vd) == 5
+    with pytest.raises(ValueError):
+        downsample(t, v, 1000, method='foo')
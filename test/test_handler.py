@@ -20,10 +20,14 @@
 # *****************************************************************************
 
 
+import pytest
+
 from frappy.rwhandler import ReadHandler, WriteHandler, \
     CommonReadHandler, CommonWriteHandler, nopoll
 from frappy.core import Module, Parameter, FloatRange
+from frappy.errors import RangeError
 from frappy.lib import generalConfig
+from frappy.protocol.dispatcher import Dispatcher
 
 
 class DispatcherStub:
@@ -55,10 +59,21 @@ class LoggerStub:
 logger = LoggerStub()
 
 
+class SecNodeStub:
+    def __init__(self):
+        self.modules = {}
+
+    def get_module(self, modname):
+        return self.modules.get(modname)
+
+
 class ServerStub:
-    def __init__(self, updates):
+    restart = None
+    shutdown = None
+
+    def __init__(self, updates, secnode=None):
         self.dispatcher = DispatcherStub(updates)
-        self.secnode = None
+        self.secnode = secnode
 
 
 class ModuleTest(Module):
@@ -165,6 +180,77 @@ def test_common_handler():
     assert not data
 
 
+def test_write_parameters():
+    data = []
+
+    class Mod(ModuleTest):
+        a = Parameter('', FloatRange(), readonly=False)
+        b = Parameter('', FloatRange(), readonly=False)
+        c = Parameter('', FloatRange(0, 10), readonly=False)
+
+        @CommonWriteHandler(['a', 'b'])
+        def write_hdl(self, values):
+            self.a = values['a']
+            self.b = values['b']
+            assert values.as_tuple('a', 'b') == (self.a, self.b)  # values are kept
+            data.append('write_hdl')
+
+        def write_c(self, value):
+            data.append('write_c')
+            return value
+
+        def check_c(self, value):
+            if value > 5:
+                raise RangeError('c must not exceed 5')
+
+    m = Mod(a=1, b=2)
+    m.writeDict.clear()
+    assert m.writeParameters({'a': 3, 'b': 4, 'c': 5}) == {'a': 3, 'b': 4, 'c': 5}
+    assert data == ['write_hdl', 'write_c']  # one call of the common handler
+    assert not m.writeDict
+    data.clear()
+
+    with pytest.raises(RangeError):
+        m.writeParameters({'a': 5, 'c': 6})
+    assert not data  # nothing is written when a check fails
+    assert m.a == 3
+    assert not m.writeDict
+
+
+def test_multichange():
+    data = []
+
+    class Mod(ModuleTest):
+        a = Parameter('', FloatRange(), readonly=False)
+        c = Parameter('', FloatRange(0, 10), readonly=False)
+
+        def write_a(self, value):
+            data.append('write_a')
+            return value
+
+        def write_c(self, value):
+            data.append('write_c')
+            return value
+
+    m = Mod(a=1, c=2)
+    m.writeDict.clear()
+    secnode = SecNodeStub()
+    secnode.modules['mod'] = m
+    dispatcher = Dispatcher('dispatcher', logger, {}, ServerStub({}, secnode))
+    # custom parameters are exported with a leading underscore
+    assert dispatcher._setParameterValues('mod', {'_a': 3, '_c': 4}) == {
+        '_a': [3, {'t': m.parameters['a'].timestamp}],
+        '_c': [4, {'t': m.parameters['c'].timestamp}]}
+    assert data == ['write_a', 'write_c']
+    data.clear()
+
+    with pytest.raises(RangeError):
+        dispatcher._setParameterValues('mod', {'_a': 5, '_c': 11})
+    assert not data  # nothing is written when one value is invalid
+    assert (m.a, m.c) == (3, 4)
+    assert not m.writeDict
+
+
 def test_nopoll():
     class Mod1(ModuleTest):
         a = Parameter('', FloatRange(), readonly=False)
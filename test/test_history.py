@@ -0,0 +1,147 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""test the built-in history"""
+
+import math
+
+import pytest
+
+from frappy.datatypes import FloatRange, ScaledInteger, StringType, StructOf, TupleOf
+from frappy.errors import NoSuchParameterError, NotImplementedSECoPError, ProtocolError
+from frappy.history import HistoryReader, HistoryWriter, make_curves
+from frappy.lib import generalConfig
+from frappy.protocol.dispatcher import Dispatcher
+from frappy.protocol.messages import HISTORYREPLY
+
+
+class LoggerStub:
+    def debug(self, fmt, *args):
+        print(fmt % args)
+    info = warning = exception = error = debug
+
+
+class DispatcherStub:
+    def handle_activate(self, conn, specifier, data):
+        pass
+
+
+def describing(**params):
+    accessibles = {k: {'datainfo': dt.export_datatype()} for k, dt in params.items()}
+    return 'describing', '.', {'modules': {'mod': {'accessibles': accessibles}}}
+
+
+def update(pname, value, t):
+    return 'update', f'mod:{pname}', [value, {'t': t}]
+
+
+def get(reader, *args):
+    return tuple(list(a) for a in reader.get(*args))
+
+
+def test_make_curves():
+    dt = StructOf(a=ScaledInteger(0.1), b=TupleOf(FloatRange(), StringType()))
+    curves = make_curves(dt, 'mod:p')
+    assert [key for _, key, _ in curves] == ['mod:p.a', 'mod:p.b.0']
+    assert [type(elmtype) for _, _, elmtype in curves] == [ScaledInteger, FloatRange]
+    value = dt.export_value({'a': 1.5, 'b': (2.5, 'x')})
+    assert [fun(value) for fun, _, _ in curves] == [1.5, 2.5]
+    assert make_curves(StringType(), 'mod:p') == []
+
+
+@pytest.fixture(name='writer')
+def writer_fixture(tmp_path, monkeypatch):
+    monkeypatch.setattr(generalConfig, 'history_interval', 0, raising=False)
+    monkeypatch.setattr(generalConfig, 'history_chunk', 100, raising=False)
+    writer = HistoryWriter(tmp_path, DispatcherStub(), LoggerStub())
+    writer.init(describing(value=FloatRange(), target=FloatRange(),
+                           pos=TupleOf(FloatRange(), FloatRange()), name=StringType()))
+    yield writer
+    writer.close()
+
+
+def test_write_read(writer, tmp_path):
+    for i in range(30):
+        t = 1000 + i * 10
+        writer.send_reply(update('value', i * 0.5, t))
+        writer.send_reply(update('pos', [i, -i], t))
+        writer.send_reply(update('name', 'x', t))
+    writer.send_reply(('error_update', 'mod:value', ['HardwareError', 'x', {'t': 1300}]))
+    writer.close()
+    reader = HistoryReader(tmp_path)
+    assert reader.keys() == ['mod:pos.0', 'mod:pos.1', 'mod:value']
+    # 100 sec per chunk
+    assert reader.chunks('mod:value') == [1000, 1100, 1200, 1300]
+    times, values = reader.get('mod:value')
+    assert list(times) == [1000 + i * 10 for i in range(30)] + [1300]
+    assert list(values[:30]) == [i * 0.5 for i in range(30)]
+    assert math.isnan(values[30])
+    times, values = reader.get('mod:pos.1', 1095, 1125)
+    assert list(times) == [1100, 1110, 1120]
+    assert list(values) == [-10, -11, -12]
+    assert get(reader, 'mod:value', 2000) == ([], [])
+
+
+def test_crash_repair(writer, tmp_path):
+    writer.send_reply(update('value', 1.0, 1000))
+    writer.send_reply(update('value', 2.0, 1010))
+    writer.close()
+    # simulate a crash while writing: incomplete values
+    with open(tmp_path / 'mod' / 'value' / '1000.v', 'ab') as f:
+        f.write(b'\0' * 11)
+    reader = HistoryReader(tmp_path)
+    assert get(reader, 'mod:value') == ([1000, 1010], [1.0, 2.0])
+    writer.init(describing(value=FloatRange()))
+    writer.send_reply(update('value', 3.0, 1020))
+    writer.close()
+    assert get(reader, 'mod:value') == ([1000, 1010, 1020], [1.0, 2.0, 3.0])
+
+
+class ServerStub:
+    restart = None
+    shutdown = None
+    secnode = None
+    history = None
+
+
+def test_history_request(writer):
+    pytest.importorskip('numpy')
+    for i in range(30):
+        writer.send_reply(update('value', i, 1000 + i))
+    writer.send_reply(update('target', 0, 1000))
+    writer.send_reply(update('target', 10, 1025))
+    writer.close()
+    srv = ServerStub()
+    dispatcher = Dispatcher('dispatcher', LoggerStub(), {}, srv)
+    with pytest.raises(NotImplementedSECoPError):
+        dispatcher.handle__history(None, 'mod:value', {})
+    srv.history = writer
+    action, specifier, data = dispatcher.handle__history(
+        None, 'mod:value', {'start': 1000, 'end': 1030, 'buckets': 3})
+    assert action == HISTORYREPLY
+    assert specifier == 'mod:value'
+    assert data == {'t': [1000, 1010, 1020], 'min': [0, 10, 20],
+                    'max': [9, 19, 29], 'mean': [4.5, 14.5, 24.5]}
+    with pytest.raises(NoSuchParameterError):
+        dispatcher.handle__history(None, 'mod:name', {})
+    # the target is stepped: the step is within the bucket of the new value
+    history = writer.query('mod:target', 1000, 1030, 3)
+    assert history['t'] == [1000, 1020]
+    assert history['min'] == [0, 0]
+    assert history['max'] == [0, 10]
+    with pytest.raises(ProtocolError):
+        dispatcher.handle__history(None, 'mod:value', {'buckets': 0})
@@ -19,9 +19,12 @@
 #
 # *****************************************************************************
 
+import os
+import sys
+
 import pytest
 
-from frappy.lib import parse_host_port, merge_status
+from frappy.lib import lazy_import, parse_host_port, merge_status, startup
 
 
 @pytest.mark.parametrize('hostport, defaultport, result', [
@@ -61,3 +64,51 @@ def test_parse_host(hostport, defaultport, result):
 ])
 def test_merge_status(args, result):
     assert merge_status(*args) == result
+
+
+@pytest.fixture
+def tmp_module(tmp_path, monkeypatch):
+    """a module setting the environment variable FRAPPY_LAZY_TEST when executed"""
+    (tmp_path / 'frappy_lazy_test.py').write_text(
+        'import os\nos.environ["FRAPPY_LAZY_TEST"] = "loaded"\nvalue = 42\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delenv('FRAPPY_LAZY_TEST', raising=False)
+    yield
+    sys.modules.pop('frappy_lazy_test', None)
+
+
+@pytest.mark.usefixtures('tmp_module')
+def test_lazy_import():
+    module = lazy_import('frappy_lazy_test')
+    assert 'FRAPPY_LAZY_TEST' not in os.environ
+    assert module.value == 42
+    assert os.environ['FRAPPY_LAZY_TEST'] == 'loaded'
+    assert lazy_import('frappy_lazy_test') is module
+    missing = lazy_import('frappy_no_such_module')
+    assert not missing
+    with pytest.raises(ImportError):
+        missing.value  # pylint: disable=pointless-statement
+
+
+@pytest.mark.usefixtures('tmp_module')
+def test_startup_profile(monkeypatch):
+    monkeypatch.setattr(startup, 'profile', None)
+    with startup.measure('phase', 'mod'):
+        pass  # no profile: nothing to do
+    profile = startup.start_profile()
+    try:
+        import frappy_lazy_test  # pylint: disable=import-outside-toplevel, import-error
+        with startup.measure('phase', 'mod'):
+            pass
+        with startup.measure('phase', 'mod'):
+            pass
+    finally:
+        profile.stop()
+    assert frappy_lazy_test.value == 42
+    total, own = profile.imports['frappy_lazy_test']
+    assert 0 <= own <= total
+    assert list(profile.phases) == ['phase']
+    assert list(profile.phases['phase']) == ['mod']
+    report = profile.report()
+    assert any(line.endswith('frappy_lazy_test') for line in report)
+    assert any(line.endswith('  mod') for line in report)
@@ -19,12 +19,17 @@
 #
 # *****************************************************************************
 
+import logging
+import threading
+import time
+
 import mlzlog
 import pytest
 
 import frappy.logging
-from frappy.logging import HasComlog, generalConfig, init_remote_logging, \
-    logger
+from frappy.logging import ComLogfileHandler, ComLogQueueHandler, HasComlog, \
+    RemoteLogQueue, comlog_wanted, comlogWriter, generalConfig, init_remote_logging, \
+    logger, read_compact_comlog
 from frappy.modules import Module
 from frappy.protocol.dispatcher import Dispatcher
 from frappy.protocol.interface import decode_msg, encode_msg_frame
@@ -105,12 +110,17 @@ def init_(monkeypatch):
             monkeypatch.setattr(mlzlog, 'ColoredConsoleHandler', ConsoleHandler)
             monkeypatch.setattr(frappy.logging, 'ComLogfileHandler', ComLogHandler)
             monkeypatch.setattr(frappy.logging, 'LogfileHandler', LogfileHandler)
+            # the handlers of the python root logger (pytest capturing) would be
+            # copied to the module loggers
+            monkeypatch.setattr(logging.root, 'handlers', [])
 
             class Mod(Module):
                 result = []
 
                 def __init__(self, name, srv, **kwds):
                     kwds['description'] = ''
+                    # the module loggers are kept between tests: remove the copied handlers
+                    logging.getLogger(f'frappy.{name}').handlers.clear()
                     super().__init__(name or 'mod', logger.log.getChild(name), kwds, srv)
                     srv.secnode.add_module(self, name)
                     self.result[:] = []
@@ -140,6 +150,9 @@ def init_(monkeypatch):
                 assert item == []
 
         def check(self, both=None, **expected):
+            # remote log messages and the comlog are written from separate threads
+            self.srv.dispatcher.flush_log_messages()
+            comlogWriter.flush()
             if both:
                 expected['conn1'] = expected['conn2'] = both
             assert self.result_dict['console'] == expected.get('console', [])
@@ -213,9 +226,11 @@ def test_main_info(init):
     p.mod.log.debug('d')
     p.com.communicate('x')
     p.check(comlog=['com > x'])
+    assert not comlog_wanted(p.com.log)  # no record is created
     p.conn1.send('logging mod "debug"')
     p.conn2.send('logging mod "info"')
     p.conn2.send('logging com "debug"')
+    assert comlog_wanted(p.com.log)
     p.com.communicate('x')
     p.check(comlog=['com > x'], conn2=['log com:comlog "> x"'])
 
@@ -288,3 +303,83 @@ def test_remote_single_off(init):
     p.mod.log.info('i')
     checks['conn2'] = []
     p.check(**checks)
+
+
+def test_log_queue_drop(monkeypatch):
+    monkeypatch.setattr(generalConfig, 'remote_log_rate', 10, raising=False)
+    monkeypatch.setattr(generalConfig, 'remote_log_queue_size', 5, raising=False)
+    sent = []
+    release = threading.Event()
+
+    def send(*args):
+        release.wait()  # a slow connection
+        sent.append(args)
+
+    queue = RemoteLogQueue(send)
+    t = time.time()
+    for i in range(100):
+        queue.put('mod', 'debug', str(i))
+    # logging does not wait for the connection
+    assert time.time() - t < 0.5
+    release.set()
+    queue.flush()
+    time.sleep(queue.summary_interval)
+    queue.flush()
+    queue.close()
+    # the first message is taken by the thread, the next 5 are queued
+    assert len(sent) <= 7
+    assert sent[-1][0:2] == ('mod', 'warning')
+    assert sent[-1][2] == f'{100 - len(sent) + 1} log messages dropped'
+
+
+def test_log_queue_rate(monkeypatch):
+    monkeypatch.setattr(generalConfig, 'remote_log_rate', 10, raising=False)
+    sent = []
+    queue = RemoteLogQueue(lambda *args: sent.append(args))
+    for i in range(15):
+        queue.put('mod', 'info', str(i))
+    queue.flush()
+    # 10 messages burst, the others are dropped
+    assert [msg for _, _, msg in sent] == [str(i) for i in range(10)] + ['5 log messages dropped']
+    assert sent[-1][1] == 'warning'
+    time.sleep(0.15)  # more than one token is refilled
+    queue.put('mod', 'info', 'x')
+    queue.flush()
+    queue.close()
+    assert sent[11:] == [('mod', 'info', 'x')]
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_comlog_writer(tmp_path, compact):
+    log = mlzlog.Logger('COMLOG.writertest')
+    log.handlers[:] = []
+    handler = ComLogfileHandler(str(tmp_path), 'writertest', compact=compact)
+    log.addHandler(ComLogQueueHandler(handler))
+    release = threading.Event()
+    write_batch = handler.write_batch
+    batches = []
+
+    def slow_write_batch(records):
+        release.wait()  # a slow disk
+        batches.append(len(records))
+        write_batch(records)
+
+    handler.write_batch = slow_write_batch
+    t = time.time()
+    for i in range(100):
+        log.info('> %s', i)
+    # communication does not wait for the disk
+    assert time.time() - t < 0.5
+    release.set()
+    comlogWriter.flush()
+    assert sum(batches) == 100
+    assert len(batches) < 100
+    files = list((tmp_path / 'writertest').glob('writertest-*'))
+    assert len(files) == 1
+    if compact:
+        assert files[0].suffix == '.bin'
+        assert [msg for _, msg in read_compact_comlog(files[0])] == [f'> {i}' for i in range(100)]
+    else:
+        lines = files[0].read_text().splitlines()
+        assert len(lines) == 100
+        assert all(line.endswith(f' > {i}') for i, line in enumerate(lines))
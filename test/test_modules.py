@@ -27,8 +27,12 @@ import pytest
 
 from frappy.datatypes import BoolType, FloatRange, StringType, IntRange, ScaledInteger
 from frappy.errors import ProgrammingError, ConfigError, RangeError, HardwareError
+from frappy.modulebase import generated_class
 from frappy.modules import Communicator, Drivable, Readable, Module, Writable
 from frappy.params import Command, Parameter, Limit
+from frappy.protocol.dispatcher import make_update
+from frappy.proxy import proxy_class
+from frappy.protocol.messages import EVENTREPLY
 from frappy.rwhandler import ReadHandler, WriteHandler, nopoll
 from frappy.lib import generalConfig
 from frappy.properties import Property
@@ -247,7 +251,8 @@ def test_ModuleMagic():
         'group', 'export', 'relative_resolution',
         'visibility', 'unit', 'default', 'value', 'datatype', 'fmtstr',
         'absolute_resolution', 'max', 'min', 'readonly', 'constant',
-        'description', 'needscfg', 'update_unchanged', 'influences'}
+        'description', 'needscfg', 'update_unchanged', 'influences',
+        'deadband', 'relative_deadband', 'max_silence'}
 
     # check on the level of classes
     # this checks Newclass1 too, as it is inherited by Newclass2
@@ -797,6 +802,76 @@ def test_omit_unchanged_within():
     assert mod2.parameters['a'].omit_unchanged_within == 0.125
 
 
+def test_update_messages():
+    updates = {}
+    srv = ServerStub(updates)
+
+    class Mod(Module):
+        a = Parameter('', FloatRange(), default=0)
+        b = Parameter('', FloatRange(), default=0, export='bb')
+
+    mod = Mod('mod', LoggerStub(), {'description': ''}, srv)
+    assert mod.parameters['a'].specifier == 'mod:_a'
+    assert mod.parameters['b'].specifier == 'mod:bb'
+    mod.announceUpdate('b', 1.5, timestamp=1000)
+    assert make_update('mod', mod.parameters['b']) == (EVENTREPLY, 'mod:bb', [1.5, {'t': 1000}])
+    mod.announceUpdate('b', None, ValueError('x'), timestamp=1001)
+    assert mod.parameters['b'].value == 1.5  # value kept on error
+    updates.clear()
+    mod.announceUpdate('b', None, ValueError('x'), timestamp=1002)
+    assert not updates  # repeated error is not announced
+
+
+def test_deadband():
+    updates = {}
+    srv = ServerStub(updates)
+
+    class Mod(Module):
+        a = Parameter('', FloatRange(), default=0, deadband=0.5, max_silence=10)
+        b = Parameter('', FloatRange(), default=0, relative_deadband=0.1)
+        c = Parameter('', FloatRange(absolute_resolution=0.01), default=0, deadband='resolution')
+
+    mod = Mod('mod', LoggerStub(), {'description': ''}, srv)
+    sent = []
+    announce_update = mod.updateCallback
+
+    def update_callback(modobj, pobj):
+        if pobj.name == 'a' and not pobj.readerror:
+            sent.append(pobj.value)
+        announce_update(modobj, pobj)
+
+    mod.updateCallback = update_callback
+    internal = []
+    mod.addCallback('a', internal.append)
+    for t, value in enumerate([1, 1.2, 1.4, 1.6, 1.7, 1.0]):
+        mod.announceUpdate('a', value, timestamp=1000 + t)
+    assert sent == [1, 1.6, 1.0]  # compared with the last announced value
+    # callbacks get all values
+    assert internal == [1, 1.2, 1.4, 1.6, 1.7, 1.0]
+    assert mod.a == 1.0
+    assert mod.parameters['a'].timestamp == 1005
+    mod.announceUpdate('a', 1.1, timestamp=1020)  # heartbeat after max_silence
+    mod.announceUpdate('a', 1.2, timestamp=1021)
+    mod.announceUpdate('a', None, ValueError('x'), timestamp=1022)
+    mod.announceUpdate('a', 1.2, timestamp=1023)  # recovery from error is announced
+    assert sent == [1, 1.6, 1.0, 1.1, 1.2]
+
+    mod.announceUpdate('b', 100, timestamp=1000)
+    updates.clear()
+    mod.announceUpdate('b', 109, timestamp=1001)
+    assert not updates
+    mod.announceUpdate('b', 111, timestamp=1002)
+    assert updates['mod']['b'] == 111
+
+    assert mod.parameters['c'].deadband_limits == (0.01, 1.2e-7)
+
+    with pytest.raises(ConfigError):
+        class Bad(Module):
+            s = Parameter('', StringType(), default='', deadband=1)
+
+        Bad('bad', LoggerStub(), {'description': ''}, srv)
+
+
 stdlim = {
     'a_min': -1, 'a_max': 2,
     'b_min': 0,
@@ -961,3 +1036,38 @@ def test_write_error():
     with pytest.raises(RangeError):
         a.write_par(-1)
     assert not updates # no error update!
+
+
+def test_generated_class():
+    srv = ServerStub({})
+    created = []
+
+    class Dynamic(Module):
+        """a module creating its class from the configuration"""
+        def __new__(cls, name, logger, cfgdict, srv):
+            pnames = tuple(cfgdict.pop('pnames'))
+
+            def create():
+                created.append(pnames)
+                attrs = {p: Parameter(p, FloatRange(), default=0, readonly=False) for p in pnames}
+                return type(f'Dynamic_{len(created)}', (cls,), attrs)
+
+            return super().__new__(generated_class((cls, pnames), create))
+
+    a = Dynamic('a', LoggerStub(), {'description': '', 'pnames': ['x', 'y']}, srv)
+    b = Dynamic('b', LoggerStub(), {'description': '', 'pnames': ['x', 'y']}, srv)
+    c = Dynamic('c', LoggerStub(), {'description': '', 'pnames': ['x']}, srv)
+    assert created == [('x', 'y'), ('x',)]
+    assert type(a) is type(b)
+    assert type(a) is not type(c)
+    assert set(c.parameters) == {'x'}
+    # parameters are still individual per instance
+    a.x = 1
+    assert b.x == 0
+    assert a.parameters['x'] is not b.parameters['x']
+
+
+def test_proxy_class():
+    assert proxy_class(Readable) is proxy_class('frappy.modules.Readable')
+    assert proxy_class(Writable) is not proxy_class(Readable)
+    assert proxy_class(Readable, 'other') is not proxy_class(Readable)
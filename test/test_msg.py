@@ -23,7 +23,10 @@
 import pytest
 
 import frappy.protocol.messages as m
-from frappy.protocol.interface import decode_msg, encode_msg_frame
+from frappy.datatypes import ArrayOf, BLOBType, FloatRange, IntRange, \
+    ScaledInteger
+from frappy.protocol.interface import binary_size, decode_binary, \
+    decode_msg, encode_msg_frame, encode_msg_frame_binary, get_msg
 
 # args are: msg tuple, msg bytes
 MSG = [
@@ -49,3 +52,27 @@ def test_encode(msg, line):
 @pytest.mark.parametrize('msg, line', MSG)
 def test_decode(msg, line):
     assert decode_msg(line) == msg
+
+
+@pytest.mark.parametrize('dt, value', [
+    (ArrayOf(FloatRange(), 0, 1000), [i * 0.5 for i in range(1000)]),
+    (ArrayOf(IntRange(), 0, 100), list(range(100))),
+    (ArrayOf(ScaledInteger(0.1), 0, 100), [i * 0.1 for i in range(100)]),
+    (ArrayOf(FloatRange(), 0, 10), [1.5, 2.5]),  # too short for binary
+    (BLOBType(0, 1000), bytes(range(256)) * 3),
+])
+def test_binary(dt, value):
+    pytest.importorskip('numpy')
+    data = [dt.export_value(dt(value)), {'t': 1.5}]
+    frame = encode_msg_frame_binary(m.EVENTREPLY, 'mod:par', data)
+    if not hasattr(data[0], 'raw'):
+        assert frame == encode_msg_frame(m.EVENTREPLY, 'mod:par', data)
+    line, rest = get_msg(frame + b'next\n')
+    action, specifier, rdata = decode_msg(line)
+    assert (action, specifier) == (m.EVENTREPLY, 'mod:par')
+    size = binary_size(rdata)
+    if size:
+        decode_binary(rdata, rest[:size])
+    assert rest[size:] == b'next\n'
+    assert rdata[1] == {'t': 1.5}
+    assert dt.import_value(rdata[0]) == dt(value)
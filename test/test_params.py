@@ -100,6 +100,18 @@ def test_Parameter():
         Parameter(None, datatype=float, inherit=False)
 
 
+def test_parameter_runtime_state():
+    class Mod(HasAccessibles):
+        p1 = Parameter('desc1', datatype=FloatRange(), default=0)
+
+    p1 = Mod.p1.copy()
+    assert (p1.timestamp, p1.readerror, p1.given) == (0, None, False)
+    p1.timestamp = 1
+    assert Mod.p1.timestamp == 0  # runtime state is per instance
+    p1.extra = 5  # additional attributes are still allowed
+    assert p1.extra == 5
+
+
 def test_Override():
     class Base(HasAccessibles):
         p1 = Parameter('description1', datatype=BoolType, default=False)
@@ -21,13 +21,15 @@
 
 import json
 import os
+import time
 from os.path import join
 from pathlib import Path
 import pytest
 from frappy.config import Param
 from frappy.core import Module, ScaledInteger, IntRange, StringType, StructOf
 from frappy.lib import generalConfig
-from frappy.persistent import PersistentParam, PersistentMixin
+from frappy.errors import ConfigError
+from frappy.persistent import PersistentParam, PersistentMixin, persistentWriter
 
 
 class SecNodeStub:
@@ -82,6 +84,7 @@ def test_save(tmpdir, cfg, data):
     assert m.writeDict == {k: getattr(m, k) for k in data}
     m.writeDict.clear()  # clear in order to indicate writing has happened
     m.saveParameters()
+    m.shutdownModule()  # write pending data
     with open(join(tmpdir, 'persistent', 'savetest.m.json'), encoding='utf-8') as f:
         assert json.load(f) == data
 
@@ -115,3 +118,112 @@ def test_load(tmpdir, cfg, data, written):
         assert getattr(m, k) == v['value']
     for k, v in written.items():
         assert getattr(m, k) == v
+
+
+def read_file(tmpdir, equipment_id):
+    with open(join(tmpdir, 'persistent', f'{equipment_id}.m.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_write_behind(tmpdir, monkeypatch):
+    generalConfig.logdir = Path(tmpdir)
+    monkeypatch.setattr(generalConfig, 'persistent_delay', 0.1, raising=False)
+
+    m = Mod('m', logger, {'description': '', 'flt': Param(1.5)}, ServerStub('behind'))
+    m.shutdownModule()
+    assert read_file(tmpdir, 'behind')['flt'] == 15
+    m.writeDict.clear()
+    for value in range(10):
+        m.flt = value
+        m.saveParameters()
+    # changes are collected and written later
+    assert read_file(tmpdir, 'behind')['flt'] == 15
+    for _ in range(20):
+        time.sleep(0.1)
+        if read_file(tmpdir, 'behind')['flt'] == 90:
+            break
+    assert read_file(tmpdir, 'behind')['flt'] == 90
+    assert not persistentWriter.pending
+
+
+def test_crash_consistency(tmpdir, monkeypatch):
+    generalConfig.logdir = Path(tmpdir)
+    monkeypatch.setattr(generalConfig, 'persistent_delay', 0, raising=False)
+
+    m = Mod('m', logger, {'description': '', 'flt': Param(1.5)}, ServerStub('crash'))
+    m.writeDict.clear()
+    saved = read_file(tmpdir, 'crash')
+    assert saved['flt'] == 15
+
+    def crashing_dump(data, f, **kwds):
+        f.write('{"flt": ')  # incomplete file
+        raise OSError('disk full')
+
+    monkeypatch.setattr(json, 'dump', crashing_dump)
+    m.flt = 2.5
+    m.saveParameters()
+    monkeypatch.undo()
+    # the file still contains the complete old data, the temporary file is removed
+    assert read_file(tmpdir, 'crash') == saved
+    assert os.listdir(join(tmpdir, 'persistent')) == ['crash.m.json']
+    # the failed data is written on the next occasion
+    m.shutdownModule()
+    assert read_file(tmpdir, 'crash')['flt'] == 25
+
+
+def test_retry(tmpdir, monkeypatch):
+    generalConfig.logdir = Path(tmpdir)
+    monkeypatch.setattr(generalConfig, 'persistent_delay', 0.1, raising=False)
+
+    m = Mod('m', logger, {'description': '', 'flt': Param(1.5)}, ServerStub('retry'))
+    m.shutdownModule()
+    m.writeDict.clear()
+    dump = json.dump
+    failures = []
+
+    def failing_dump(data, f, **kwds):
+        if not failures:
+            failures.append(data)
+            raise OSError('disk full')
+        dump(data, f, **kwds)
+
+    monkeypatch.setattr(json, 'dump', failing_dump)
+    m.flt = 2.5
+    m.saveParameters()
+    # the data is written on a retry, without any further change
+    for _ in range(20):
+        time.sleep(0.1)
+        if read_file(tmpdir, 'retry')['flt'] == 25:
+            break
+    assert failures
+    assert read_file(tmpdir, 'retry')['flt'] == 25
+    assert not persistentWriter.pending
+
+
+def test_sqlite_store(tmpdir, monkeypatch):
+    generalConfig.logdir = Path(tmpdir)
+    monkeypatch.setattr(generalConfig, 'persistent_store', 'sqlite', raising=False)
+
+    srv = ServerStub('sqlite')
+    m = Mod('m', logger, {'description': '', 'flt': Param(1.5)}, srv)
+    n = Mod('n', logger, {'description': '', 'flt': Param(2.5)}, srv)
+    for mod in m, n:
+        mod.writeDict.clear()
+        mod.stc = {'i': 5, 's': mod.name}
+        mod.saveParameters()
+        mod.shutdownModule()
+    # all modules in one database, no json files
+    files = os.listdir(join(tmpdir, 'persistent'))
+    assert 'sqlite.sqlite' in files
+    assert not [f for f in files if f.endswith('.json')]
+    m = Mod('m', logger, {'description': ''}, srv)
+    n = Mod('n', logger, {'description': ''}, srv)
+    assert m.flt == 1.5
+    assert m.stc == {'i': 5, 's': 'm'}
+    assert n.flt == 2.5
+    assert n.stc == {'i': 5, 's': 'n'}
+    m.persistentStore.close()
+
+    monkeypatch.setattr(generalConfig, 'persistent_store', 'foo', raising=False)
+    with pytest.raises(ConfigError):
+        Mod('m', logger, {'description': ''}, srv)
@@ -0,0 +1,61 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+# pylint: disable=wrong-import-position
+from frappy.lib.ringbuffer import RingBuffer
+
+
+def test_fill():
+    buf = RingBuffer(5)
+    assert len(buf) == 0
+    assert buf.last() is None
+    for i in range(3):
+        buf.append(i, i * 10)
+    t, v = buf.get()
+    assert list(t) == [0, 1, 2]
+    assert list(v) == [0, 10, 20]
+    assert buf.last() == (2, 20)
+
+
+def test_wrap_and_range():
+    buf = RingBuffer(5)
+    for i in range(12):
+        buf.append(i, i * 10)
+    assert len(buf) == 5
+    t, v = buf.get()
+    assert list(t) == [7, 8, 9, 10, 11]
+    assert list(v) == [70, 80, 90, 100, 110]
+    t, v = buf.get(8, 10)
+    assert list(t) == [8, 9, 10]
+    t, v = buf.get(9.5)
+    assert list(t) == [10, 11]
+    t, v = buf.get(end=7)
+    assert list(t) == [7]
+    t, v = buf.get(20)
+    assert len(t) == 0
+
+
+def test_decreasing_timestamp():
+    buf = RingBuffer(5)
+    buf.append(10, 1)
+    buf.append(9, 2)
+    assert list(buf.get()[0]) == [10, 10]
@@ -0,0 +1,225 @@
+# *****************************************************************************
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+# *****************************************************************************
+"""test module creation and initialization in the SecNode"""
+
+import logging
+import threading
+import time
+
+import pytest
+
+from frappy.config import fingerprint
+from frappy.io import HasIO, StringIO
+from frappy.lib import generalConfig
+from frappy.modules import Attached, Module
+from frappy.protocol.dispatcher import Dispatcher
+from frappy.secnode import SecNode, module_references
+
+
+class ServerStub:
+    restart = None
+    shutdown = None
+
+    def __init__(self, module_cfg):
+        self.log = logging.getLogger('test.secnode')
+        self.module_cfg = module_cfg
+        self.secnode = SecNode('secnode', self.log.getChild('secnode'), {}, self)
+        self.dispatcher = Dispatcher('dispatcher', self.log, {}, self)
+
+
+initialized = []
+
+
+class Slow(Module):
+    delay = 0.2
+
+    def initModule(self):
+        super().initModule()
+        time.sleep(self.delay)
+        initialized.append((self.name, threading.current_thread().name))
+
+
+class Dependent(Slow):
+    att = Attached()
+
+    def initModule(self):
+        assert self.att.initModuleDone
+        super().initModule()
+
+
+def make_cfg():
+    return {
+        'dep': {'cls': Dependent, 'description': '', 'att': 'b'},
+        'a': {'cls': Slow, 'description': ''},
+        'b': {'cls': Slow, 'description': ''},
+    }
+
+
+def test_module_references():
+    names = {'a', 'b', 'c'}
+    assert module_references({'att': 'a', 'value': 'x', 'io': ['b', 5],
+                              'nested': {'value': 'c'}}, names) == names
+    assert module_references({'description': 'a module', 'value': 5}, names) == set()
+
+
+@pytest.mark.parametrize('nthreads', [1, 3])
+def test_init_modules(nthreads):
+    generalConfig.testinit(module_init_threads=nthreads)
+    initialized.clear()
+    srv = ServerStub(make_cfg())
+    t = time.time()
+    srv.secnode.create_modules()
+    t = time.time() - t
+    # the order of the modules is kept
+    assert list(srv.secnode.modules) == ['dep', 'a', 'b']
+    names = [name for name, _ in initialized]
+    assert sorted(names) == ['a', 'b', 'dep']
+    # the attached module is initialized before the dependent module
+    assert names.index('b') < names.index('dep')
+    if nthreads == 1:
+        assert t >= 3 * Slow.delay
+    else:
+        # 'a' and 'b' are initialized in parallel
+        assert t < 2.9 * Slow.delay
+        assert len({thread for _, thread in initialized}) > 1
+
+
+class SlowIO(StringIO):
+    def initModule(self):
+        super().initModule()
+        time.sleep(Slow.delay)
+        initialized.append((self.name, threading.current_thread().name))
+
+
+class SlowDev(HasIO, Slow):
+    ioClass = SlowIO
+    ioDict = {}
+
+
+def test_init_implicit_io():
+    generalConfig.testinit(module_init_threads=3)
+    initialized.clear()
+    srv = ServerStub({
+        'dev': {'cls': SlowDev, 'description': '', 'uri': 'tcp://localhost:5001'},
+        'a': {'cls': Slow, 'description': ''},
+        'dep': {'cls': Dependent, 'description': '', 'att': 'dev'},
+    })
+    srv.secnode.create_modules()
+    # the io created from the uri is not referenced in the config
+    assert srv.secnode._dependencies() == {'dev': {'dev_io'}, 'dev_io': set(),
+                                           'a': set(), 'dep': {'dev'}}
+    names = [name for name, _ in initialized]
+    assert sorted(names) == ['a', 'dep', 'dev', 'dev_io']
+    assert names.index('dev_io') < names.index('dev') < names.index('dep')
+
+
+created = []
+
+
+class SlowCreate(Module):
+    def __init__(self, name, logger, opts, srv):
+        time.sleep(Slow.delay)
+        created.append((name, threading.current_thread().name))
+        super().__init__(name, logger, opts, srv)
+
+
+class SlowCreateDev(SlowCreate, SlowDev):
+    ioDict = {}
+
+
+@pytest.mark.parametrize('nthreads', [1, 3])
+def test_create_modules(nthreads):
+    generalConfig.testinit(module_init_threads=nthreads)
+    created.clear()
+    srv = ServerStub({
+        'dev': {'cls': SlowCreateDev, 'description': '', 'uri': 'tcp://localhost:5001'},
+        'a': {'cls': SlowCreate, 'description': ''},
+        'b': {'cls': SlowCreate, 'description': ''},
+        'dev2': {'cls': SlowCreateDev, 'description': '', 'uri': 'tcp://localhost:5001'},
+    })
+    srv.secnode.create_modules()
+    modules = srv.secnode.modules
+    # the order is the same as with sequential creation
+    assert list(modules) == ['dev_io', 'dev', 'a', 'b', 'dev2']
+    # modules with the same uri are created sequentially and share the io
+    assert modules['dev2'].io is modules['dev_io']
+    names = [name for name, _ in created]
+    assert names.index('dev') < names.index('dev2')
+    if nthreads > 1:
+        assert len({thread for _, thread in created}) > 1
+
+
+class Plain(Module):
+    att = Attached(mandatory=False)
+
+
+class Dev(HasIO, Module):
+    ioClass = StringIO
+    ioDict = {}
+
+
+def test_hot_restart():
+    generalConfig.testinit()
+    cfg = {
+        'a': {'cls': Plain, 'description': 'a'},
+        'b': {'cls': Plain, 'description': 'b'},
+        'dep': {'cls': Plain, 'description': 'dep', 'att': 'b'},
+        'c': {'cls': Plain, 'description': 'c'},
+        'd': {'cls': Plain, 'description': 'd', 'att': 'a'},
+        'dev': {'cls': Dev, 'description': 'dev', 'uri': 'tcp://localhost:5001'},
+        'other': {'cls': Dev, 'description': 'other', 'uri': 'tcp://localhost:5002'},
+    }
+    fingerprints = {name: fingerprint(modcfg) for name, modcfg in cfg.items()}
+    srv = ServerStub(cfg)
+    srv.secnode.create_modules()
+    old = srv.secnode.modules
+    new_cfg = {
+        'a': {'cls': Plain, 'description': 'changed'},
+        'b': {'cls': Plain, 'description': 'b'},
+        'dep': {'cls': Plain, 'description': 'dep', 'att': 'b'},
+        'c': {'cls': Plain, 'description': 'c'},
+        'd': {'cls': Plain, 'description': 'd', 'att': 'a'},
+        'new': {'cls': Plain, 'description': 'new', 'att': 'c'},
+        'dev': {'cls': Dev, 'description': 'dev', 'uri': 'tcp://localhost:5001'},
+        'other': {'cls': Dev, 'description': 'changed', 'uri': 'tcp://localhost:5002'},
+    }
+    new_fingerprints = {name: fingerprint(modcfg) for name, modcfg in new_cfg.items()}
+    keep = srv.secnode.reusable_modules(fingerprints, new_cfg)
+    # 'a' is changed, 'd' is attached to 'a', 'c' is attached to the new module
+    # 'dev_io' is created on the fly and kept together with 'dev'
+    assert set(keep) == {'b', 'dep', 'dev', 'dev_io'}
+    srv.secnode.shutdown_modules(keep)
+
+    srv = ServerStub(new_cfg)
+    srv.secnode.keep_modules(keep)
+    srv.secnode.create_modules()
+    modules = srv.secnode.modules
+    assert list(modules) == ['dev_io', 'a', 'b', 'dep', 'c', 'd', 'new', 'dev', 'other_io', 'other']
+    for name, modobj in modules.items():
+        assert (modobj is old.get(name)) == (name in keep)
+        assert modobj.secNode is srv.secnode
+        assert modobj._isinitialized
+    assert modules['dep'].att is modules['b']
+    assert modules['d'].att is modules['a']
+    assert modules['a'].description == 'changed'
+    assert modules['dev'].io is modules['dev_io']
+    assert modules['other'].io is modules['other_io']
+    # on the next restart, the kept io is recreated together with 'dev'
+    next_cfg = dict(new_cfg, dev={'cls': Dev, 'description': 'changed', 'uri': 'tcp://localhost:5001'})
+    keep = srv.secnode.reusable_modules(new_fingerprints, next_cfg)
+    assert 'dev' not in keep and 'dev_io' not in keep